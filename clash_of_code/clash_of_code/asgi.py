@@ -0,0 +1,17 @@
+import importlib
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clash_of_code.settings')
+
+django_application = get_asgi_application()
+# Приложения импортируются только после настройки Django
+duet_application = importlib.import_module('duet.consumers').application
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await duet_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
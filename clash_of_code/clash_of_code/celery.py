@@ -1,9 +1,66 @@
 import os
 
 from celery import Celery
+from celery.concurrency.prefork import TaskPool as PreforkPool
+from celery.signals import (
+    worker_process_init,
+    worker_process_shutdown,
+    worker_ready,
+    worker_shutdown,
+)
+from kombu import Queue
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clash_of_code.settings')
 
 app = Celery('clash_of_code')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+# Очереди перечислены по убыванию приоритета, у каждой свой worker, чтобы
+# пачка тренировочных посылок или перепроверка задачи не задерживали контест
+CONTEST_QUEUE = 'judge_contest'
+PRACTICE_QUEUE = 'judge_practice'
+AUTHOR_QUEUE = 'judge_author'
+REJUDGE_QUEUE = 'judge_rejudge'
+SYSTEM_TEST_QUEUE = 'judge_system'
+JUDGE_QUEUES = (
+    CONTEST_QUEUE,
+    PRACTICE_QUEUE,
+    AUTHOR_QUEUE,
+    REJUDGE_QUEUE,
+    SYSTEM_TEST_QUEUE,
+)
+
+app.conf.task_default_queue = PRACTICE_QUEUE
+app.conf.task_queues = [Queue(name) for name in JUDGE_QUEUES]
+app.conf.task_routes = {
+    'submissions.tasks.check_solution': {'queue': PRACTICE_QUEUE},
+    'problems.tasks.check_auther_solution': {'queue': AUTHOR_QUEUE},
+    'contests.tasks.run_system_tests': {'queue': SYSTEM_TEST_QUEUE},
+    'submissions.tasks.requeue_expired_submissions': {'queue': SYSTEM_TEST_QUEUE},
+}
+
+
+@worker_process_init.connect
+def warm_up_sandbox(**kwargs):
+    import core.sandbox
+
+    core.sandbox.get_backend().warm_up()
+
+
+@worker_ready.connect
+def warm_up_threaded_sandbox(sender, **kwargs):
+    # В пуле потоков задачи выполняются в самом процессе worker, а не в
+    # дочерних процессах prefork, и песочницы прогреваются здесь
+    if not isinstance(sender.pool, PreforkPool):
+        warm_up_sandbox()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def close_sandbox(**kwargs):
+    import core.dispatcher
+    import core.sandbox
+
+    core.dispatcher.close_all()
+    core.sandbox.get_backend().close()
@@ -30,6 +30,8 @@ DEFAULT_USER_IS_ACTIVE = os.getenv(
 )
 
 INSTALLED_APPS = [
+    # Сервер ASGI для runserver, нужен потоку событий вердиктов
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -40,6 +42,7 @@ INSTALLED_APPS = [
     'tinymce',
     # Project applications
     'contests.apps.ContestsConfig',
+    'duet.apps.DuetConfig',
     'problems.apps.ProblemsConfig',
     'submissions.apps.SubmissionsConfig',
     'users.apps.UsersConfig',
@@ -86,6 +89,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'clash_of_code.wsgi.application'
+ASGI_APPLICATION = 'clash_of_code.asgi.application'
 
 
 DATABASES = {
@@ -151,6 +155,24 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Входные и выходные данные тестов хранятся по sha256 содержимого, вместо
+# файловой системы можно подключить любое хранилище Django
+TEST_DATA_ROOT = Path(os.getenv('DJANGO_TEST_DATA_ROOT', MEDIA_ROOT / 'tests'))
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'testdata': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {
+            'location': TEST_DATA_ROOT,
+        },
+    },
+}
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = 'send_mail/'
 
@@ -169,6 +191,104 @@ CELERY_RESULT_BACKEND = 'redis://' + REDIS_HOST + ':' + REDIS_PORT + '/0'
 CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+# Проверка решения идёт долго, поэтому worker не резервирует задачи впрок
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+JUDGE_SYSTEM_TEST_INTERVAL = int(os.getenv('DJANGO_JUDGE_SYSTEM_TEST_INTERVAL', '60'))
+JUDGE_SYSTEM_TEST_BATCH = int(os.getenv('DJANGO_JUDGE_SYSTEM_TEST_BATCH', '50'))
+
+# Worker продлевает lease посылки каждую треть таймаута, посылки с истёкшим
+# lease возвращаются в очередь
+JUDGE_LEASE_TIMEOUT = int(os.getenv('DJANGO_JUDGE_LEASE_TIMEOUT', '60'))
+
+CELERY_BEAT_SCHEDULE = {
+    'run-system-tests': {
+        'task': 'contests.tasks.run_system_tests',
+        'schedule': JUDGE_SYSTEM_TEST_INTERVAL,
+    },
+    'requeue-expired-submissions': {
+        'task': 'submissions.tasks.requeue_expired_submissions',
+        'schedule': JUDGE_LEASE_TIMEOUT,
+    },
+}
+
+# docker - пул контейнеров, local - runner на самом узле без Docker
+JUDGE_SANDBOX_BACKEND = os.getenv('DJANGO_JUDGE_SANDBOX_BACKEND', 'docker')
+# Интерпретатор для решений в local, по умолчанию тот же, что у worker
+JUDGE_LOCAL_PYTHON = os.getenv('DJANGO_JUDGE_LOCAL_PYTHON', '')
+# uid, под которыми local запускает проверки, по одной проверке на uid
+JUDGE_LOCAL_UIDS = [
+    int(uid) for uid in os.getenv('DJANGO_JUDGE_LOCAL_UIDS', '').split(',') if uid
+]
+# Без uid решения работают с правами worker, годится только для разработки
+JUDGE_LOCAL_ALLOW_SHARED_UID = get_env_bool(
+    'DJANGO_JUDGE_LOCAL_ALLOW_SHARED_UID',
+    'False',
+)
+JUDGE_LOCAL_SCRATCH_DIR = os.getenv('DJANGO_JUDGE_LOCAL_SCRATCH_DIR', '')
+# Делегированная cgroup v2, без неё ML ставится по пиковому RSS
+JUDGE_LOCAL_CGROUP_ROOT = os.getenv('DJANGO_JUDGE_LOCAL_CGROUP_ROOT', '')
+JUDGE_LOCAL_MAX_PROCESSES = int(os.getenv('DJANGO_JUDGE_LOCAL_MAX_PROCESSES', '64'))
+
+# Сколько песочниц один процесс worker держит запущенными одновременно,
+# 0 - по числу ядер и памяти узла
+JUDGE_DISPATCHER_CONCURRENCY = int(
+    os.getenv('DJANGO_JUDGE_DISPATCHER_CONCURRENCY', '0'),
+)
+
+JUDGE_POOL_SIZE = int(os.getenv('DJANGO_JUDGE_POOL_SIZE', '1'))
+JUDGE_POOL_MAX_JOBS = int(os.getenv('DJANGO_JUDGE_POOL_MAX_JOBS', '50'))
+# Общий лимит памяти контейнера, лимит задачи применяется к каждому тесту отдельно
+JUDGE_CONTAINER_MEMORY = os.getenv('DJANGO_JUDGE_CONTAINER_MEMORY', '2g')
+# fork, subprocess или compare (сравнение вердиктов двух режимов)
+JUDGE_RUNNER_MODE = os.getenv('DJANGO_JUDGE_RUNNER_MODE', 'fork')
+# Сколько тестов одной посылки запускать параллельно, 0 - по квоте CPU контейнера
+JUDGE_RUNNER_WORKERS = int(os.getenv('DJANGO_JUDGE_RUNNER_WORKERS', '1'))
+JUDGE_TEST_CACHE_DIR = Path(
+    os.getenv('DJANGO_JUDGE_TEST_CACHE_DIR', BASE_DIR / 'judge_cache'),
+)
+JUDGE_MAX_SOURCE_SIZE = int(os.getenv('DJANGO_JUDGE_MAX_SOURCE_SIZE', '65536'))
+JUDGE_COMPILE_TIMEOUT = float(os.getenv('DJANGO_JUDGE_COMPILE_TIMEOUT', '1'))
+# Лимит вывода решения на тест в мегабайтах
+JUDGE_OUTPUT_LIMIT = int(os.getenv('DJANGO_JUDGE_OUTPUT_LIMIT', '64'))
+# Сколько символов сообщения тестирующей системы сохраняется в логах посылки
+JUDGE_MAX_LOG_SIZE = int(os.getenv('DJANGO_JUDGE_MAX_LOG_SIZE', '4096'))
+
+JUDGE_CACHE_LOCATION = os.getenv('DJANGO_JUDGE_CACHE_LOCATION', '')
+JUDGE_CACHE_TIMEOUT = 24 * 60 * 60
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'judge': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'judge',
+        'TIMEOUT': JUDGE_CACHE_TIMEOUT,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+if JUDGE_CACHE_LOCATION:
+    CACHES['judge'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': JUDGE_CACHE_LOCATION,
+        'TIMEOUT': JUDGE_CACHE_TIMEOUT,
+    }
+
+STANDINGS_REDIS_URL = os.getenv('DJANGO_STANDINGS_REDIS_URL', '')
+STANDINGS_PAGE_SIZE = int(os.getenv('DJANGO_STANDINGS_PAGE_SIZE', '50'))
+
+# Без Redis события доходят только до страниц, открытых в процессе проверки
+EVENTS_REDIS_URL = os.getenv('DJANGO_EVENTS_REDIS_URL', '')
+EVENTS_KEEPALIVE = int(os.getenv('DJANGO_EVENTS_KEEPALIVE', '15'))
+# Браузер сам переподключается, когда сервер закрывает поток
+EVENTS_STREAM_TIMEOUT = int(os.getenv('DJANGO_EVENTS_STREAM_TIMEOUT', '300'))
+
+# Как часто документ комнаты совместного редактирования сохраняется в БД
+DUET_SNAPSHOT_INTERVAL = int(os.getenv('DJANGO_DUET_SNAPSHOT_INTERVAL', '10'))
 
 LOGGING = {
     'version': 1,
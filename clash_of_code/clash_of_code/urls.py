@@ -15,6 +15,7 @@ urlpatterns = [
         'contests/',
         django.urls.include('contests.urls', namespace='contests'),
     ),
+    django.urls.path('duet/', django.urls.include('duet.urls')),
     django.urls.path('', django.urls.include('homepage.urls')),
 ]
 
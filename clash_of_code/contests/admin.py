@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from contests.models import Contest
+from contests.models import Contest, ContestProblem
+import problems.models
 
 
 @admin.register(Contest)
@@ -20,3 +21,27 @@ class ContestAdmin(admin.ModelAdmin):
         Contest.name.field.name,
         Contest.description.field.name,
     )
+
+
+@admin.register(ContestProblem)
+class ContestProblemAdmin(admin.ModelAdmin):
+    list_display = (
+        ContestProblem.contest.field.name,
+        ContestProblem.problem.field.name,
+        ContestProblem.points.field.name,
+        ContestProblem.order.field.name,
+    )
+    list_filter = (ContestProblem.contest.field.name,)
+    filter_horizontal = (ContestProblem.pretests.field.name,)
+
+    def get_form(self, request, obj=None, **kwargs):
+        self.edited_problem_id = obj.problem_id if obj else None
+        return super().get_form(request, obj, **kwargs)
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.name == ContestProblem.pretests.field.name:
+            kwargs['queryset'] = problems.models.TestCase.objects.filter(
+                problem_id=self.edited_problem_id,
+            )
+
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
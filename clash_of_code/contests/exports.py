@@ -0,0 +1,144 @@
+import csv
+import itertools
+import json
+
+from asgiref.sync import sync_to_async
+
+import contests.models
+import contests.standings
+import core.fields
+import submissions.models
+
+
+CHUNK_SIZE = 500
+
+CSV_FORMAT = 'csv'
+JSON_FORMAT = 'json'
+FORMATS = (CSV_FORMAT, JSON_FORMAT)
+
+CONTENT_TYPES = {
+    CSV_FORMAT: 'text/csv',
+    JSON_FORMAT: 'application/json',
+}
+
+SUBMISSION_FIELDS = [
+    'id',
+    'user__username',
+    'problem_id',
+    'problem__title',
+    'language',
+    'verdict',
+    'test_error__number',
+    'submitted_at',
+]
+SUBMITTED_AT = SUBMISSION_FIELDS.index('submitted_at')
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def get_problem_columns(contest_problems):
+    return [
+        f'{cp.order or cp.problem_id}_{column}'
+        for cp in contest_problems
+        for column in ('points', 'attempts', 'solved_at')
+    ]
+
+
+def get_standings_header(contest_problems):
+    return [
+        'rank',
+        'username',
+        'points',
+        'penalty',
+        *get_problem_columns(contest_problems),
+    ]
+
+
+def iter_standings(contest):
+    contest_problems = list(contests.standings.get_contest_problems(contest))
+    yield get_standings_header(contest_problems)
+
+    approved = contest.contestregistration_set.filter(is_approved=True)
+    rows = contest.standings_rows.filter(user_id__in=approved.values('user_id'))
+    rows = rows.order_by('-points', 'penalty', 'user_id').values_list(
+        'user_id',
+        'user__username',
+        'points',
+        'penalty',
+    )
+    rows = rows.iterator(chunk_size=CHUNK_SIZE)
+
+    # Ячейки подгружаются на каждую пачку строк, чтобы память не зависела
+    # от числа участников
+    rank = 0
+    while chunk := list(itertools.islice(rows, CHUNK_SIZE)):
+        cells = {
+            (cell.user_id, cell.problem_id): cell
+            for cell in contests.models.StandingsCell.objects.filter(
+                contest=contest,
+                user_id__in=[row[0] for row in chunk],
+            )
+        }
+        for user_id, username, points, penalty in chunk:
+            rank += 1
+            values = [rank, username, points, penalty]
+            for cp in contest_problems:
+                cell = cells.get((user_id, cp.problem_id))
+                if cell is None:
+                    values.extend([0, 0, None])
+                    continue
+
+                solved_at = cell.solved_at and cell.solved_at.isoformat()
+                values.extend([cell.points, cell.attempts, solved_at])
+
+            yield values
+
+
+def iter_submissions(contest, with_code=False):
+    fields = SUBMISSION_FIELDS + (['code'] if with_code else [])
+    yield [field.replace('__', '_') for field in fields]
+
+    rows = submissions.models.Submission.objects.filter(contest=contest)
+    rows = rows.order_by('submitted_at', 'pk').values_list(*fields)
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        values = list(row)
+        values[SUBMITTED_AT] = values[SUBMITTED_AT].isoformat()
+        if with_code:
+            values[-1] = core.fields.to_text(values[-1])
+
+        yield values
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render_json(rows):
+    header = next(rows)
+    yield '['
+    for index, row in enumerate(rows):
+        yield (',\n' if index else '\n') + json.dumps(dict(zip(header, row)))
+
+    yield '\n]\n'
+
+
+async def iter_async(chunks):
+    # Синхронный итератор Django под ASGI собирает в список целиком, поэтому
+    # выгрузка читается пачками в потоке для ORM и отдаётся по мере готовности
+    def next_batch():
+        return list(itertools.islice(chunks, CHUNK_SIZE))
+
+    while batch := await sync_to_async(next_batch)():
+        yield ''.join(batch)
+
+
+def render(rows, export_format):
+    if export_format == JSON_FORMAT:
+        return render_json(rows)
+
+    return render_csv(rows)
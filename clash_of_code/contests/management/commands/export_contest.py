@@ -0,0 +1,38 @@
+import django.core.management.base
+
+import contests.exports
+import contests.models
+
+
+class Command(django.core.management.base.BaseCommand):
+    help = 'Export contest standings or submissions as CSV or JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('contest_id', type=int)
+        parser.add_argument('data', choices=['standings', 'submissions'])
+        parser.add_argument(
+            '--format',
+            choices=contests.exports.FORMATS,
+            default=contests.exports.CSV_FORMAT,
+        )
+        parser.add_argument(
+            '--code',
+            action='store_true',
+            help='Include the source code of submissions',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            contest = contests.models.Contest.objects.get(pk=options['contest_id'])
+        except contests.models.Contest.DoesNotExist:
+            raise django.core.management.base.CommandError(
+                f'Contest {options["contest_id"]} does not exist',
+            )
+
+        if options['data'] == 'standings':
+            rows = contests.exports.iter_standings(contest)
+        else:
+            rows = contests.exports.iter_submissions(contest, options['code'])
+
+        for chunk in contests.exports.render(rows, options['format']):
+            self.stdout.write(chunk, ending='')
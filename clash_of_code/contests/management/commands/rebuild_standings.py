@@ -0,0 +1,25 @@
+import django.core.management.base
+
+import contests.models
+import contests.standings
+
+
+class Command(django.core.management.base.BaseCommand):
+    help = 'Rebuild contest standings from submission history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'contest_ids',
+            nargs='*',
+            type=int,
+            help='Contests to rebuild, all contests by default',
+        )
+
+    def handle(self, *args, **options):
+        contests_qs = contests.models.Contest.objects.order_by('pk')
+        if options['contest_ids']:
+            contests_qs = contests_qs.filter(pk__in=options['contest_ids'])
+
+        for contest in contests_qs.iterator():
+            contests.standings.rebuild(contest)
+            self.stdout.write(f'Rebuilt standings of contest {contest.pk}')
@@ -0,0 +1,100 @@
+# Generated by Django 5.2 on 2026-10-18 15:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0006_remove_contestproblem_solved_by_and_more'),
+        ('problems', '0013_problem_tests_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StandingsCell',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('solved_at', models.DateTimeField(blank=True, null=True)),
+                ('points', models.IntegerField(default=0)),
+                ('penalty', models.IntegerField(default=0)),
+                (
+                    'contest',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='standings_cells',
+                        to='contests.contest',
+                    ),
+                ),
+                (
+                    'problem',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='problems.problem',
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                'unique_together': {('contest', 'user', 'problem')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StandingsRow',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('points', models.IntegerField(default=0)),
+                ('penalty', models.IntegerField(default=0)),
+                (
+                    'contest',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='standings_rows',
+                        to='contests.contest',
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                'indexes': [
+                    models.Index(
+                        fields=['contest', '-points', 'penalty'],
+                        name='standings_row_rank_idx',
+                    )
+                ],
+                'unique_together': {('contest', 'user')},
+            },
+        ),
+    ]
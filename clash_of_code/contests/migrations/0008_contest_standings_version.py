@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0007_standings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contest',
+            name='standings_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0008_contest_standings_version'),
+        ('problems', '0014_alter_problem_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contest',
+            name='system_test_finished_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='contestproblem',
+            name='pretests',
+            field=models.ManyToManyField(
+                blank=True,
+                help_text='While the contest is running only these tests are judged, the rest of the tests are judged after the contest ends',
+                related_name='pretest_of',
+                to='problems.testcase',
+            ),
+        ),
+    ]
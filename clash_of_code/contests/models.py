@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 import django.db.models
 from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
 
 User = get_user_model()
@@ -35,6 +36,15 @@ class Contest(django.db.models.Model):
         related_name='contests_participated',
         blank=True,
     )
+    standings_version = django.db.models.PositiveIntegerField(
+        default=0,
+        editable=False,
+    )
+    system_test_finished_at = django.db.models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+    )
 
     @property
     def status(self):
@@ -67,6 +77,15 @@ class ContestProblem(django.db.models.Model):
         null=True,
         blank=True,
     )
+    pretests = django.db.models.ManyToManyField(
+        to='problems.TestCase',
+        related_name='pretest_of',
+        blank=True,
+        help_text=_(
+            'While the contest is running only these tests are judged, '
+            'the rest of the tests are judged after the contest ends',
+        ),
+    )
 
     class Meta:
         ordering = ['order']
@@ -91,3 +110,62 @@ class ContestRegistration(django.db.models.Model):
 
     class Meta:
         unique_together = ('user', 'contest')
+
+
+class StandingsRow(django.db.models.Model):
+    contest = django.db.models.ForeignKey(
+        to=Contest,
+        on_delete=django.db.models.CASCADE,
+        related_name='standings_rows',
+    )
+    user = django.db.models.ForeignKey(
+        to=User,
+        on_delete=django.db.models.CASCADE,
+    )
+    points = django.db.models.IntegerField(
+        default=0,
+    )
+    penalty = django.db.models.IntegerField(
+        default=0,
+    )
+
+    class Meta:
+        unique_together = ('contest', 'user')
+        indexes = [
+            django.db.models.Index(
+                fields=['contest', '-points', 'penalty'],
+                name='standings_row_rank_idx',
+            ),
+        ]
+
+
+class StandingsCell(django.db.models.Model):
+    contest = django.db.models.ForeignKey(
+        to=Contest,
+        on_delete=django.db.models.CASCADE,
+        related_name='standings_cells',
+    )
+    user = django.db.models.ForeignKey(
+        to=User,
+        on_delete=django.db.models.CASCADE,
+    )
+    problem = django.db.models.ForeignKey(
+        to='problems.Problem',
+        on_delete=django.db.models.CASCADE,
+    )
+    attempts = django.db.models.PositiveIntegerField(
+        default=0,
+    )
+    solved_at = django.db.models.DateTimeField(
+        null=True,
+        blank=True,
+    )
+    points = django.db.models.IntegerField(
+        default=0,
+    )
+    penalty = django.db.models.IntegerField(
+        default=0,
+    )
+
+    class Meta:
+        unique_together = ('contest', 'user', 'problem')
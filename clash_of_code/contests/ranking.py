@@ -0,0 +1,182 @@
+import bisect
+import logging
+import threading
+
+import django.conf
+import redis
+
+import contests.models
+
+
+logger = logging.getLogger(__name__)
+
+# Очки и штраф упаковываются в одно число так, что сортировка по
+# возрастанию даёт порядок (очки по убыванию, штраф по возрастанию)
+PENALTY_RANGE = 10**7
+
+APPLY_SCRIPT = """
+if redis.call('GET', KEYS[2]) == ARGV[1] then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('SET', KEYS[2], ARGV[2])
+end
+"""
+
+
+def get_score(points, penalty):
+    return -points * PENALTY_RANGE + penalty
+
+
+def get_member(user_id):
+    # Одинаковые результаты упорядочиваются по id, как в SQL
+    return f'{user_id:012d}'
+
+
+class LocalRankingBackend:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._keys = {}
+        self._ranks = {}
+
+    def get_version(self, contest_id):
+        return self._versions.get(contest_id)
+
+    def load(self, contest_id, version, rows):
+        keys = {
+            user_id: (get_score(points, penalty), user_id)
+            for user_id, points, penalty in rows
+        }
+        with self._lock:
+            self._keys[contest_id] = keys
+            self._ranks[contest_id] = sorted(keys.values())
+            self._versions[contest_id] = version
+
+    def apply(self, contest_id, version, user_id, points, penalty):
+        with self._lock:
+            if self._versions.get(contest_id) != version - 1:
+                return
+
+            keys = self._keys[contest_id]
+            ranks = self._ranks[contest_id]
+            if user_id in keys:
+                del ranks[bisect.bisect_left(ranks, keys[user_id])]
+
+            keys[user_id] = (get_score(points, penalty), user_id)
+            bisect.insort(ranks, keys[user_id])
+            self._versions[contest_id] = version
+
+    def count(self, contest_id):
+        return len(self._ranks.get(contest_id, ()))
+
+    def page(self, contest_id, start, stop):
+        with self._lock:
+            ranks = self._ranks.get(contest_id, [])
+            return [user_id for _, user_id in ranks[start:stop]]
+
+    def rank(self, contest_id, user_id):
+        with self._lock:
+            key = self._keys.get(contest_id, {}).get(user_id)
+            if key is None:
+                return None
+
+            return bisect.bisect_left(self._ranks[contest_id], key)
+
+
+class RedisRankingBackend:
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+        self.apply_script = self.client.register_script(APPLY_SCRIPT)
+
+    def get_keys(self, contest_id):
+        prefix = f'contest_standings:{contest_id}'
+        return f'{prefix}:ranks', f'{prefix}:version'
+
+    def get_version(self, contest_id):
+        version = self.client.get(self.get_keys(contest_id)[1])
+        return None if version is None else int(version)
+
+    def load(self, contest_id, version, rows):
+        ranks_key, version_key = self.get_keys(contest_id)
+        pipeline = self.client.pipeline()
+        pipeline.delete(ranks_key)
+        mapping = {
+            get_member(user_id): get_score(points, penalty)
+            for user_id, points, penalty in rows
+        }
+        if mapping:
+            pipeline.zadd(ranks_key, mapping)
+
+        pipeline.set(version_key, version)
+        pipeline.execute()
+
+    def apply(self, contest_id, version, user_id, points, penalty):
+        # Если обновление не дошло, индекс перечитается из БД при чтении,
+        # потому что его версия отстанет от версии контеста
+        try:
+            self.apply_script(
+                keys=self.get_keys(contest_id),
+                args=[
+                    version - 1,
+                    version,
+                    get_score(points, penalty),
+                    get_member(user_id),
+                ],
+            )
+        except redis.RedisError as e:
+            logger.warning(f'Не удалось обновить рейтинг контеста {contest_id}: {e}')
+
+    def count(self, contest_id):
+        return self.client.zcard(self.get_keys(contest_id)[0])
+
+    def page(self, contest_id, start, stop):
+        # ZRANGE включает правую границу, а -1 означает конец множества
+        if stop <= start:
+            return []
+
+        members = self.client.zrange(self.get_keys(contest_id)[0], start, stop - 1)
+        return [int(member) for member in members]
+
+    def rank(self, contest_id, user_id):
+        return self.client.zrank(self.get_keys(contest_id)[0], get_member(user_id))
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend():
+    url = django.conf.settings.STANDINGS_REDIS_URL
+    with _backends_lock:
+        if url not in _backends:
+            if url:
+                _backends[url] = RedisRankingBackend(url)
+            else:
+                _backends[url] = LocalRankingBackend()
+
+        return _backends[url]
+
+
+class RankedUsers:
+    def __init__(self, backend, contest_id):
+        self.backend = backend
+        self.contest_id = contest_id
+
+    def __len__(self):
+        return self.backend.count(self.contest_id)
+
+    def __getitem__(self, index):
+        return self.backend.page(self.contest_id, index.start, index.stop)
+
+
+def ensure(contest):
+    backend = get_backend()
+    version = backend.get_version(contest.pk)
+    if version is None or version < contest.standings_version:
+        approved = contest.contestregistration_set.filter(is_approved=True)
+        rows = contests.models.StandingsRow.objects.filter(
+            contest=contest,
+            user_id__in=approved.values('user_id'),
+        ).values_list('user_id', 'points', 'penalty')
+        backend.load(contest.pk, contest.standings_version, rows.iterator())
+
+    return backend
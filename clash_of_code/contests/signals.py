@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+import django.db.transaction
+from django.dispatch import receiver
+
+import contests.models
+import contests.standings
+
+
+@receiver(post_save, sender=contests.models.ContestRegistration)
+def create_standings_row(sender, instance, created, **kwargs):
+    if created:
+        contests.models.StandingsRow.objects.get_or_create(
+            contest_id=instance.contest_id,
+            user_id=instance.user_id,
+        )
+
+
+@receiver(post_save, sender=contests.models.ContestRegistration)
+@receiver(post_delete, sender=contests.models.ContestRegistration)
+def update_standings_version(sender, instance, **kwargs):
+    contests.standings.bump_version(instance.contest_id)
+
+
+def rebuild_standings(contest_id):
+    contest = contests.models.Contest.objects.filter(pk=contest_id).first()
+    # При удалении контеста его задачи удаляются каскадом вместе с ним
+    if contest is not None:
+        contests.standings.rebuild(contest)
+
+
+@receiver(post_save, sender=contests.models.ContestProblem)
+@receiver(post_delete, sender=contests.models.ContestProblem)
+def update_standings_on_problem_change(sender, instance, **kwargs):
+    # Баллы ячеек считаются от баллов задачи, поэтому смена набора задач
+    # или их стоимости пересчитывает таблицу и меняет её версию
+    contest_id = instance.contest_id
+    django.db.transaction.on_commit(lambda: rebuild_standings(contest_id))
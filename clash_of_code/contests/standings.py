@@ -0,0 +1,261 @@
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery, Sum
+import django.db.transaction
+from django.utils import timezone
+
+import contests.models
+import contests.ranking
+import problems.models
+import submissions.models
+
+
+WRONG_ATTEMPT_PENALTY = 20
+
+
+def get_contest_problems(contest):
+    return contest.contestproblem_set.select_related('problem').order_by('order')
+
+
+def get_first_accept():
+    first_accept = submissions.models.Submission.objects.filter(
+        contest_id=OuterRef('contest_id'),
+        user_id=OuterRef('user_id'),
+        problem_id=OuterRef('problem_id'),
+        verdict=problems.models.VerdictChoice.Accept,
+    )
+    return Subquery(first_accept.order_by('submitted_at').values('submitted_at')[:1])
+
+
+def get_cell_stats(contest, problem_ids, user_id=None):
+    submissions_qs = submissions.models.Submission.objects.filter(
+        contest=contest,
+        problem_id__in=problem_ids,
+    )
+    if user_id is not None:
+        submissions_qs = submissions_qs.filter(user_id=user_id)
+
+    # Попытки считаются до первого AC включительно, поэтому посылки после
+    # него отбрасываются до группировки
+    before_accept = Q(first_accept__isnull=True) | Q(
+        submitted_at__lte=F('first_accept'),
+    )
+    accepted = Q(verdict=problems.models.VerdictChoice.Accept)
+    # Сбой проверки, как и пропущенная посылка, не считается попыткой
+    skipped = Q(
+        verdict__in=(
+            problems.models.VerdictChoice.Skipped,
+            problems.models.VerdictChoice.Judge_error,
+        ),
+    )
+    rows = submissions_qs.annotate(first_accept=get_first_accept()).filter(
+        before_accept,
+    )
+    rows = (
+        rows.order_by()
+        .values('user_id', 'problem_id')
+        .annotate(
+            attempts=Count('id', filter=~skipped),
+            solved_at=Min('submitted_at', filter=accepted),
+            score=Max('score', filter=~skipped),
+        )
+    )
+    return {
+        (row['user_id'], row['problem_id']): (
+            row['attempts'],
+            row['solved_at'],
+            row['score'],
+        )
+        for row in rows
+    }
+
+
+def get_score(contest, contest_problem, attempts, solved_at, score=None):
+    # Задача с группами тестов даёт часть баллов и без полного решения
+    if solved_at is None:
+        return int(contest_problem.points * (score or 0)), 0
+
+    penalty_time = int((solved_at - contest.start_time).total_seconds() // 60)
+    penalty = penalty_time + WRONG_ATTEMPT_PENALTY * (attempts - 1)
+    return max(0, contest_problem.points - penalty), penalty
+
+
+def make_cell(contest, contest_problem, user_id, attempts, solved_at, score=None):
+    points, penalty = get_score(
+        contest,
+        contest_problem,
+        attempts,
+        solved_at,
+        score,
+    )
+    return contests.models.StandingsCell(
+        contest=contest,
+        user_id=user_id,
+        problem_id=contest_problem.problem_id,
+        attempts=attempts,
+        solved_at=solved_at,
+        points=points,
+        penalty=penalty,
+    )
+
+
+def update_totals(contest, user_id):
+    totals = contests.models.StandingsCell.objects.filter(
+        contest=contest,
+        user_id=user_id,
+    ).aggregate(points=Sum('points'), penalty=Sum('penalty'))
+    contests.models.StandingsRow.objects.filter(
+        contest=contest,
+        user_id=user_id,
+    ).update(points=totals['points'] or 0, penalty=totals['penalty'] or 0)
+
+
+def bump_version(contest_id):
+    contests.models.Contest.objects.filter(pk=contest_id).update(
+        standings_version=F('standings_version') + 1,
+    )
+
+
+def update_cell(contest, user_id, problem_id):
+    contest_problem = contest.contestproblem_set.filter(problem_id=problem_id).first()
+    if contest_problem is None:
+        return
+
+    with django.db.transaction.atomic():
+        # Блокировка строки итогов упорядочивает параллельные вердикты
+        # одного участника
+        contests.models.StandingsRow.objects.get_or_create(
+            contest=contest,
+            user_id=user_id,
+        )
+        contests.models.StandingsRow.objects.select_for_update().get(
+            contest=contest,
+            user_id=user_id,
+        )
+
+        stats = get_cell_stats(contest, [problem_id], user_id)
+        values = stats.get((user_id, problem_id), (0, None, None))
+        cell = make_cell(contest, contest_problem, user_id, *values)
+        contests.models.StandingsCell.objects.update_or_create(
+            contest=contest,
+            user_id=user_id,
+            problem_id=problem_id,
+            defaults={
+                'attempts': cell.attempts,
+                'solved_at': cell.solved_at,
+                'points': cell.points,
+                'penalty': cell.penalty,
+            },
+        )
+        update_totals(contest, user_id)
+        bump_version(contest.pk)
+        publish_row(contest, user_id)
+
+
+def publish_row(contest, user_id):
+    approved = contest.contestregistration_set.filter(
+        user_id=user_id,
+        is_approved=True,
+    )
+    if not approved.exists():
+        return
+
+    row = contests.models.StandingsRow.objects.select_related('contest').get(
+        contest=contest,
+        user_id=user_id,
+    )
+    django.db.transaction.on_commit(
+        lambda: contests.ranking.get_backend().apply(
+            contest.pk,
+            row.contest.standings_version,
+            user_id,
+            row.points,
+            row.penalty,
+        ),
+    )
+
+
+def rebuild(contest):
+    by_problem = {cp.problem_id: cp for cp in get_contest_problems(contest)}
+    stats = get_cell_stats(contest, list(by_problem))
+    user_ids = set(
+        contest.contestregistration_set.values_list('user_id', flat=True),
+    )
+    user_ids.update(user_id for user_id, _ in stats)
+
+    with django.db.transaction.atomic():
+        contest.standings_cells.all().delete()
+        contest.standings_rows.all().delete()
+        contests.models.StandingsCell.objects.bulk_create(
+            make_cell(contest, by_problem[problem_id], user_id, *values)
+            for (user_id, problem_id), values in stats.items()
+        )
+        contests.models.StandingsRow.objects.bulk_create(
+            contests.models.StandingsRow(contest=contest, user_id=user_id)
+            for user_id in user_ids
+        )
+        for solver_id in {user_id for user_id, _ in stats}:
+            update_totals(contest, solver_id)
+
+        bump_version(contest.pk)
+
+
+def get_cell(cell, time_diff):
+    if cell.solved_at is None:
+        return {
+            'verdict': problems.models.VerdictChoice.Wrong_answer,
+            'points': cell.points,
+            'attempts': cell.attempts,
+        }
+
+    return {
+        'verdict': problems.models.VerdictChoice.Accept,
+        'points': cell.points,
+        'penalty': cell.penalty,
+        'time': (cell.solved_at + time_diff).strftime('%H:%M'),
+        'attempts': cell.attempts,
+    }
+
+
+def get_rows(contest, user_ids):
+    rows = contest.standings_rows.filter(user_id__in=user_ids).select_related('user')
+    rows = {
+        row.user_id: row
+        for row in rows.only(
+            'points',
+            'penalty',
+            'contest_id',
+            'user__id',
+            'user__username',
+        )
+    }
+    return [rows[user_id] for user_id in user_ids if user_id in rows]
+
+
+def build_standings(contest, contest_problems, user_ids, first_rank=1, tz_offset=0):
+    rows = get_rows(contest, user_ids)
+    time_diff = timezone.timedelta(minutes=tz_offset)
+    cells = {
+        (cell.user_id, cell.problem_id): cell
+        for cell in contest.standings_cells.filter(
+            user_id__in=user_ids,
+            attempts__gt=0,
+        )
+    }
+
+    standings = []
+    for rank, row in enumerate(rows, first_rank):
+        row_cells = []
+        for cp in contest_problems:
+            cell = cells.get((row.user_id, cp.problem_id))
+            row_cells.append(None if cell is None else get_cell(cell, time_diff))
+
+        standings.append(
+            {
+                'rank': rank,
+                'user': row.user,
+                'total_points': row.points,
+                'total_penalty': row.penalty,
+                'cells': row_cells,
+            },
+        )
+
+    return standings
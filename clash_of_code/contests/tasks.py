@@ -0,0 +1,101 @@
+import logging
+
+import django.conf
+from django.db.models import OuterRef, Subquery
+import django.db.transaction
+from django.utils import timezone
+
+import clash_of_code.celery
+from clash_of_code.celery import app
+import contests.models
+import contests.standings
+import problems.models
+import submissions.models
+import submissions.tasks
+
+
+logger = logging.getLogger(__name__)
+
+PENDING_VERDICTS = (
+    problems.models.VerdictChoice.In_queue,
+    problems.models.VerdictChoice.In_processing,
+)
+CANDIDATE_VERDICTS = (problems.models.VerdictChoice.Accept, *PENDING_VERDICTS)
+
+
+def get_candidates(contest):
+    return submissions.models.Submission.objects.filter(
+        contest=contest,
+        pretests_only=True,
+        verdict__in=CANDIDATE_VERDICTS,
+    )
+
+
+def skip_earlier_accepts(contest):
+    # На системное тестирование идёт только последняя посылка участника,
+    # прошедшая претесты, более ранние больше не учитываются
+    candidates = get_candidates(contest)
+    last = candidates.filter(
+        user_id=OuterRef('user_id'),
+        problem_id=OuterRef('problem_id'),
+    ).order_by('-submitted_at', '-pk')
+    skipped = candidates.filter(verdict=problems.models.VerdictChoice.Accept).exclude(
+        pk=Subquery(last.values('pk')[:1]),
+    )
+    cells = set(skipped.values_list('user_id', 'problem_id'))
+    if not cells:
+        return
+
+    with django.db.transaction.atomic():
+        skipped.update(
+            verdict=problems.models.VerdictChoice.Skipped,
+            pretests_only=False,
+        )
+        for user_id, problem_id in cells:
+            contests.standings.update_cell(contest, user_id, problem_id)
+
+
+def enqueue_batch(contest):
+    candidates = get_candidates(contest)
+    in_flight = candidates.filter(verdict__in=PENDING_VERDICTS).count()
+    limit = django.conf.settings.JUDGE_SYSTEM_TEST_BATCH - in_flight
+    if limit <= 0:
+        return in_flight
+
+    batch = list(
+        candidates.filter(verdict=problems.models.VerdictChoice.Accept)
+        .order_by('submitted_at', 'pk')
+        .values_list('pk', flat=True)[:limit],
+    )
+    with django.db.transaction.atomic():
+        submissions.models.Submission.objects.filter(pk__in=batch).update(
+            verdict=problems.models.VerdictChoice.In_queue,
+        )
+        for submission in submissions.models.Submission.objects.filter(
+            pk__in=batch,
+        ):
+            submissions.tasks.enqueue_submission(
+                submission,
+                queue=clash_of_code.celery.SYSTEM_TEST_QUEUE,
+            )
+
+    return in_flight + len(batch)
+
+
+@app.task
+def run_system_tests():
+    finished = contests.models.Contest.objects.filter(
+        end_time__lt=timezone.now(),
+        system_test_finished_at__isnull=True,
+    )
+    for contest in finished.iterator():
+        # Посылки, которые ещё проверяются на претестах, станут кандидатами
+        # только после вердикта
+        pending = contest.submissions.filter(verdict__in=PENDING_VERDICTS)
+        skip_earlier_accepts(contest)
+        if enqueue_batch(contest) > 0 or pending.exists():
+            continue
+
+        contest.system_test_finished_at = timezone.now()
+        contest.save(update_fields=['system_test_finished_at'])
+        logger.info(f'Системное тестирование контеста {contest.pk} завершено')
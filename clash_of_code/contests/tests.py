@@ -1,13 +1,29 @@
+import csv
+import io
+import json
 from unittest import mock
+import warnings
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
+import clash_of_code.celery
 import contests.forms
 import contests.models
+import contests.ranking
+import contests.standings
+import contests.tasks
+import core.compiler
 import problems.models
+import submissions.models
+import submissions.tasks
 
 User = get_user_model()
 
@@ -408,3 +424,429 @@ class ContestViewsTests(TestCase):
             user=self.regular_user,
         )
         self.assertTrue(form.is_valid())
+
+
+class ContestStandingsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user(
+            username='creator',
+            email='creator@example.com',
+        )
+        cls.first = User.objects.create_user(
+            username='first',
+            email='first@example.com',
+        )
+        cls.second = User.objects.create_user(
+            username='second',
+            email='second@example.com',
+        )
+        cls.outsider = User.objects.create_user(
+            username='outsider',
+            email='outsider@example.com',
+        )
+
+        cls.contest = contests.models.Contest.objects.create(
+            name='Contest',
+            description='Contest description',
+            created_by=cls.creator,
+            start_time=timezone.now() - timezone.timedelta(hours=2),
+            end_time=timezone.now() + timezone.timedelta(hours=1),
+        )
+        cls.contest_problems = []
+        for order in (1, 2):
+            problem = problems.models.Problem.objects.create(
+                title=f'Problem {order}',
+                description='Problem description',
+                author=cls.creator,
+                difficult=10,
+            )
+            cls.contest_problems.append(
+                contests.models.ContestProblem.objects.create(
+                    contest=cls.contest,
+                    problem=problem,
+                    points=100,
+                    order=order,
+                ),
+            )
+
+        for user in (cls.first, cls.second):
+            contests.models.ContestRegistration.objects.create(
+                contest=cls.contest,
+                user=user,
+            )
+
+        cls.submit(cls.first, 0, 'WA', 10)
+        cls.submit(cls.first, 0, 'AC', 30)
+        cls.submit(cls.first, 0, 'WA', 40)
+        cls.submit(cls.first, 1, 'CE', 5)
+        cls.submit(cls.second, 0, 'AC', 60)
+        cls.submit(cls.outsider, 0, 'AC', 1)
+
+    @classmethod
+    def submit(cls, user, index, verdict, minutes):
+        submission = submissions.models.Submission.objects.create(
+            user=user,
+            problem=cls.contest_problems[index].problem,
+            contest=cls.contest,
+            code='print()',
+            language='python3.11',
+            verdict=verdict,
+        )
+        submissions.models.Submission.objects.filter(pk=submission.pk).update(
+            submitted_at=cls.contest.start_time + timezone.timedelta(minutes=minutes),
+        )
+
+    def setUp(self):
+        cache.clear()
+        contests.ranking._backends.clear()
+
+    def get_ranked_users(self):
+        self.contest.refresh_from_db()
+        backend = contests.ranking.ensure(self.contest)
+        return backend.page(self.contest.pk, 0, backend.count(self.contest.pk))
+
+    def get_standings(self):
+        return contests.standings.build_standings(
+            self.contest,
+            self.contest_problems,
+            self.get_ranked_users(),
+        )
+
+    def test_standings(self):
+        contests.standings.rebuild(self.contest)
+        user_ids = self.get_ranked_users()
+        with self.assertNumQueries(2):
+            standings = contests.standings.build_standings(
+                self.contest,
+                self.contest_problems,
+                user_ids,
+            )
+
+        self.assertEqual(
+            [row['user'] for row in standings],
+            [self.first, self.second],
+        )
+        first, second = standings
+        self.assertEqual((first['total_points'], first['total_penalty']), (50, 50))
+        self.assertEqual(first['cells'][0]['attempts'], 2)
+        self.assertEqual(
+            (first['cells'][1]['verdict'], first['cells'][1]['attempts']),
+            ('WA', 1),
+        )
+        self.assertEqual(second['cells'][0]['points'], 40)
+        self.assertIsNone(second['cells'][1])
+
+    def test_incremental_update_matches_rebuild(self):
+        contests.standings.rebuild(self.contest)
+        expected = self.get_standings()
+
+        self.contest.standings_cells.all().delete()
+        self.contest.standings_rows.all().update(points=0, penalty=0)
+        for user in (self.first, self.second):
+            for cp in self.contest_problems:
+                contests.standings.update_cell(self.contest, user.pk, cp.problem_id)
+
+        self.assertEqual(self.get_standings(), expected)
+
+    def test_verdict_updates_standings(self):
+        core.compiler.get_cache().clear()
+        contests.standings.rebuild(self.contest)
+        submission = submissions.models.Submission.objects.create(
+            user=self.second,
+            problem=self.contest_problems[1].problem,
+            contest=self.contest,
+            code='print()',
+            language='python3.11',
+        )
+        with mock.patch('core.core.check_tests', return_value={'status': 'AC'}):
+            with mock.patch('core.testcache.get_test_set', return_value='set'):
+                submissions.tasks.check_solution(submission.pk)
+
+        cell = self.contest.standings_cells.get(
+            user=self.second,
+            problem=submission.problem,
+        )
+        self.assertIsNotNone(cell.solved_at)
+        self.assertEqual(cell.attempts, 1)
+        row = self.contest.standings_rows.get(user=self.second)
+        self.assertEqual(row.penalty, 60 + cell.penalty)
+
+    def test_partial_score(self):
+        contests.standings.rebuild(self.contest)
+        submissions.models.Submission.objects.filter(
+            user=self.first,
+            problem=self.contest_problems[1].problem,
+        ).update(verdict='WA', score=0.25)
+        contests.standings.update_cell(
+            self.contest,
+            self.first.pk,
+            self.contest_problems[1].problem_id,
+        )
+
+        first = self.get_standings()[0]
+        self.assertEqual(first['cells'][1]['points'], 25)
+        self.assertEqual((first['total_points'], first['total_penalty']), (75, 50))
+
+    def test_rebuild_command(self):
+        call_command('rebuild_standings', self.contest.pk, stdout=io.StringIO())
+        row = self.contest.standings_rows.get(user=self.first)
+        self.assertEqual((row.points, row.penalty), (50, 50))
+
+    def test_standings_view(self):
+        contests.standings.rebuild(self.contest)
+        response = self.client.get(
+            reverse('contests:standings', args=[self.contest.pk]),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '-1')
+        self.assertEqual(len(response.context['standings']()), 2)
+
+    def test_standings_not_modified(self):
+        url = reverse('contests:standings', args=[self.contest.pk])
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        contests.standings.rebuild(self.contest)
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_problem_change_invalidates_standings(self):
+        contests.standings.rebuild(self.contest)
+        url = reverse('contests:standings', args=[self.contest.pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+        first = response.context['standings']()[0]
+        points = first['cells'][0]['points']
+
+        contest_problem = self.contest_problems[0]
+        contest_problem.points = 200
+        with self.captureOnCommitCallbacks(execute=True):
+            contest_problem.save()
+
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        first = response.context['standings']()[0]
+        self.assertGreater(first['cells'][0]['points'], points)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.contest_problems[1].delete()
+
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_standings_fragment_is_cached(self):
+        url = reverse('contests:standings', args=[self.contest.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertContains(response, 'first')
+        self.assertFalse(
+            any('standingsrow' in query['sql'] for query in queries.captured_queries),
+        )
+
+    @override_settings(STANDINGS_PAGE_SIZE=1)
+    def test_standings_pages(self):
+        contests.standings.rebuild(self.contest)
+        url = reverse('contests:standings', args=[self.contest.pk])
+
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 2)
+        self.assertEqual(
+            [row['rank'] for row in response.context['standings']()],
+            [2],
+        )
+
+        self.client.force_login(self.second)
+        response = self.client.get(url, {'page': 'me'})
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+    def test_standings_rank(self):
+        contests.standings.rebuild(self.contest)
+        self.client.force_login(self.second)
+        response = self.client.get(
+            reverse('contests:standings_me', args=[self.contest.pk]),
+        )
+        data = response.json()
+        self.assertEqual(data['rank'], 2)
+        self.assertEqual(
+            [row['username'] for row in data['neighbours']],
+            ['first', 'second'],
+        )
+
+    def test_verdict_moves_rank(self):
+        contests.standings.rebuild(self.contest)
+        self.assertEqual(self.get_ranked_users(), [self.first.pk, self.second.pk])
+
+        core.compiler.get_cache().clear()
+        accepted = submissions.models.Submission.objects.get(
+            user=self.first,
+            verdict='AC',
+        )
+        submissions.models.Submission.objects.filter(pk=accepted.pk).update(
+            verdict='IQ',
+        )
+        with (
+            mock.patch('core.core.check_tests', return_value={'status': 'WA'}),
+            mock.patch('core.testcache.get_test_set', return_value='set'),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            submissions.tasks.check_solution(accepted.pk)
+
+        backend = contests.ranking.get_backend()
+        self.contest.refresh_from_db()
+        self.assertEqual(
+            backend.get_version(self.contest.pk),
+            self.contest.standings_version,
+        )
+        self.assertEqual(self.get_ranked_users(), [self.second.pk, self.first.pk])
+
+    def test_standings_export(self):
+        contests.standings.rebuild(self.contest)
+        url = reverse('contests:standings_export', args=[self.contest.pk])
+        self.client.force_login(self.first)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.creator)
+        response = self.client.get(url)
+        rows = list(csv.reader(io.StringIO(response.getvalue().decode())))
+        self.assertTrue(response.streaming)
+        self.assertEqual(rows[0][:4], ['rank', 'username', 'points', 'penalty'])
+        self.assertEqual(rows[1][:4], ['1', 'first', '50', '50'])
+        self.assertEqual(len(rows), 3)
+
+    async def test_export_streams_under_asgi(self):
+        await sync_to_async(contests.standings.rebuild)(self.contest)
+        await self.async_client.aforce_login(self.creator)
+        with warnings.catch_warnings():
+            # Django предупреждает, когда собирает синхронный итератор целиком
+            warnings.simplefilter('error')
+            response = await self.async_client.get(
+                reverse('contests:standings_export', args=[self.contest.pk]),
+            )
+            self.assertTrue(response.is_async)
+            content = b''.join([chunk async for chunk in response.streaming_content])
+
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        self.assertEqual(rows[1][:4], ['1', 'first', '50', '50'])
+        self.assertEqual(len(rows), 3)
+
+    def test_submissions_export(self):
+        self.client.force_login(self.creator)
+        response = self.client.get(
+            reverse('contests:submissions_export', args=[self.contest.pk]),
+            {'format': 'json', 'code': '1'},
+        )
+        rows = json.loads(response.getvalue())
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['user_username'], 'outsider')
+        self.assertEqual(rows[0]['code'], 'print()')
+
+    def test_export_command(self):
+        out = io.StringIO()
+        call_command('export_contest', self.contest.pk, 'submissions', stdout=out)
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 7)
+        self.assertNotIn('code', rows[0])
+
+    def add_pretests(self):
+        contest_problem = self.contest_problems[1]
+        for number in (1, 2, 3):
+            test = problems.models.TestCase.objects.create(
+                problem=contest_problem.problem,
+                input_data='',
+                output_data='',
+                number=number,
+            )
+            if number == 1:
+                contest_problem.pretests.add(test)
+
+    def test_pretests_during_contest(self):
+        core.compiler.get_cache().clear()
+        self.add_pretests()
+        submission = submissions.models.Submission.objects.create(
+            user=self.second,
+            problem=self.contest_problems[1].problem,
+            contest=self.contest,
+            code='print()',
+            language='python3.11',
+        )
+        with (
+            mock.patch('core.core.check_tests', return_value={'status': 'AC'}),
+            mock.patch(
+                'core.testcache.get_test_set',
+                return_value='set',
+            ) as get_test_set,
+        ):
+            submissions.tasks.check_solution(submission.pk)
+
+        self.assertEqual(get_test_set.call_args.args[1], [1])
+        submission.refresh_from_db()
+        self.assertTrue(submission.pretests_only)
+
+    def test_system_tests(self):
+        self.add_pretests()
+        problem = self.contest_problems[1].problem
+        for minutes in (10, 20):
+            self.submit(self.second, 1, 'AC', minutes)
+
+        submissions.models.Submission.objects.filter(problem=problem).update(
+            pretests_only=True,
+        )
+        contests.models.Contest.objects.filter(pk=self.contest.pk).update(
+            end_time=timezone.now() - timezone.timedelta(minutes=1),
+        )
+
+        with (
+            mock.patch.object(
+                submissions.tasks.check_solution,
+                'apply_async',
+            ) as apply_async,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            contests.tasks.run_system_tests()
+
+        first, last = submissions.models.Submission.objects.filter(
+            user=self.second,
+            problem=problem,
+        ).order_by('submitted_at')
+        self.assertEqual(first.verdict, problems.models.VerdictChoice.Skipped)
+        self.assertEqual(last.verdict, problems.models.VerdictChoice.In_queue)
+        apply_async.assert_called_once_with(
+            (last.pk,),
+            queue=clash_of_code.celery.SYSTEM_TEST_QUEUE,
+        )
+        cell = self.contest.standings_cells.get(user=self.second, problem=problem)
+        self.assertEqual(cell.attempts, 1)
+
+        self.contest.refresh_from_db()
+        self.assertIsNone(self.contest.system_test_finished_at)
+        submissions.models.Submission.objects.filter(pk=last.pk).update(
+            verdict=problems.models.VerdictChoice.Accept,
+            pretests_only=False,
+        )
+        contests.tasks.run_system_tests()
+        self.contest.refresh_from_db()
+        self.assertIsNotNone(self.contest.system_test_finished_at)
+
+
+class LocalRankingBackendTests(SimpleTestCase):
+    def test_order_and_updates(self):
+        backend = contests.ranking.LocalRankingBackend()
+        backend.load(1, 5, [(1, 100, 30), (2, 100, 10), (3, 50, 0)])
+        self.assertEqual(backend.page(1, 0, 3), [2, 1, 3])
+        self.assertEqual(backend.rank(1, 3), 2)
+
+        backend.apply(1, 6, 3, 200, 40)
+        self.assertEqual(backend.page(1, 0, 2), [3, 2])
+        self.assertEqual(backend.get_version(1), 6)
+
+        backend.apply(1, 8, 1, 500, 0)
+        self.assertEqual(backend.rank(1, 1), 2)
+        self.assertEqual(backend.get_version(1), 6)
@@ -28,6 +28,21 @@ urlpatterns = [
         views.ContestStandingsView.as_view(),
         name='standings',
     ),
+    path(
+        '<int:pk>/standings/me/',
+        views.ContestStandingsRankView.as_view(),
+        name='standings_me',
+    ),
+    path(
+        '<int:pk>/standings/export/',
+        views.ContestStandingsExportView.as_view(),
+        name='standings_export',
+    ),
+    path(
+        '<int:pk>/submissions/export/',
+        views.ContestSubmissionsExportView.as_view(),
+        name='submissions_export',
+    ),
     path(
         '<int:contest_id>/problems/add/',
         views.AddProblemToContestView.as_view(),
@@ -1,20 +1,38 @@
+import functools
+
+import django.conf
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
 import django.db.models
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
+from django.views import View
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.views.generic import CreateView, DetailView, ListView, TemplateView
 
+import contests.exports
 import contests.forms
 import contests.models
+import contests.ranking
+import contests.standings
 import problems.forms
 import problems.models
 import submissions.models
 
 
+STANDINGS_CACHE_TIMEOUT = 60 * 60
+STANDINGS_NEIGHBOURS = 5
+
+
 class ContestCreateView(LoginRequiredMixin, CreateView):
     model = contests.models.Contest
     form_class = contests.forms.ContestForm
@@ -147,9 +165,52 @@ class ContestRegisterView(LoginRequiredMixin, CreateView):
         return reverse('contests:detail', kwargs={'pk': self.kwargs['pk']})
 
 
+def get_tz_offset(request):
+    return int(request.COOKIES.get('tz_offset', 0))
+
+
+def get_standings_etag(request, pk):
+    versions = contests.models.Contest.objects.filter(pk=pk).values_list(
+        'standings_version',
+        flat=True,
+    )
+    version = versions.first()
+    if version is None:
+        return None
+
+    # Кроме таблицы страница зависит от языка и шапки с пользователем
+    tz_offset = get_tz_offset(request)
+    page = request.GET.get('page', '1')
+    return f'{pk}-{version}-{page}-{tz_offset}-{get_language()}-{request.user.pk}'
+
+
+def can_export(user, contest):
+    return user.is_staff or user.is_superuser or user.id == contest.created_by_id
+
+
+def get_user_rank(backend, contest, user):
+    if not user.is_authenticated:
+        return None
+
+    return backend.rank(contest.pk, user.pk)
+
+
+@method_decorator(cache_control(private=True, no_cache=True), name='dispatch')
+@method_decorator(condition(etag_func=get_standings_etag), name='dispatch')
 class ContestStandingsView(TemplateView):
     template_name = 'contests/standings.html'
 
+    def get_page_number(self, backend, contest):
+        page = self.request.GET.get('page', 1)
+        if page == 'me':
+            rank = get_user_rank(backend, contest, self.request.user)
+            if rank is None:
+                return 1
+
+            return rank // django.conf.settings.STANDINGS_PAGE_SIZE + 1
+
+        return page
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         contest = get_object_or_404(
@@ -157,99 +218,109 @@ class ContestStandingsView(TemplateView):
             pk=self.kwargs['pk'],
         )
 
-        contest_problems = contest.contestproblem_set.select_related(
-            'problem',
-        ).order_by('order')
-        problem_ids = [cp.problem_id for cp in contest_problems]
-        registrations = (
-            contest.contestregistration_set.filter(
-                is_approved=True,
-            )
-            .select_related('user')
-            .only('user__id', 'user__username', 'contest_id')
+        backend = contests.ranking.ensure(contest)
+        paginator = Paginator(
+            contests.ranking.RankedUsers(backend, contest.pk),
+            django.conf.settings.STANDINGS_PAGE_SIZE,
         )
-        qs_sub = submissions.models.Submission
-        all_submissions = (
-            qs_sub.objects.filter(
-                contest=contest,
-                problem_id__in=problem_ids,
-                user_id__in=[r.user_id for r in registrations],
-            )
-            .select_related('user', 'problem')
-            .order_by('submitted_at')
+        page_obj = paginator.get_page(self.get_page_number(backend, contest))
+
+        # Таблица кэшируется фрагментом шаблона по версии результатов,
+        # поэтому запросы выполняются только при промахе кэша
+        contest_problems = contests.standings.get_contest_problems(contest)
+        tz_offset = get_tz_offset(self.request)
+        context.update(
+            {
+                'contest': contest,
+                'standings': functools.partial(
+                    contests.standings.build_standings,
+                    contest,
+                    contest_problems,
+                    page_obj.object_list,
+                    page_obj.start_index(),
+                    tz_offset,
+                ),
+                'problems': contest_problems,
+                'page_obj': page_obj,
+                'is_paginated': page_obj.has_other_pages(),
+                'can_export': can_export(self.request.user, contest),
+                'tz_offset': tz_offset,
+                'cache_timeout': STANDINGS_CACHE_TIMEOUT,
+            },
         )
+        return context
 
-        tz_offset = int(self.request.COOKIES.get('tz_offset', 0))
-        time_diff = timezone.timedelta(minutes=tz_offset)
 
-        standings = []
-        for registration in registrations:
-            user = registration.user
-            user_solutions = {}
-            total_points = 0
-            total_penalty = 0
-
-            for cp in contest_problems:
-                problem_subs = [
-                    s
-                    for s in all_submissions
-                    if s.user == user and s.problem == cp.problem
-                ]
-
-                ac_sub = next((s for s in problem_subs if s.verdict == 'AC'), None)
-                attempts = len(
-                    [
-                        s
-                        for s in problem_subs
-                        if not ac_sub or s.submitted_at <= ac_sub.submitted_at
-                    ],
-                )
+class ContestStandingsRankView(LoginRequiredMixin, View):
+    def get(self, request, pk):
+        contest = get_object_or_404(contests.models.Contest, pk=pk)
+        backend = contests.ranking.ensure(contest)
+        rank = get_user_rank(backend, contest, request.user)
+        if rank is None:
+            return JsonResponse({'rank': None, 'page': None, 'neighbours': []})
 
-                if ac_sub:
-                    penalty_time = (
-                        ac_sub.submitted_at - contest.start_time
-                    ).total_seconds() // 60
-                    penalty = penalty_time + (20 * (attempts - 1))
-                    points = max(0, cp.points - penalty)
-
-                    user_solutions[str(cp.problem.id)] = {
-                        'verdict': 'AC',
-                        'points': points,
-                        'penalty': penalty,
-                        'time': (ac_sub.submitted_at + time_diff).strftime('%H:%M'),
-                        'attempts': attempts,
-                        'problem_id': cp.problem.id,
-                    }
-                    total_points += points
-                    total_penalty += penalty
-                elif attempts > 0:
-                    user_solutions[str(cp.problem.id)] = {
-                        'verdict': 'WA',
-                        'points': 0,
-                        'attempts': attempts,
-                        'problem_id': cp.problem.id,
+        start = max(0, rank - STANDINGS_NEIGHBOURS)
+        user_ids = backend.page(contest.pk, start, rank + STANDINGS_NEIGHBOURS + 1)
+        rows = contests.standings.get_rows(contest, user_ids)
+        return JsonResponse(
+            {
+                'rank': rank + 1,
+                'page': rank // django.conf.settings.STANDINGS_PAGE_SIZE + 1,
+                'neighbours': [
+                    {
+                        'rank': position,
+                        'username': row.user.username,
+                        'points': row.points,
+                        'penalty': row.penalty,
                     }
+                    for position, row in enumerate(rows, start + 1)
+                ],
+            },
+        )
 
-            standings.append(
-                {
-                    'user': user,
-                    'total_points': total_points,
-                    'total_penalty': total_penalty,
-                    'solutions': user_solutions,
-                    'solutions_list': list(user_solutions.values()),
-                },
-            )
 
-        standings.sort(key=lambda x: (-x['total_points'], x['total_penalty']))
+def stream_export(request, pk, export_name, iter_rows):
+    contest = get_object_or_404(contests.models.Contest, pk=pk)
+    if not can_export(request.user, contest):
+        raise PermissionDenied(_('Not enough rights'))
+
+    export_format = request.GET.get('format', contests.exports.CSV_FORMAT)
+    if export_format not in contests.exports.FORMATS:
+        export_format = contests.exports.CSV_FORMAT
+
+    content = contests.exports.render(iter_rows(contest), export_format)
+    if isinstance(request, ASGIRequest):
+        content = contests.exports.iter_async(content)
+
+    response = StreamingHttpResponse(
+        content,
+        content_type=contests.exports.CONTENT_TYPES[export_format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="contest-{pk}-{export_name}.{export_format}"'
+    )
+    return response
+
+
+class ContestStandingsExportView(LoginRequiredMixin, View):
+    def get(self, request, pk):
+        return stream_export(
+            request,
+            pk,
+            'standings',
+            contests.exports.iter_standings,
+        )
 
-        context.update(
-            {
-                'contest': contest,
-                'standings': standings,
-                'problems': contest_problems,
-            },
+
+class ContestSubmissionsExportView(LoginRequiredMixin, View):
+    def get(self, request, pk):
+        with_code = request.GET.get('code') == '1'
+        return stream_export(
+            request,
+            pk,
+            'submissions',
+            lambda contest: contests.exports.iter_submissions(contest, with_code),
         )
-        return context
 
 
 class AddProblemToContestView(LoginRequiredMixin, CreateView):
@@ -427,7 +498,10 @@ class ContestSubmissionsView(LoginRequiredMixin, ListView):
             'user__username',
         )
         q.order_by('-submitted_at')
-        return q
+        return q.annotate(
+            execution_time=django.db.models.Max('test_results__cpu_time'),
+            memory_used=django.db.models.Max('test_results__memory'),
+        )
 
     def get_queryset(self):
         if self.is_admin:
@@ -0,0 +1,106 @@
+import base64
+import contextlib
+import hashlib
+import importlib.util
+import marshal
+import signal
+import threading
+import traceback
+
+import django.conf
+import django.core.cache
+
+import problems.models
+
+
+CACHE_ALIAS = 'judge'
+FILENAME = 'user_code.py'
+
+MAGIC = importlib.util.MAGIC_NUMBER.hex()
+
+
+class CompilationError(Exception):
+    pass
+
+
+class CompilationTimeout(Exception):
+    pass
+
+
+def get_cache():
+    return django.core.cache.caches[CACHE_ALIAS]
+
+
+def get_cache_key(code, lang):
+    digest = hashlib.sha256(code.encode('utf-8', 'surrogatepass')).hexdigest()
+    return f'bytecode:{lang}:{MAGIC}:{digest}'
+
+
+@contextlib.contextmanager
+def time_budget(seconds):
+    # Таймер через сигнал работает только в главном потоке, в остальных
+    # случаях спасает лимит на размер исходника
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def on_timeout(signum, frame):
+        raise CompilationTimeout
+
+    previous = signal.signal(signal.SIGALRM, on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def compile_python(code):
+    settings = django.conf.settings
+    size = len(code.encode('utf-8', 'surrogatepass'))
+    if size > settings.JUDGE_MAX_SOURCE_SIZE:
+        return None, (
+            f'Source code is too large: {size} bytes, '
+            f'limit is {settings.JUDGE_MAX_SOURCE_SIZE} bytes'
+        )
+
+    try:
+        with time_budget(settings.JUDGE_COMPILE_TIMEOUT):
+            program = compile(code, FILENAME, 'exec', dont_inherit=True)
+    except (SyntaxError, ValueError) as e:
+        return None, ''.join(traceback.format_exception_only(e)).rstrip()
+    except RecursionError:
+        return None, 'Source code is too complex to compile'
+    except CompilationTimeout as e:
+        # Таймаут и нехватка памяти зависят от загрузки worker, такие ошибки
+        # не попадают в кэш и при следующей проверке компиляция повторится
+        raise CompilationError('Compilation time limit exceeded') from e
+    except MemoryError as e:
+        raise CompilationError('Source code is too complex to compile') from e
+
+    return base64.b64encode(marshal.dumps(program)).decode('ascii'), None
+
+
+COMPILERS = {
+    problems.models.LanguageChoices.Python_3_11: compile_python,
+}
+
+
+def precompile(code, lang):
+    compiler = COMPILERS.get(lang)
+    if compiler is None:
+        return None
+
+    cache = get_cache()
+    key = get_cache_key(code, lang)
+    cached = cache.get(key)
+    if cached is None:
+        cached = compiler(code)
+        cache.set(key, cached)
+
+    bytecode, error = cached
+    if error is not None:
+        raise CompilationError(error)
+
+    return bytecode
@@ -1,32 +1,76 @@
 import json
+import logging
 
-import docker
+import django.conf
 
+import core.compiler
+import core.dispatcher
+import core.sandbox
+import core.testcache
 import problems.models
 
 
+logger = logging.getLogger(__name__)
+
+
+def get_checker(problem):
+    checker = {'type': problem.checker}
+    if problem.checker == problems.models.CheckerChoice.Custom:
+        checker['code'] = problem.checker_code
+    elif problem.checker_epsilon is not None:
+        checker['epsilon'] = problem.checker_epsilon
+
+    return checker
+
+
+def prepare_data(problem, code, bytecode=None, numbers=None):
+    data = {
+        'tests_manifest': core.testcache.get_test_set(problem, numbers),
+        'tests_root': core.sandbox.get_backend().tests_root,
+        'user_code': code,
+        'time_limit': problem.time_limit,
+        'memory_limit': problem.memory_limit,
+        'checker': get_checker(problem),
+        'output_limit': django.conf.settings.JUDGE_OUTPUT_LIMIT,
+        'mode': django.conf.settings.JUDGE_RUNNER_MODE,
+        'workers': django.conf.settings.JUDGE_RUNNER_WORKERS,
+    }
+    if bytecode is not None:
+        data['bytecode'] = bytecode
+        data['magic'] = core.compiler.MAGIC
+
+    return json.dumps(data).encode()
+
+
+def truncate_log(message):
+    size = django.conf.settings.JUDGE_MAX_LOG_SIZE
+    if message is None or len(message) <= size:
+        return message
+
+    return message[:size] + '\n...'
+
+
 def check_tests(data, lang):
-    client = docker.from_env()
-    if lang == problems.models.LanguageChoices.Python_3_11:
+    backend = core.sandbox.get_backend()
+    if backend.supports(lang):
         try:
-            container = client.containers.run(
-                'python3_11_image',
-                environment=data,
-                remove=True,
-                stdout=True,
-                stderr=True,
-                detach=False,
-            )
-
-            logs = container.decode('utf-8')
-            return json.loads(logs)
+            result = core.dispatcher.run(data, lang)
         except Exception as e:
+            logger.warning(f'Ошибка тестирующей системы: {e}')
             return {
                 'status': 'CE',
                 'test_error': None,
                 'message': str(e),
             }
 
+        if 'compare' in result:
+            logger.warning(
+                f'Вердикты режимов проверки различаются: {result["status"]} '
+                f'и {result["compare"]}',
+            )
+
+        return result
+
     return {
         'status': 'CE',
         'message': 'Language is not found in test system',
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+import threading
+
+import django.conf
+import docker.utils
+
+import core.sandbox
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_host_memory():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError):
+        return None
+
+
+def get_concurrency(backend):
+    settings = django.conf.settings
+    limit = settings.JUDGE_DISPATCHER_CONCURRENCY
+    if limit <= 0:
+        # Каждая проверка занимает столько ядер, сколько тестов runner гоняет
+        # параллельно, и до лимита памяти контейнера
+        workers = max(settings.JUDGE_RUNNER_WORKERS, 1)
+        limit = max((os.cpu_count() or 1) // workers, 1)
+        memory = get_host_memory()
+        if memory is not None:
+            sandbox_memory = docker.utils.parse_bytes(settings.JUDGE_CONTAINER_MEMORY)
+            limit = min(limit, max(memory // sandbox_memory, 1))
+
+    if backend.capacity is None:
+        return limit
+
+    return min(limit, backend.capacity)
+
+
+class Dispatcher:
+    # Одно событийное кольцо на процесс worker: задачи celery из разных потоков
+    # отдают ему проверки и ждут результат, а само кольцо держит запущенными
+    # не больше limit песочниц одновременно
+    def __init__(self, backend, limit):
+        self.backend = backend
+        self.limit = limit
+        self.loop = asyncio.new_event_loop()
+        self._semaphore = None
+        self._thread = threading.Thread(
+            target=self._serve,
+            name='judge-dispatcher',
+            daemon=True,
+        )
+        self._started = threading.Event()
+
+    def _serve(self):
+        asyncio.set_event_loop(self.loop)
+        self._semaphore = asyncio.Semaphore(self.limit)
+        self.loop.call_soon(self._started.set)
+        self.loop.run_forever()
+
+    def start(self):
+        self._thread.start()
+        self._started.wait()
+        logger.info(f'Диспетчер проверок запущен, песочниц: {self.limit}')
+
+    async def _run(self, payload, lang):
+        async with self._semaphore:
+            return await self.backend.run_async(payload, lang)
+
+    def run(self, payload, lang):
+        future = asyncio.run_coroutine_threadsafe(self._run(payload, lang), self.loop)
+        return future.result()
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+
+        async def cancel_all():
+            tasks = [
+                task
+                for task in asyncio.all_tasks()
+                if task is not asyncio.current_task()
+            ]
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(cancel_all(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+_dispatchers = {}
+_dispatchers_lock = threading.Lock()
+
+
+def get_dispatcher():
+    backend = core.sandbox.get_backend()
+    with _dispatchers_lock:
+        # Кольцо запускается при первой проверке, уже в процессе worker
+        # после fork, а не в родителе, где потоки не переживут fork
+        if backend not in _dispatchers:
+            limit = get_concurrency(backend)
+            # Песочниц должно хватать на все проверки, которые идут
+            # одновременно, иначе они ждут друг друга уже внутри пула
+            backend.reserve(limit)
+            dispatcher = Dispatcher(backend, limit)
+            dispatcher.start()
+            _dispatchers[backend] = dispatcher
+
+        return _dispatchers[backend]
+
+
+def run(payload, lang):
+    return get_dispatcher().run(payload, lang)
+
+
+def close_all():
+    with _dispatchers_lock:
+        dispatchers = list(_dispatchers.values())
+        _dispatchers.clear()
+
+    for dispatcher in dispatchers:
+        dispatcher.close()
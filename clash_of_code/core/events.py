@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import threading
+
+import django.conf
+from django.db.models import Max
+from django.utils import translation
+import redis
+import redis.asyncio
+
+import problems.models
+
+
+logger = logging.getLogger(__name__)
+
+EVENT_NAME = 'verdict'
+
+PENDING_VERDICTS = (
+    problems.models.VerdictChoice.In_queue,
+    problems.models.VerdictChoice.In_processing,
+)
+
+
+def get_channel(submission_id):
+    return f'submission:{submission_id}'
+
+
+def is_final(message):
+    return message['verdict'] not in PENDING_VERDICTS
+
+
+class LocalSubscription:
+    def __init__(self, backend, channels):
+        self.backend = backend
+        self.channels = channels
+        self.queue = None
+        self.loop = None
+
+    async def __aenter__(self):
+        self.queue = asyncio.Queue()
+        self.loop = asyncio.get_running_loop()
+        self.backend.add(self)
+        return self
+
+    async def __aexit__(self, *args):
+        self.backend.remove(self)
+
+    def put(self, message):
+        # Сообщение публикуется из потока задачи, а читается в цикле событий
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+        except RuntimeError:
+            pass
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class LocalEventBackend:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def add(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions.setdefault(channel, set()).add(subscription)
+
+    def remove(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscriptions = self._subscriptions.get(channel, set())
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    self._subscriptions.pop(channel, None)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+
+        for subscription in subscriptions:
+            subscription.put(message)
+
+    def subscribe(self, channels):
+        return LocalSubscription(self, channels)
+
+
+class RedisSubscription:
+    def __init__(self, url, channels):
+        self.url = url
+        self.channels = channels
+        self.client = None
+        self.pubsub = None
+
+    async def __aenter__(self):
+        self.client = redis.asyncio.Redis.from_url(self.url)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(*self.channels)
+        return self
+
+    async def __aexit__(self, *args):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+
+        return json.loads(message['data'])
+
+
+class RedisEventBackend:
+    def __init__(self, url):
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, channel, message):
+        # Страница без событий просто покажет вердикт после перезагрузки,
+        # поэтому сбой Redis не должен ронять проверку
+        try:
+            self.client.publish(channel, json.dumps(message))
+        except redis.RedisError as e:
+            logger.warning(f'Не удалось опубликовать событие {channel}: {e}')
+
+    def subscribe(self, channels):
+        return RedisSubscription(self.url, channels)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend():
+    url = django.conf.settings.EVENTS_REDIS_URL
+    with _backends_lock:
+        if url not in _backends:
+            if url:
+                _backends[url] = RedisEventBackend(url)
+            else:
+                _backends[url] = LocalEventBackend()
+
+        return _backends[url]
+
+
+def get_message(submission):
+    message = {
+        'id': submission.pk,
+        'verdict': submission.verdict,
+        'test_error': None,
+        'score': submission.score,
+        'time': None,
+        'memory': None,
+    }
+    if submission.test_error_id is not None:
+        message['test_error'] = submission.test_error.number
+
+    if is_final(message):
+        message.update(
+            submission.test_results.aggregate(
+                time=Max('cpu_time'),
+                memory=Max('memory'),
+            ),
+        )
+
+    return message
+
+
+def publish_submission(submission):
+    get_backend().publish(get_channel(submission.pk), get_message(submission))
+
+
+def format_event(message, language):
+    verdict = problems.models.VerdictChoice(message['verdict'])
+    with translation.override(language):
+        verdict_display = str(verdict.label)
+
+    message = {
+        **message,
+        'verdict_display': verdict_display,
+        'final': is_final(message),
+    }
+    return f'event: {EVENT_NAME}\ndata: {json.dumps(message)}\n\n'
+
+
+async def stream(submission_ids, get_messages, language):
+    # Подписка оформляется до чтения текущих вердиктов, чтобы не потерять
+    # переход, случившийся между загрузкой страницы и подключением
+    settings = django.conf.settings
+    channels = [get_channel(submission_id) for submission_id in submission_ids]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.EVENTS_STREAM_TIMEOUT
+    async with get_backend().subscribe(channels) as subscription:
+        pending = set(submission_ids)
+        for message in await get_messages(submission_ids):
+            yield format_event(message, language)
+            if is_final(message):
+                pending.discard(message['id'])
+
+        while pending and loop.time() < deadline:
+            message = await subscription.get(settings.EVENTS_KEEPALIVE)
+            if message is None:
+                yield ': keepalive\n\n'
+                continue
+
+            yield format_event(message, language)
+            if is_final(message):
+                pending.discard(message['id'])
@@ -0,0 +1,97 @@
+import zlib
+
+import django.db.models
+from django.db.models.query_utils import DeferredAttribute
+import django.forms
+
+
+COMPRESSION_LEVEL = 6
+
+
+def compress(text):
+    return zlib.compress(text.encode('utf-8', 'surrogatepass'), COMPRESSION_LEVEL)
+
+
+def decompress(value):
+    if not value:
+        return ''
+
+    return zlib.decompress(value).decode('utf-8', 'surrogatepass')
+
+
+def to_text(value):
+    if isinstance(value, (bytes, memoryview)):
+        return decompress(value)
+
+    return value
+
+
+class CompressedTextAttribute(DeferredAttribute):
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+
+        value = super().__get__(instance, cls)
+        # Распаковка происходит при первом обращении к полю, а не при
+        # загрузке записи
+        if isinstance(value, (bytes, memoryview)):
+            value = decompress(value)
+            instance.__dict__[self.field.attname] = value
+
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(django.db.models.BinaryField):
+    descriptor_class = CompressedTextAttribute
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.editable:
+            del kwargs['editable']
+        else:
+            kwargs['editable'] = False
+
+        return name, path, args, kwargs
+
+    def get_default(self):
+        return django.db.models.Field.get_default(self)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+
+        return bytes(value)
+
+    def to_python(self, value):
+        return to_text(value)
+
+    def get_prep_value(self, value):
+        # Запись, которую не читали, сохраняется без повторного сжатия
+        if isinstance(value, str):
+            return compress(value)
+
+        return value
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+
+        return super().get_db_prep_value(value, connection, prepared=True)
+
+    def value_to_string(self, obj):
+        return to_text(self.value_from_object(obj))
+
+    def formfield(self, **kwargs):
+        return django.db.models.Field.formfield(
+            self,
+            form_class=django.forms.CharField,
+            widget=django.forms.Textarea,
+            **kwargs,
+        )
@@ -0,0 +1,83 @@
+# Обёртка, через которую local запускает runner. Работает отдельным
+# процессом, поэтому песочница настраивается не в preexec_fn внутри
+# многопоточного worker, а здесь: пока процесс ещё root, он отделяет сеть
+# и IPC, переходит в cgroup проверки, ставит лимиты, сбрасывает права до uid
+# проверки и заменяет себя runner'ом. Django здесь не импортируется
+import argparse
+import ctypes
+import os
+from pathlib import Path
+import resource
+import sys
+
+
+# Сеть и System V IPC решению не нужны. os.unshare есть только с Python 3.12,
+# поэтому на 3.11 вызывается функция из libc
+CLONE_NEWIPC = 0x08000000
+CLONE_NEWNET = 0x40000000
+NAMESPACES = CLONE_NEWNET | CLONE_NEWIPC
+
+
+def unshare(flags):
+    if hasattr(os, 'unshare'):
+        os.unshare(flags)
+        return
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    if not hasattr(libc, 'unshare'):
+        raise OSError('unshare is not available')
+
+    if libc.unshare(flags) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+def enter_sandbox(uid, cgroup, max_processes):
+    try:
+        unshare(NAMESPACES)
+    except OSError as e:
+        # Без отдельного uid песочница и так не изолирована, о чём backend
+        # предупреждает при запуске, а с ним проверка без своих
+        # пространств имён не запускается
+        if uid is not None:
+            raise SystemExit(f'jail: unshare failed: {e}') from e
+
+    if cgroup:
+        (Path(cgroup) / 'cgroup.procs').write_text('0')
+
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    if uid is None:
+        return
+
+    # RLIMIT_NPROC считается по всем процессам uid, поэтому ставится только
+    # для выделенного пользователя
+    resource.setrlimit(resource.RLIMIT_NPROC, (max_processes, max_processes))
+    os.setgroups([])
+    os.setgid(uid)
+    os.setuid(uid)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='jail')
+    parser.add_argument('--uid', type=int)
+    parser.add_argument('--cgroup', default='')
+    parser.add_argument('--max-processes', type=int, default=64)
+    parser.add_argument('command', nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    if args.command[:1] == ['--']:
+        args.command = args.command[1:]
+
+    if not args.command:
+        parser.error('command is required')
+
+    return args
+
+
+def main(argv):
+    args = parse_args(argv)
+    enter_sandbox(args.uid, args.cgroup, args.max_processes)
+    os.execvp(args.command[0], args.command)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,335 @@
+import asyncio
+import collections
+import json
+import logging
+import socket
+import struct
+import threading
+import time
+
+import django.conf
+import docker
+
+import core.testcache
+import problems.models
+
+
+logger = logging.getLogger(__name__)
+
+IMAGES = {
+    problems.models.LanguageChoices.Python_3_11: 'python3_11_image',
+}
+
+POOL_LABEL = 'clash_of_code.judge_pool'
+TESTS_MOUNT = '/tests'
+
+# Контейнер переиспользуется, поэтому решение не должно менять ничего, что
+# переживёт сброс: корень только для чтения, runner лежит вне рабочего
+# каталога, а писать можно лишь в tmpfs, которые очищаются после проверки
+RUNNER_PATH = '/opt/judge/user_code_runner.py'
+RUNNER_COMMAND = ['python', RUNNER_PATH]
+WORKDIR = '/app'
+SANDBOX_UID = 1000
+TMPFS = {
+    WORKDIR: f'rw,nosuid,nodev,size=64m,uid={SANDBOX_UID},gid={SANDBOX_UID},mode=700',
+    '/tmp': 'rw,nosuid,nodev,size=64m,mode=1777',
+}
+RESET_COMMAND = [
+    'sh',
+    '-c',
+    'kill -9 -1; rm -rf /app/* /app/.[!.]* /tmp/* /tmp/.[!.]*; true',
+]
+
+# Вывод exec с подключённым сокетом приходит кадрами: тип потока, три
+# нулевых байта и длина
+FRAME_HEADER = struct.Struct('>BxxxL')
+STDOUT_STREAM = 1
+STDERR_STREAM = 2
+READ_SIZE = 65536
+EXIT_CODE_WAIT = 0.01
+
+STDERR_TAIL_SIZE = 4096
+
+
+class SandboxViolation(Exception):
+    pass
+
+
+def docker_available():
+    try:
+        docker.from_env().ping()
+    except (docker.errors.DockerException, OSError):
+        return False
+
+    return True
+
+
+def demux(raw):
+    streams = {STDOUT_STREAM: bytearray(), STDERR_STREAM: bytearray()}
+    offset = 0
+    while offset + FRAME_HEADER.size <= len(raw):
+        stream, size = FRAME_HEADER.unpack_from(raw, offset)
+        start = offset + FRAME_HEADER.size
+        offset = start + size
+        if stream in streams:
+            streams[stream] += raw[start:offset]
+
+    return bytes(streams[STDOUT_STREAM]), bytes(streams[STDERR_STREAM])
+
+
+def get_socket(response):
+    # exec_start(socket=True) для unix-сокета отдаёт SocketIO поверх сокета
+    return getattr(response, '_sock', response)
+
+
+def parse_output(exit_code, stdout, stderr):
+    if exit_code != 0:
+        tail = (stderr or b'')[-STDERR_TAIL_SIZE:]
+        raise SandboxViolation(
+            f'runner exited with code {exit_code}: '
+            f'{tail.decode("utf-8", "replace")}',
+        )
+
+    try:
+        return json.loads((stdout or b'').decode('utf-8'))
+    except ValueError as e:
+        raise SandboxViolation(f'invalid runner output: {e}') from e
+
+
+class PooledContainer:
+    def __init__(self, container):
+        self.container = container
+        self.jobs = 0
+
+
+class ContainerPool:
+    def __init__(
+        self,
+        client,
+        image,
+        size,
+        max_jobs,
+        tests_dir=None,
+        mem_limit=None,
+    ):
+        self.client = client
+        self.image = image
+        self.size = size
+        self.max_jobs = max_jobs
+        self.mem_limit = mem_limit
+        self.volumes = {}
+        if tests_dir is not None:
+            self.volumes[str(tests_dir)] = {'bind': TESTS_MOUNT, 'mode': 'ro'}
+
+        self._idle = collections.deque()
+        self._total = 0
+        self._condition = threading.Condition()
+
+    def _start(self):
+        container = self.client.containers.run(
+            self.image,
+            command=['sleep', 'infinity'],
+            labels={POOL_LABEL: self.image},
+            volumes=self.volumes,
+            mem_limit=self.mem_limit,
+            memswap_limit=self.mem_limit,
+            user=f'{SANDBOX_UID}:{SANDBOX_UID}',
+            read_only=True,
+            tmpfs=TMPFS,
+            cap_drop=['ALL'],
+            security_opt=['no-new-privileges'],
+            network_disabled=True,
+            auto_remove=True,
+            detach=True,
+        )
+        logger.debug(f'Запущен контейнер {container.short_id} ({self.image})')
+        return PooledContainer(container)
+
+    def _discard(self, pooled):
+        try:
+            pooled.container.kill()
+        except docker.errors.APIError as e:
+            logger.warning(f'Не удалось остановить контейнер: {e}')
+
+    def warm_up(self):
+        with self._condition:
+            while self._total < self.size:
+                self._idle.append(self._start())
+                self._total += 1
+
+    def acquire(self):
+        with self._condition:
+            while not self._idle and self._total >= self.size:
+                self._condition.wait()
+
+            if self._idle:
+                return self._idle.popleft()
+
+            self._total += 1
+
+        try:
+            return self._start()
+        except Exception:
+            with self._condition:
+                self._total -= 1
+                self._condition.notify()
+
+            raise
+
+    def release(self, pooled, recycle=False):
+        pooled.jobs += 1
+        if not recycle and pooled.jobs < self.max_jobs:
+            try:
+                self._reset(pooled)
+            except SandboxViolation as e:
+                logger.warning(f'Контейнер не прошёл сброс: {e}')
+                recycle = True
+
+        if recycle or pooled.jobs >= self.max_jobs:
+            self._discard(pooled)
+            with self._condition:
+                self._total -= 1
+                self._condition.notify()
+
+            return
+
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    def _reset(self, pooled):
+        try:
+            exit_code, _ = pooled.container.exec_run(RESET_COMMAND)
+        except docker.errors.APIError as e:
+            raise SandboxViolation(str(e)) from e
+
+        if exit_code != 0:
+            raise SandboxViolation(f'reset exited with code {exit_code}')
+
+    def _create_exec(self, pooled):
+        # Задание уходит runner'у через stdin: в переменной окружения оно
+        # упирается в лимит длины одного аргумента execve в 128 КиБ
+        return self.client.api.exec_create(
+            pooled.container.id,
+            RUNNER_COMMAND,
+            stdin=True,
+            workdir=WORKDIR,
+        )
+
+    def run(self, payload):
+        pooled = self.acquire()
+        recycle = True
+        try:
+            api = self.client.api
+            exec_id = self._create_exec(pooled)
+            response = api.exec_start(exec_id, socket=True)
+            sock = get_socket(response)
+            try:
+                sock.sendall(payload)
+                sock.shutdown(socket.SHUT_WR)
+                raw = bytearray()
+                while chunk := sock.recv(READ_SIZE):
+                    raw += chunk
+            finally:
+                response.close()
+                sock.close()
+
+            info = api.exec_inspect(exec_id)
+            while info['Running']:
+                # Поток закрывается чуть раньше, чем демон запишет код выхода
+                time.sleep(EXIT_CODE_WAIT)
+                info = api.exec_inspect(exec_id)
+
+            result = parse_output(info['ExitCode'], *demux(raw))
+            recycle = False
+            return result
+        finally:
+            self.release(pooled, recycle=recycle)
+
+    async def run_async(self, payload):
+        # Вызовы Docker API короткие и уходят в пул потоков, а задание и вывод
+        # runner идут через подключённый к exec сокет в событийном кольце, так
+        # что ожидание не занимает поток и не опрашивает демон
+        pooled = await asyncio.to_thread(self.acquire)
+        recycle = True
+        try:
+            api = self.client.api
+            exec_id = await asyncio.to_thread(self._create_exec, pooled)
+            response = await asyncio.to_thread(api.exec_start, exec_id, socket=True)
+            sock = get_socket(response)
+            try:
+                sock.setblocking(False)
+                loop = asyncio.get_running_loop()
+                await loop.sock_sendall(sock, payload)
+                sock.shutdown(socket.SHUT_WR)
+                raw = bytearray()
+                while chunk := await loop.sock_recv(sock, READ_SIZE):
+                    raw += chunk
+            finally:
+                response.close()
+                sock.close()
+
+            info = await asyncio.to_thread(api.exec_inspect, exec_id)
+            while info['Running']:
+                await asyncio.sleep(EXIT_CODE_WAIT)
+                info = await asyncio.to_thread(api.exec_inspect, exec_id)
+
+            result = parse_output(info['ExitCode'], *demux(raw))
+            recycle = False
+            return result
+        finally:
+            await asyncio.to_thread(self.release, pooled, recycle)
+
+    def resize(self, size):
+        with self._condition:
+            if size > self.size:
+                self.size = size
+                self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+
+        for pooled in idle:
+            self._discard(pooled)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(lang, size=None):
+    size = max(size or 0, django.conf.settings.JUDGE_POOL_SIZE)
+    with _pools_lock:
+        if lang in _pools:
+            _pools[lang].resize(size)
+        else:
+            _pools[lang] = ContainerPool(
+                client=docker.from_env(),
+                image=IMAGES[lang],
+                size=size,
+                max_jobs=django.conf.settings.JUDGE_POOL_MAX_JOBS,
+                tests_dir=core.testcache.get_root().resolve(),
+                mem_limit=django.conf.settings.JUDGE_CONTAINER_MEMORY,
+            )
+
+        return _pools[lang]
+
+
+def warm_up():
+    for lang in IMAGES:
+        try:
+            get_pool(lang).warm_up()
+        except docker.errors.DockerException as e:
+            logger.error(f'Не удалось прогреть пул для {lang}: {e}')
+
+
+def close_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+    for pool in pools:
+        pool.close()
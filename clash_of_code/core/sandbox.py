@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+
+import django.conf
+from django.core.exceptions import ImproperlyConfigured
+
+import core.jail
+import core.pool
+import core.testcache
+import problems.models
+
+
+logger = logging.getLogger(__name__)
+
+DOCKER_BACKEND = 'docker'
+LOCAL_BACKEND = 'local'
+
+# Локальная песочница запускает тот же runner, что лежит в образах
+RUNNERS_DIR = 'docker/images'
+RUNNERS = {
+    problems.models.LanguageChoices.Python_3_11: 'python/user_code_runner.py',
+}
+
+# Runner запускается через обёртку, которая настраивает песочницу в самом
+# дочернем процессе
+JAIL = str(Path(core.jail.__file__).resolve())
+
+CGROUP_FILES = ('cgroup.procs', 'cgroup.subtree_control', 'cgroup.threads')
+
+
+class DockerSandboxBackend:
+    tests_root = core.pool.TESTS_MOUNT
+    # Пул подстраивается под диспетчер, а не ограничивает его
+    capacity = None
+
+    def __init__(self):
+        self.pool_size = None
+
+    def supports(self, lang):
+        return lang in core.pool.IMAGES
+
+    def reserve(self, limit):
+        self.pool_size = limit
+
+    def run(self, payload, lang):
+        return core.pool.get_pool(lang, self.pool_size).run(payload)
+
+    async def run_async(self, payload, lang):
+        pool = core.pool.get_pool(lang, self.pool_size)
+        return await pool.run_async(payload)
+
+    def warm_up(self):
+        core.pool.warm_up()
+
+    def close(self):
+        core.pool.close_all()
+
+
+class LocalSandboxBackend:
+    # Runner запускается прямо на узле. Если заданы uid, каждая проверка
+    # получает свой uid из пула, по нему же потом добиваются все её процессы
+    def __init__(
+        self,
+        python='',
+        uids=(),
+        scratch_dir='',
+        cgroup_root='',
+        max_processes=64,
+        allow_shared_uid=False,
+    ):
+        # Без отдельных uid решение работает с правами самого worker: видит
+        # его файлы и может добить его процессы. Так можно только явно
+        if not uids and not allow_shared_uid:
+            raise ImproperlyConfigured(
+                'Песочнице local нужны JUDGE_LOCAL_UIDS, запуск под uid worker '
+                'включается JUDGE_LOCAL_ALLOW_SHARED_UID',
+            )
+
+        if not uids:
+            logger.warning(
+                'Песочница local запускает решения под uid worker без '
+                'отдельных пространств имён',
+            )
+
+        self.python = python or sys.executable
+        self.uids = None
+        if uids:
+            self.uids = queue.Queue()
+            for uid in uids:
+                self.uids.put(uid)
+
+        self.scratch_dir = scratch_dir or None
+        self.cgroup_root = Path(cgroup_root) if cgroup_root else None
+        self.max_processes = max_processes
+        # Одновременно идёт не больше проверок, чем выделено uid
+        self.capacity = len(uids) or None
+        self._cgroup_lock = threading.Lock()
+
+    @property
+    def tests_root(self):
+        return str(core.testcache.get_root().resolve())
+
+    def supports(self, lang):
+        return lang in RUNNERS
+
+    def get_runner(self, lang):
+        return str(django.conf.settings.BASE_DIR / RUNNERS_DIR / RUNNERS[lang])
+
+    def get_command(self, lang, uid, cgroup):
+        command = [self.python, '-I', JAIL, '--max-processes', str(self.max_processes)]
+        if uid is not None:
+            command += ['--uid', str(uid)]
+
+        if cgroup:
+            command += ['--cgroup', cgroup]
+
+        return [*command, '--', self.python, self.get_runner(lang)]
+
+    def create_cgroup(self, name, uid):
+        if self.cgroup_root is None:
+            return ''
+
+        group = self.cgroup_root / name
+        try:
+            with self._cgroup_lock:
+                (self.cgroup_root / 'cgroup.subtree_control').write_text('+memory')
+
+            group.mkdir()
+            if uid is not None:
+                for path in (group, *(group / file for file in CGROUP_FILES)):
+                    os.chown(path, uid, uid)
+        except OSError as e:
+            logger.warning(f'Не удалось создать cgroup {group}: {e}')
+            return ''
+
+        return str(group)
+
+    def remove_cgroup(self, group):
+        if not group:
+            return
+
+        group = Path(group)
+        kill = group / 'cgroup.kill'
+        if kill.exists():
+            kill.write_text('1')
+
+        for child in group.iterdir():
+            if child.is_dir():
+                child.rmdir()
+
+        group.rmdir()
+
+    def kill_processes(self, process, uid):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+        # Процессы, ушедшие в свою сессию, находятся по uid
+        if uid is not None:
+            subprocess.run(['kill', '-9', '-1'], user=uid, check=False)
+
+    def get_environment(self, scratch, cgroup):
+        return {
+            'PATH': os.defpath,
+            'HOME': scratch,
+            'TMPDIR': scratch,
+            'JUDGE_CGROUP_ROOT': cgroup,
+            'PYTHONDONTWRITEBYTECODE': '1',
+        }
+
+    def prepare(self, uid):
+        scratch = tempfile.mkdtemp(prefix='judge-', dir=self.scratch_dir)
+        if uid is not None:
+            try:
+                os.chown(scratch, uid, uid)
+            except OSError:
+                shutil.rmtree(scratch, ignore_errors=True)
+                raise
+
+        return scratch, self.create_cgroup(Path(scratch).name, uid)
+
+    def cleanup(self, scratch, cgroup):
+        try:
+            self.remove_cgroup(cgroup)
+        except OSError as e:
+            logger.warning(f'Не удалось удалить cgroup {cgroup}: {e}')
+
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    def get_process_options(self, scratch, cgroup):
+        return {
+            'cwd': scratch,
+            'env': self.get_environment(scratch, cgroup),
+            'stdin': subprocess.PIPE,
+            'stdout': subprocess.PIPE,
+            'stderr': subprocess.PIPE,
+            'start_new_session': True,
+        }
+
+    def execute(self, payload, lang, uid):
+        scratch, cgroup = self.prepare(uid)
+        try:
+            process = subprocess.Popen(
+                self.get_command(lang, uid, cgroup),
+                **self.get_process_options(scratch, cgroup),
+            )
+            try:
+                stdout, stderr = process.communicate(payload)
+            finally:
+                self.kill_processes(process, uid)
+
+            return core.pool.parse_output(process.returncode, stdout, stderr)
+        finally:
+            self.cleanup(scratch, cgroup)
+
+    async def execute_async(self, payload, lang, uid):
+        scratch, cgroup = await asyncio.to_thread(self.prepare, uid)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self.get_command(lang, uid, cgroup),
+                **self.get_process_options(scratch, cgroup),
+            )
+            try:
+                stdout, stderr = await process.communicate(payload)
+            finally:
+                await asyncio.to_thread(self.kill_processes, process, uid)
+
+            return core.pool.parse_output(process.returncode, stdout, stderr)
+        finally:
+            await asyncio.to_thread(self.cleanup, scratch, cgroup)
+
+    def run(self, payload, lang):
+        if self.uids is None:
+            return self.execute(payload, lang, None)
+
+        uid = self.uids.get()
+        try:
+            return self.execute(payload, lang, uid)
+        finally:
+            self.uids.put(uid)
+
+    async def run_async(self, payload, lang):
+        if self.uids is None:
+            return await self.execute_async(payload, lang, None)
+
+        uid = await asyncio.to_thread(self.uids.get)
+        try:
+            return await self.execute_async(payload, lang, uid)
+        finally:
+            self.uids.put(uid)
+
+    def reserve(self, limit):
+        pass
+
+    def warm_up(self):
+        pass
+
+    def close(self):
+        pass
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def create_backend(name):
+    settings = django.conf.settings
+    if name == DOCKER_BACKEND:
+        return DockerSandboxBackend()
+
+    if name == LOCAL_BACKEND:
+        return LocalSandboxBackend(
+            python=settings.JUDGE_LOCAL_PYTHON,
+            uids=settings.JUDGE_LOCAL_UIDS,
+            scratch_dir=settings.JUDGE_LOCAL_SCRATCH_DIR,
+            cgroup_root=settings.JUDGE_LOCAL_CGROUP_ROOT,
+            max_processes=settings.JUDGE_LOCAL_MAX_PROCESSES,
+            allow_shared_uid=settings.JUDGE_LOCAL_ALLOW_SHARED_UID,
+        )
+
+    raise ImproperlyConfigured(f'Неизвестная песочница: {name}')
+
+
+def get_backend(name=None):
+    name = name or django.conf.settings.JUDGE_SANDBOX_BACKEND
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = create_backend(name)
+
+        return _backends[name]
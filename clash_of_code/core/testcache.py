@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+import tempfile
+
+import django.conf
+
+import problems.testdata
+
+BLOBS_DIR = 'blobs'
+SETS_DIR = 'sets'
+
+FILL_CHUNK_SIZE = 100
+
+# mkstemp создаёт файлы только для владельца, а локальная песочница читает
+# кэш под другим uid
+FILE_MODE = 0o644
+
+
+def get_root():
+    root = Path(django.conf.settings.JUDGE_TEST_CACHE_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def write_atomic(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        os.fchmod(fd, FILE_MODE)
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(content)
+
+        Path(tmp_name).replace(path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def copy_atomic(path, source):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        os.fchmod(fd, FILE_MODE)
+        with os.fdopen(fd, 'wb') as tmp:
+            shutil.copyfileobj(source, tmp)
+
+        Path(tmp_name).replace(path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def store_blob(root, digest):
+    # Имена блобов совпадают с хешами в хранилище данных тестов, поэтому
+    # одинаковые тесты разных задач копируются один раз
+    digest = digest or problems.testdata.EMPTY_DIGEST
+    name = f'{BLOBS_DIR}/{digest[:2]}/{digest}'
+    path = root / name
+    if path.exists():
+        return name
+
+    if digest == problems.testdata.EMPTY_DIGEST:
+        write_atomic(path, b'')
+        return name
+
+    with problems.testdata.open_file(digest) as source:
+        copy_atomic(path, source)
+
+    return name
+
+
+def get_subset_name(numbers):
+    if numbers is None:
+        return 'all'
+
+    digest = hashlib.sha256(','.join(map(str, sorted(numbers))).encode())
+    return digest.hexdigest()[:16]
+
+
+def get_set_name(problem, numbers=None):
+    name = f'{problem.pk}-{problem.tests_version}'
+    if numbers is not None:
+        name = f'{name}-{get_subset_name(numbers)}'
+
+    return f'{SETS_DIR}/{name}.json'
+
+
+def get_groups(problem):
+    # Группы проверяются по возрастанию номера, поэтому зависимость от
+    # группы с большим номером не учитывается
+    groups = problem.groups.order_by('number').prefetch_related('depends_on')
+    return [
+        {
+            'number': group.number,
+            'points': group.points,
+            'depends_on': sorted(
+                dependency.number
+                for dependency in group.depends_on.all()
+                if dependency.number < group.number
+            ),
+        }
+        for group in groups
+    ]
+
+
+def get_test_set(problem, numbers=None):
+    root = get_root()
+    name = get_set_name(problem, numbers)
+    if (root / name).exists():
+        return name
+
+    tests = problem.tests.order_by('number')
+    if numbers is not None:
+        tests = tests.filter(number__in=numbers)
+
+    manifest = [
+        {
+            'number': number,
+            'group': group,
+            'input': store_blob(root, input_hash),
+            'output': store_blob(root, output_hash),
+        }
+        for number, group, input_hash, output_hash in tests.values_list(
+            'number',
+            'group__number',
+            'input_hash',
+            'output_hash',
+        ).iterator(chunk_size=FILL_CHUNK_SIZE)
+    ]
+    used = {test['group'] for test in manifest}
+    groups = [group for group in get_groups(problem) if group['number'] in used]
+    write_atomic(
+        root / name,
+        json.dumps({'tests': manifest, 'groups': groups}).encode('utf-8'),
+    )
+    return name
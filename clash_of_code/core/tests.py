@@ -0,0 +1,865 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import importlib.util
+import json
+from pathlib import Path
+import socket
+import tempfile
+import unittest
+from unittest import mock
+
+import django.conf
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+import django.test
+
+import core.compiler
+import core.core
+import core.dispatcher
+import core.fields
+import core.jail
+import core.pool
+import core.sandbox
+import core.testcache
+import problems.models
+import submissions.models
+
+
+def load_runner():
+    path = django.conf.settings.BASE_DIR / 'docker/images/python/user_code_runner.py'
+    spec = importlib.util.spec_from_file_location('user_code_runner', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+runner = load_runner()
+
+# Предел длины одной строки окружения или аргумента execve в Linux
+MAX_ARG_STRLEN = 128 * 1024
+
+
+class ContainerPoolTests(django.test.SimpleTestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        self.client.containers.run.side_effect = self.new_container
+        self.client.api.exec_create.return_value = {'Id': 'runner'}
+        self.client.api.exec_start.side_effect = self.exec_start
+        self.client.api.exec_inspect.return_value = {'Running': False, 'ExitCode': 0}
+        self.containers = []
+        self.daemons = []
+        result = {'status': 'AC', 'test_error': None, 'message': None}
+        self.output = json.dumps(result).encode(), b''
+
+    def new_container(self, *args, **kwargs):
+        container = mock.Mock()
+        container.exec_run.return_value = 0, b''
+        self.containers.append(container)
+        return container
+
+    def exec_start(self, exec_id, **kwargs):
+        # Второй конец пары играет демон Docker: он уже записал вывод runner
+        # кадрами и закрыл свою сторону
+        daemon, worker = socket.socketpair()
+        self.addCleanup(daemon.close)
+        stdout, stderr = self.output
+        for stream, data in ((2, stderr), (1, stdout)):
+            daemon.sendall(core.pool.FRAME_HEADER.pack(stream, len(data)) + data)
+
+        daemon.shutdown(socket.SHUT_WR)
+        self.daemons.append(daemon)
+        return worker
+
+    def received(self):
+        data = bytearray()
+        while chunk := self.daemons[-1].recv(core.pool.READ_SIZE):
+            data += chunk
+
+        return bytes(data)
+
+    def get_pool(self, size=1, max_jobs=10):
+        return core.pool.ContainerPool(
+            client=self.client,
+            image='python3_11_image',
+            size=size,
+            max_jobs=max_jobs,
+        )
+
+    def test_warm_up_starts_containers(self):
+        pool = self.get_pool(size=3)
+        pool.warm_up()
+        self.assertEqual(len(self.containers), 3)
+
+    def test_container_is_locked_down(self):
+        self.get_pool().warm_up()
+        options = self.client.containers.run.call_args.kwargs
+        self.assertTrue(options['read_only'])
+        self.assertTrue(options['network_disabled'])
+        self.assertEqual(options['cap_drop'], ['ALL'])
+        self.assertNotIn(options['user'].split(':')[0], ('', '0', 'root'))
+        self.assertEqual(set(options['tmpfs']), {core.pool.WORKDIR, '/tmp'})
+        self.assertFalse(core.pool.RUNNER_PATH.startswith(core.pool.WORKDIR))
+
+    def test_container_is_reused(self):
+        pool = self.get_pool()
+        for _ in range(3):
+            self.assertEqual(pool.run(b'{}')['status'], 'AC')
+
+        self.assertEqual(len(self.containers), 1)
+
+    def test_container_is_recycled_after_max_jobs(self):
+        pool = self.get_pool(max_jobs=2)
+        for _ in range(4):
+            pool.run(b'{}')
+
+        self.assertEqual(len(self.containers), 2)
+        self.containers[0].kill.assert_called_once()
+
+    def test_container_is_recycled_on_violation(self):
+        pool = self.get_pool()
+        self.client.api.exec_inspect.return_value = {'Running': False, 'ExitCode': 137}
+        self.output = b'', b'killed'
+
+        with self.assertRaises(core.pool.SandboxViolation):
+            pool.run(b'{}')
+
+        self.containers[0].kill.assert_called_once()
+        self.assertEqual(pool._total, 0)
+
+    def test_payload_is_sent_on_stdin(self):
+        pool = self.get_pool()
+        self.assertEqual(pool.run(b'{"user_code": ""}')['status'], 'AC')
+        self.assertEqual(self.received(), b'{"user_code": ""}')
+        kwargs = self.client.api.exec_create.call_args.kwargs
+        self.assertTrue(kwargs['stdin'])
+        self.assertNotIn('environment', kwargs)
+
+    @django.test.override_settings(JUDGE_MAX_LOG_SIZE=10)
+    def test_log_is_truncated(self):
+        self.assertEqual(core.core.truncate_log('short'), 'short')
+        self.assertIsNone(core.core.truncate_log(None))
+        self.assertEqual(core.core.truncate_log('1' * 100), '1' * 10 + '\n...')
+
+    def test_check_tests_unknown_language(self):
+        result = core.core.check_tests({}, 'brainfuck')
+        self.assertEqual(result['status'], 'CE')
+
+    def test_run_async_reads_attached_stream(self):
+        pool = self.get_pool()
+        self.output = json.dumps({'status': 'AC'}).encode(), b'warning'
+
+        result = asyncio.run(pool.run_async(b'{}'))
+
+        self.assertEqual(result['status'], 'AC')
+        self.assertEqual(self.received(), b'{}')
+        self.client.api.exec_start.assert_called_once_with(
+            {'Id': 'runner'},
+            socket=True,
+        )
+        self.client.api.exec_inspect.assert_called_once()
+        self.assertEqual(pool._total, 1)
+
+    def test_pool_grows_to_dispatcher_limit(self):
+        pool = self.get_pool(size=1)
+        pool.resize(4)
+        pool.resize(2)
+        self.assertEqual(pool.size, 4)
+        self.assertIsNone(core.sandbox.DockerSandboxBackend().capacity)
+
+    def test_run_async_recycles_on_violation(self):
+        pool = self.get_pool()
+        self.client.api.exec_inspect.return_value = {'Running': False, 'ExitCode': 1}
+        self.output = b'', b'killed'
+
+        with self.assertRaises(core.pool.SandboxViolation):
+            asyncio.run(pool.run_async(b'{}'))
+
+        self.containers[0].kill.assert_called_once()
+        self.assertEqual(pool._total, 0)
+
+
+class ForkRunnerTests(django.test.SimpleTestCase):
+    tests = [
+        {'input_data': '1', 'output_data': '1', 'number': 1},
+        {'input_data': '2', 'output_data': '4', 'number': 2},
+    ]
+
+    def judge(self, user_code, tests=None, workers=1, memory=None):
+        return runner.judge(
+            runner.exec_forked,
+            runner.compile_user_code(user_code),
+            tests or self.tests,
+            1,
+            workers,
+            memory,
+        )
+
+    def test_accept(self):
+        result = self.judge('n = int(input())\nprint(n * n)')
+        self.assertEqual(result['status'], 'AC', result['message'])
+
+    def test_wrong_answer(self):
+        result = self.judge('print(input())')
+        self.assertEqual(result['status'], 'WA')
+        self.assertEqual(result['test_error'], 2)
+
+    def test_time_limit(self):
+        result = self.judge('while True: pass')
+        self.assertEqual(result['status'], 'TL')
+        self.assertEqual(result['test_error'], 1)
+
+    def test_runtime_error(self):
+        for user_code in ('raise ValueError', 'for _ in range(10', 'exit(3)'):
+            with self.subTest(user_code=user_code):
+                result = self.judge(user_code)
+                self.assertEqual(result['status'], 'RE')
+                self.assertEqual(result['test_error'], 1)
+
+    def test_exit_zero_is_not_error(self):
+        result = self.judge('n = int(input())\nprint(n * n)\nexit()')
+        self.assertEqual(result['status'], 'AC', result['message'])
+
+    def test_memory_limit(self):
+        # Дочерний процесс наследует память процесса тестов, поэтому лимит
+        # отсчитывается от памяти пустого решения
+        baseline = self.judge('input()')['tests'][0]['memory'] // 1024
+        user_code = (
+            'n = int(input())\n'
+            'data = bytearray(n * 48 * 1024 * 1024)\n'
+            'data[::4096] = bytes(len(data[::4096]))\n'
+            'print(n * n)'
+        )
+        result = self.judge(user_code, memory=runner.MemoryLimit(baseline + 64))
+        self.assertEqual(result['status'], 'ML', result['message'])
+        self.assertEqual(result['test_error'], 2)
+        self.assertEqual(
+            [test['status'] for test in result['tests']],
+            ['AC', 'ML'],
+        )
+
+    def test_memory_error_is_memory_limit(self):
+        result = self.judge('raise MemoryError')
+        self.assertEqual(result['status'], 'ML')
+
+    def test_cgroup_memory_limit(self):
+        with tempfile.TemporaryDirectory() as root:
+            root = Path(root)
+            (root / 'cgroup.controllers').write_text('cpu memory pids')
+            memory = runner.CgroupMemoryLimit.create(64, root=root)
+            self.assertIsNotNone(memory)
+
+            group = memory.prepare()
+            self.assertEqual((group / 'memory.max').read_text(), str(64 << 20))
+
+            (group / 'memory.events').write_text('oom 1\noom_kill 1\n')
+            (group / 'memory.peak').write_text(str(70 << 20))
+            self.assertEqual(
+                memory.measure(group, mock.Mock(ru_maxrss=1)),
+                (70 << 10, True),
+            )
+
+    def test_cgroup_survives_leftover_groups(self):
+        with tempfile.TemporaryDirectory() as root:
+            root = Path(root)
+            (root / 'cgroup.controllers').write_text('memory')
+            first = runner.CgroupMemoryLimit.create(64, root=root).prepare()
+
+            # Следующий runner в том же контейнере начинает заново
+            memory = runner.CgroupMemoryLimit.create(64, root=root)
+            self.assertNotEqual(memory.prepare(), first)
+
+            (root / 'judge-test-stale').mkdir()
+            runner.CgroupMemoryLimit.create(64, root=root)
+            self.assertFalse((root / 'judge-test-stale').exists())
+
+    def test_output_limit(self):
+        for user_code in (
+            'while True: print(1)',
+            'import sys\nwhile True: sys.stderr.write("1" * 1000)',
+        ):
+            with self.subTest(user_code=user_code):
+                result = runner.judge(
+                    runner.exec_forked,
+                    runner.compile_user_code(user_code),
+                    self.tests,
+                    1,
+                    output=runner.OutputLimit(1),
+                )
+                self.assertEqual(result['status'], 'OL', result['message'])
+                self.assertEqual(result['test_error'], 1)
+                self.assertLess(len(result['message']), 1024)
+
+    def test_output_below_limit(self):
+        result = runner.judge(
+            runner.exec_forked,
+            runner.compile_user_code('n = int(input())\nprint(n * n)'),
+            self.tests,
+            1,
+            output=runner.OutputLimit(1),
+        )
+        self.assertEqual(result['status'], 'AC', result['message'])
+
+    def test_output_at_limit(self):
+        for size, status in ((1 << 20, 'WA'), ((1 << 20) + 1, 'OL')):
+            with self.subTest(size=size):
+                result = runner.judge(
+                    runner.exec_forked,
+                    runner.compile_user_code(
+                        f'import sys\nsys.stdout.write("1" * {size})',
+                    ),
+                    self.tests,
+                    1,
+                    output=runner.OutputLimit(1),
+                )
+                self.assertEqual(result['status'], status, result['message'])
+
+    def test_parallel_reports_lowest_failed_test(self):
+        tests = [
+            {'input_data': str(number), 'output_data': '0', 'number': number}
+            for number in range(1, 9)
+        ]
+        user_code = (
+            'import time\n'
+            'n = int(input())\n'
+            'time.sleep(0.05 * (8 - n))\n'
+            'print(0 if n < 3 else n)'
+        )
+        result = self.judge(user_code, tests, workers=4)
+        self.assertEqual(result['status'], 'WA')
+        self.assertEqual(result['test_error'], 3)
+
+    def test_time_limit_uses_cpu_time_in_both_modes(self):
+        tests = [
+            {'input_data': str(number), 'output_data': '1', 'number': number}
+            for number in range(1, 5)
+        ]
+        cases = [(0.3, 'AC'), (1, 'TL')]
+        for workers in (1, 4):
+            for seconds, status in cases:
+                with self.subTest(workers=workers, seconds=seconds):
+                    result = runner.judge(
+                        runner.exec_forked,
+                        runner.compile_user_code(
+                            f'import time\ntime.sleep({seconds})\nprint(1)',
+                        ),
+                        tests,
+                        0.2,
+                        workers,
+                    )
+                    self.assertEqual(result['status'], status, result['message'])
+
+    def test_failed_group_skips_dependents(self):
+        tests = [
+            {'input_data': '1', 'output_data': '1', 'number': 1, 'group': 1},
+            {'input_data': '2', 'output_data': '2', 'number': 2, 'group': 2},
+            {'input_data': '3', 'output_data': '3', 'number': 3, 'group': 2},
+            {'input_data': '4', 'output_data': '4', 'number': 4, 'group': 3},
+            {'input_data': '5', 'output_data': '5', 'number': 5, 'group': 4},
+        ]
+        groups = [
+            {'number': 1, 'points': 20, 'depends_on': []},
+            {'number': 2, 'points': 30, 'depends_on': [1]},
+            {'number': 3, 'points': 30, 'depends_on': [2]},
+            {'number': 4, 'points': 20, 'depends_on': [1]},
+        ]
+        result = runner.judge_groups(
+            runner.exec_forked,
+            runner.compile_user_code('n = int(input())\nprint(0 if n == 2 else n)'),
+            tests,
+            groups,
+            1,
+        )
+        self.assertEqual((result['status'], result['test_error']), ('WA', 2))
+        self.assertEqual(
+            [group['status'] for group in result['groups']],
+            ['AC', 'WA', 'SK', 'AC'],
+        )
+        self.assertEqual([test['number'] for test in result['tests']], [1, 2, 5])
+        self.assertEqual(result['score'], 0.4)
+
+
+class CheckerTests(django.test.SimpleTestCase):
+    tests = [{'input_data': '', 'output_data': '1 2\n0.3333333', 'number': 1}]
+
+    def run_code(self, user_code, checker=None):
+        return runner.run_user_code(
+            '',
+            self.tests,
+            1,
+            128,
+            runner.FORK_MODE,
+            program=runner.compile_user_code(user_code),
+            checker=checker,
+        )
+
+    def test_tokens_ignore_whitespace(self):
+        result = self.run_code('print(" 1   2\t")\nprint()\nprint("0.3333333 ")')
+        self.assertEqual(result['status'], 'AC', result['message'])
+
+        result = self.run_code('print(1, 2, 0.3333333, sep="")', {'type': 'exact'})
+        self.assertEqual(result['status'], 'WA')
+
+    def test_exact_is_compared_by_chunks(self):
+        checker = {'type': 'exact'}
+        with mock.patch.object(runner, 'READ_CHUNK_SIZE', 2):
+            result = self.run_code('print("1 2")\nprint("0.3333333")', checker)
+            self.assertEqual(result['status'], 'AC', result['message'])
+
+            result = self.run_code('print("1 2")\nprint("0.3333334")', checker)
+            self.assertEqual(result['status'], 'WA')
+
+    def test_epsilon(self):
+        user_code = 'print(1, 2, 1 / 3)'
+        self.assertEqual(self.run_code(user_code)['status'], 'WA')
+
+        result = self.run_code(user_code, {'type': 'tokens', 'epsilon': 1e-6})
+        self.assertEqual(result['status'], 'AC', result['message'])
+
+    def test_missing_token(self):
+        result = self.run_code('print(1, 2)')
+        self.assertEqual(result['status'], 'WA')
+        self.assertIn(
+            'token 3 expected 0.3333333 found end of output',
+            result['message'],
+        )
+
+    def test_tokens_are_read_by_chunks(self):
+        with mock.patch.object(runner, 'READ_CHUNK_SIZE', 3):
+            tokens = list(runner.iter_tokens(b'abc de  fghij\n k'))
+
+        self.assertEqual(tokens, [b'abc', b'de', b'fghij', b'k'])
+
+        with (
+            mock.patch.object(runner, 'READ_CHUNK_SIZE', 2),
+            mock.patch.object(runner, 'MAX_TOKEN_SIZE', 4),
+            self.assertRaises(runner.TokenTooLong),
+        ):
+            list(runner.iter_tokens(b'1 abcdefgh 2'))
+
+    def test_custom_checker(self):
+        checker = {
+            'type': 'custom',
+            'code': (
+                'import sys\n'
+                'found = sys.stdin.read().split()\n'
+                'answer = open(sys.argv[2]).read().split()\n'
+                'if len(found) != len(answer):\n'
+                '    sys.exit("wrong length")\n'
+                'sys.exit(0 if found[0] == answer[0] else 1)\n'
+            ),
+        }
+        result = self.run_code('print(1, 5, 7)', checker)
+        self.assertEqual(result['status'], 'AC', result['message'])
+
+        result = self.run_code('print(2, 2, 0)', checker)
+        self.assertEqual(result['status'], 'WA')
+
+        result = self.run_code('print(1)', checker)
+        self.assertEqual(result['status'], 'WA')
+        self.assertIn('wrong length', result['message'])
+
+        checker['code'] = 'raise SystemExit(3)'
+        result = self.run_code('print(1)', checker)
+        self.assertEqual((result['status'], result['test_error']), ('JE', 1))
+
+        checker['code'] = 'for'
+        result = self.run_code('print(1)', checker)
+        self.assertEqual(result['status'], 'JE')
+        self.assertIn('SyntaxError', result['message'])
+
+    def test_custom_checker_cannot_be_replaced(self):
+        checker = {
+            'type': 'custom',
+            'code': 'import sys\nsys.exit(0 if sys.stdin.read() == "1\\n" else 1)\n',
+        }
+        user_code = (
+            'import pathlib, tempfile\n'
+            'for path in pathlib.Path(tempfile.gettempdir()).glob("checker-*/*.py"):\n'
+            '    try:\n'
+            '        path.write_text("raise SystemExit(0)")\n'
+            '    except OSError:\n'
+            '        pass\n'
+            'print(2)\n'
+        )
+        result = self.run_code(user_code, checker)
+        self.assertEqual(result['status'], 'WA', result['message'])
+
+
+class CompilerTests(django.test.SimpleTestCase):
+    lang = problems.models.LanguageChoices.Python_3_11
+
+    def setUp(self):
+        core.compiler.get_cache().clear()
+
+    def test_bytecode_runs_in_runner(self):
+        bytecode = core.compiler.precompile('print(int(input()) ** 2)', self.lang)
+        program = runner.load_bytecode(
+            {'bytecode': bytecode, 'magic': core.compiler.MAGIC},
+        )
+        result = runner.judge(runner.exec_forked, program, ForkRunnerTests.tests, 1)
+        self.assertEqual(result['status'], 'AC', result['message'])
+
+    def test_foreign_magic_is_ignored(self):
+        bytecode = core.compiler.precompile('print(1)', self.lang)
+        self.assertIsNone(
+            runner.load_bytecode({'bytecode': bytecode, 'magic': '00000000'}),
+        )
+
+    def test_syntax_error(self):
+        with self.assertRaisesMessage(core.compiler.CompilationError, 'SyntaxError'):
+            core.compiler.precompile('for _ in range(10', self.lang)
+
+    @django.test.override_settings(JUDGE_MAX_SOURCE_SIZE=10)
+    def test_source_size_limit(self):
+        with self.assertRaisesMessage(core.compiler.CompilationError, 'too large'):
+            core.compiler.precompile('print("long enough")', self.lang)
+
+    def test_result_is_cached(self):
+        core.compiler.precompile('print(1)', self.lang)
+        with mock.patch('builtins.compile') as compile_mock:
+            core.compiler.precompile('print(1)', self.lang)
+
+        compile_mock.assert_not_called()
+
+    def test_timeout_is_not_cached(self):
+        with mock.patch(
+            'builtins.compile',
+            side_effect=core.compiler.CompilationTimeout,
+        ):
+            with self.assertRaisesMessage(core.compiler.CompilationError, 'time'):
+                core.compiler.precompile('print(1)', self.lang)
+
+        self.assertIsNotNone(core.compiler.precompile('print(1)', self.lang))
+
+    def test_unknown_language(self):
+        self.assertIsNone(core.compiler.precompile('+[]', 'brainfuck'))
+
+
+class TestCacheTests(django.test.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        override = django.test.override_settings(
+            JUDGE_TEST_CACHE_DIR=Path(self.cache_dir.name),
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        user = get_user_model().objects.create_user(username='author')
+        self.problem = problems.models.Problem.objects.create(
+            title='test',
+            description='test',
+            difficult=10,
+            author=user,
+        )
+        for number in (1, 2):
+            problems.models.TestCase.objects.create(
+                problem=self.problem,
+                input_data=str(number),
+                output_data=str(number * number),
+                number=number,
+            )
+
+        self.problem.refresh_from_db()
+
+    def test_test_set_is_filled_once(self):
+        name = core.testcache.get_test_set(self.problem)
+        with self.assertNumQueries(0):
+            self.assertEqual(core.testcache.get_test_set(self.problem), name)
+
+    def test_test_change_creates_new_set(self):
+        name = core.testcache.get_test_set(self.problem)
+        test = self.problem.tests.get(number=2)
+        test.output_data = '5'
+        test.save()
+
+        self.problem.refresh_from_db()
+        self.assertNotEqual(core.testcache.get_test_set(self.problem), name)
+
+    def test_test_set_contains_groups(self):
+        first = problems.models.TestGroup.objects.create(
+            problem=self.problem,
+            number=1,
+            points=30,
+        )
+        second = problems.models.TestGroup.objects.create(
+            problem=self.problem,
+            number=2,
+            points=70,
+        )
+        second.depends_on.add(first)
+        self.problem.tests.filter(number=1).update(group=first)
+        self.problem.tests.filter(number=2).update(group=second)
+
+        self.problem.refresh_from_db()
+        data = {
+            'tests_manifest': core.testcache.get_test_set(self.problem),
+            'tests_root': self.cache_dir.name,
+        }
+        tests, groups = runner.load_manifest(data)
+        self.assertEqual([test['group'] for test in tests], [1, 2])
+        self.assertEqual(groups[1], {'number': 2, 'points': 70, 'depends_on': [1]})
+
+        result = runner.run_user_code(
+            '',
+            tests,
+            1,
+            128,
+            runner.FORK_MODE,
+            program=runner.compile_user_code('print(1)'),
+            groups=groups,
+        )
+        self.assertEqual(result['groups'][1]['status'], 'WA')
+        self.assertEqual(result['score'], 0.3)
+
+    def test_runner_reads_test_set(self):
+        data = {
+            'tests_manifest': core.testcache.get_test_set(self.problem),
+            'tests_root': self.cache_dir.name,
+        }
+        tests = runner.load_tests(data)
+        self.assertEqual([test['number'] for test in tests], [1, 2])
+
+        result = runner.judge(
+            runner.exec_forked,
+            runner.compile_user_code('n = int(input())\nprint(n * n)'),
+            tests,
+            1,
+        )
+        self.assertEqual(result['status'], 'AC', result['message'])
+
+
+@django.test.override_settings(JUDGE_LOCAL_ALLOW_SHARED_UID=True)
+class SandboxParityTests(django.test.TestCase):
+    # Одинаковые решения должны получать одинаковые вердикты в любой песочнице
+    cases = [
+        ('n = int(input())\nprint(n * n)', 'AC', None),
+        ('print(1)', 'WA', 2),
+        ('while True: pass', 'TL', 1),
+        ('raise ValueError', 'RE', 1),
+        ('a = [0] * 10 ** 9', 'ML', 1),
+        ('print(int(input()) ** 2)\nimport sys\nsys.exit(3)', 'RE', 1),
+    ]
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        override = django.test.override_settings(
+            JUDGE_TEST_CACHE_DIR=Path(self.cache_dir.name),
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        user = get_user_model().objects.create_user(username='author')
+        self.problem = problems.models.Problem.objects.create(
+            title='test',
+            description='test',
+            difficult=10,
+            author=user,
+        )
+        for number in (1, 2):
+            problems.models.TestCase.objects.create(
+                problem=self.problem,
+                input_data=str(number),
+                output_data=str(number * number),
+                number=number,
+            )
+
+        self.problem.refresh_from_db()
+
+    def get_verdicts(self, backend):
+        lang = problems.models.LanguageChoices.Python_3_11
+        verdicts = []
+        with django.test.override_settings(JUDGE_SANDBOX_BACKEND=backend):
+            for code, _, _ in self.cases:
+                data = core.core.prepare_data(self.problem, code)
+                result = core.core.check_tests(data, lang)
+                verdicts.append((result['status'], result['test_error']))
+
+        return verdicts
+
+    def test_local_backend(self):
+        expected = [(status, test_error) for _, status, test_error in self.cases]
+        self.assertEqual(self.get_verdicts(core.sandbox.LOCAL_BACKEND), expected)
+
+    @django.test.override_settings(JUDGE_SANDBOX_BACKEND=core.sandbox.LOCAL_BACKEND)
+    def test_local_backend_cleans_up(self):
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            backend = core.sandbox.LocalSandboxBackend(
+                scratch_dir=scratch_dir,
+                allow_shared_uid=True,
+            )
+            data = core.core.prepare_data(self.problem, 'print(1)')
+            backend.run(data, problems.models.LanguageChoices.Python_3_11)
+            self.assertEqual(list(Path(scratch_dir).iterdir()), [])
+
+    @django.test.override_settings(JUDGE_SANDBOX_BACKEND=core.sandbox.LOCAL_BACKEND)
+    def test_source_near_size_limit(self):
+        # Исходник у лимита вместе с байткодом в base64 больше, чем
+        # помещается в одну переменную окружения
+        lang = problems.models.LanguageChoices.Python_3_11
+        solution = 'print(int(input()) ** 2)\n'
+        lines = []
+        size = len(solution)
+        while size < django.conf.settings.JUDGE_MAX_SOURCE_SIZE - 32:
+            lines.append(f'value_{len(lines)} = {len(lines)}\n')
+            size += len(lines[-1])
+
+        code = ''.join(lines) + solution
+        bytecode = core.compiler.precompile(code, lang)
+        data = core.core.prepare_data(self.problem, code, bytecode)
+        self.assertGreater(len(data), MAX_ARG_STRLEN)
+
+        result = core.core.check_tests(data, lang)
+        self.assertEqual(result['status'], 'AC', result['message'])
+
+    def test_local_runner_failure(self):
+        backend = core.sandbox.LocalSandboxBackend(allow_shared_uid=True)
+        with self.assertRaises(core.pool.SandboxViolation):
+            backend.run(b'{}', problems.models.LanguageChoices.Python_3_11)
+
+    def test_local_backend_requires_uids(self):
+        with self.assertRaises(ImproperlyConfigured):
+            core.sandbox.LocalSandboxBackend()
+
+    def test_local_runner_is_started_through_jail(self):
+        backend = core.sandbox.LocalSandboxBackend(uids=[12345])
+        lang = problems.models.LanguageChoices.Python_3_11
+        command = backend.get_command(lang, 12345, '/sys/fs/cgroup/judge/1')
+        self.assertEqual(command[2], core.sandbox.JAIL)
+        self.assertEqual(command[-2:], [backend.python, backend.get_runner(lang)])
+        self.assertIn('--uid', command)
+        self.assertNotIn('preexec_fn', backend.get_process_options('/tmp', ''))
+
+    def test_jail_fails_without_namespaces(self):
+        with (
+            mock.patch('core.jail.unshare', side_effect=OSError('EPERM')),
+            mock.patch('os.setuid') as setuid,
+            self.assertRaisesMessage(SystemExit, 'unshare failed'),
+        ):
+            core.jail.enter_sandbox(12345, '', 64)
+
+        setuid.assert_not_called()
+
+    @django.test.tag('test_system')
+    @unittest.skipUnless(core.pool.docker_available(), 'Docker is not available')
+    def test_docker_matches_local(self):
+        # Пул контейнеров монтирует кэш тестов при создании
+        core.pool.close_all()
+        self.addCleanup(core.pool.close_all)
+        self.assertEqual(
+            self.get_verdicts(core.sandbox.DOCKER_BACKEND),
+            self.get_verdicts(core.sandbox.LOCAL_BACKEND),
+        )
+
+
+class FakeBackend:
+    capacity = None
+
+    def reserve(self, limit):
+        pass
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+    async def run_async(self, data, lang):
+        if data.get('fail'):
+            raise core.pool.SandboxViolation('runner failed')
+
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        return {'status': 'AC', 'number': data['number']}
+
+
+class DispatcherTests(django.test.SimpleTestCase):
+    def get_dispatcher(self, backend, limit):
+        dispatcher = core.dispatcher.Dispatcher(backend, limit)
+        dispatcher.start()
+        self.addCleanup(dispatcher.close)
+        return dispatcher
+
+    def test_sandboxes_run_concurrently_up_to_limit(self):
+        backend = FakeBackend()
+        dispatcher = self.get_dispatcher(backend, 3)
+        with ThreadPoolExecutor(8) as executor:
+            results = list(
+                executor.map(
+                    lambda number: dispatcher.run({'number': number}, 'python'),
+                    range(8),
+                ),
+            )
+
+        self.assertEqual([result['number'] for result in results], list(range(8)))
+        self.assertEqual(backend.max_active, 3)
+
+    def test_error_is_raised_in_caller(self):
+        dispatcher = self.get_dispatcher(FakeBackend(), 1)
+        with self.assertRaises(core.pool.SandboxViolation):
+            dispatcher.run({'fail': True}, 'python')
+
+    @django.test.override_settings(JUDGE_DISPATCHER_CONCURRENCY=16)
+    def test_concurrency_is_limited_by_backend_capacity(self):
+        backend = FakeBackend()
+        self.assertEqual(core.dispatcher.get_concurrency(backend), 16)
+        backend.capacity = 4
+        self.assertEqual(core.dispatcher.get_concurrency(backend), 4)
+
+    @django.test.override_settings(
+        JUDGE_DISPATCHER_CONCURRENCY=0,
+        JUDGE_RUNNER_WORKERS=2,
+        JUDGE_CONTAINER_MEMORY='1g',
+    )
+    def test_concurrency_follows_host_resources(self):
+        with (
+            mock.patch('os.cpu_count', return_value=32),
+            mock.patch('core.dispatcher.get_host_memory', return_value=64 << 30),
+        ):
+            self.assertEqual(core.dispatcher.get_concurrency(FakeBackend()), 16)
+
+        with (
+            mock.patch('os.cpu_count', return_value=32),
+            mock.patch('core.dispatcher.get_host_memory', return_value=4 << 30),
+        ):
+            self.assertEqual(core.dispatcher.get_concurrency(FakeBackend()), 4)
+
+
+class CompressedTextFieldTests(django.test.TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='author')
+        problem = problems.models.Problem.objects.create(
+            title='test',
+            description='test',
+            difficult=10,
+            author=user,
+        )
+        self.code = 'print(input())\n' * 100
+        self.submission = submissions.models.Submission.objects.create(
+            user=user,
+            problem=problem,
+            code=self.code,
+            language='python',
+        )
+
+    def test_code_is_compressed(self):
+        stored = submissions.models.Submission.objects.values_list(
+            'code',
+            flat=True,
+        ).get()
+        self.assertLess(len(stored), len(self.code))
+        self.assertEqual(core.fields.to_text(stored), self.code)
+
+    def test_code_is_decompressed_on_access(self):
+        submission = submissions.models.Submission.objects.get()
+        self.assertIsInstance(submission.__dict__['code'], bytes)
+        self.assertEqual(submission.code, self.code)
+        self.assertIsNone(submission.logs)
+
+    def test_unread_code_is_saved_unchanged(self):
+        submission = submissions.models.Submission.objects.get()
+        submission.verdict = problems.models.VerdictChoice.Accept
+        submission.save()
+        submission.refresh_from_db()
+        self.assertEqual(submission.code, self.code)
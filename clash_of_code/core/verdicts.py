@@ -0,0 +1,58 @@
+import hashlib
+import json
+
+import django.conf
+
+import core.compiler
+import core.core
+import core.testcache
+import problems.models
+
+
+# Только эти вердикты не зависят от нагрузки на узел. TL, ML и RE могут
+# оказаться пограничными, а CE из песочницы означает сбой системы
+CACHED_STATUSES = {
+    problems.models.VerdictChoice.Accept,
+    problems.models.VerdictChoice.Wrong_answer,
+}
+
+
+def normalize_source(code):
+    return code.replace('\r\n', '\n').replace('\r', '\n').rstrip() + '\n'
+
+
+def get_cache_key(problem, code, lang, numbers=None):
+    digest = hashlib.sha256(
+        normalize_source(code).encode('utf-8', 'surrogatepass'),
+    ).hexdigest()
+    subset = core.testcache.get_subset_name(numbers)
+    checker = json.dumps(core.core.get_checker(problem), sort_keys=True)
+    checker = hashlib.sha256(checker.encode()).hexdigest()[:16]
+    return (
+        f'verdict:{lang}:{digest}:{problem.pk}-{problem.tests_version}-{subset}:'
+        f'{problem.time_limit}:{problem.memory_limit}:{checker}:'
+        f'{django.conf.settings.JUDGE_OUTPUT_LIMIT}'
+    )
+
+
+def get(problem, code, lang, numbers=None):
+    return core.compiler.get_cache().get(
+        get_cache_key(problem, code, lang, numbers),
+    )
+
+
+def store(problem, code, lang, result, numbers=None):
+    if result.get('status') not in CACHED_STATUSES or 'compare' in result:
+        return
+
+    core.compiler.get_cache().set(
+        get_cache_key(problem, code, lang, numbers),
+        {
+            'status': result['status'],
+            'test_error': result.get('test_error'),
+            'message': result.get('message'),
+            'tests': result.get('tests', []),
+            'groups': result.get('groups'),
+            'score': result.get('score'),
+        },
+    )
@@ -1,76 +1,958 @@
+import base64
+import contextlib
+import importlib.util
+import itertools
 import json
+import marshal
+import math
+import mmap
 import os
 from pathlib import Path
 import resource
+import select
+import signal
 import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import uuid
 
+SUBPROCESS_MODE = 'subprocess'
+FORK_MODE = 'fork'
+COMPARE_MODE = 'compare'
 
-def set_memory_limit(max_memory_mb):
-    max_memory_bytes = max_memory_mb * 1024 * 1024
-    resource.setrlimit(resource.RLIMIT_AS, (max_memory_bytes, max_memory_bytes))
+USER_CODE_COMMAND = [sys.executable, 'user_code.py']
 
+TESTS_ROOT = '/tests'
 
-def run_user_code(user_code, tests, time_limit, memory_limit):
-    file = Path('user_code.py')
-    file.touch()
-    file.write_text(user_code)
+# TL ставится по процессорному времени теста при любом числе потоков, чтобы
+# вердикт не зависел от ядер узла. По реальному времени решение снимается
+# только после такого запаса, это ловит зависшие и спящие решения
+WALL_LIMIT_FACTOR = 3
 
-    set_memory_limit(memory_limit)
 
+# Локальной песочнице выделяется своя cgroup, пустая строка отключает cgroup
+CGROUP_ROOT = os.getenv('JUDGE_CGROUP_ROOT', '/sys/fs/cgroup')
+
+# Без cgroup ML ставится по пиковому RSS, а RLIMIT_AS с запасом только
+# защищает узел от решений, которые пытаются занять всю память
+AS_LIMIT_FACTOR = 2
+AS_HEADROOM_MB = 64
+
+STDERR_TAIL_SIZE = 4096
+
+# Вывод решения пишется во временный файл, RLIMIT_FSIZE не даёт ему
+# вырасти больше лимита, а в сообщение попадает только начало вывода
+OUTPUT_PREVIEW_SIZE = 256
+
+SKIPPED = 'SK'
+
+TOKENS_CHECKER = 'tokens'
+EXACT_CHECKER = 'exact'
+CUSTOM_CHECKER = 'custom'
+
+# Вывод читается кусками, поэтому память чекера не зависит от размера
+# вывода, а одна лексема не может быть больше MAX_TOKEN_SIZE
+READ_CHUNK_SIZE = 64 * 1024
+MAX_TOKEN_SIZE = 16 * 1024 * 1024
+MESSAGE_TOKEN_SIZE = 64
+WHITESPACE = frozenset(b' \t\n\r\x0b\x0c')
+
+CHECKER_TIME_LIMIT = 10
+
+
+class MemoryLimit:
+    def __init__(self, limit_mb=None):
+        self.limit_kb = None if limit_mb is None else limit_mb * 1024
+
+    def prepare(self):
+        return None
+
+    def enter(self, token):
+        if self.limit_kb is None:
+            return
+
+        max_bytes = (self.limit_kb * AS_LIMIT_FACTOR + AS_HEADROOM_MB * 1024) * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (max_bytes, max_bytes))
+
+    def measure(self, token, rusage):
+        return rusage.ru_maxrss, False
+
+    def release(self, token):
+        pass
+
+
+class CgroupMemoryLimit(MemoryLimit):
+    def __init__(self, limit_mb, root):
+        super().__init__(limit_mb)
+        self.root = root
+
+    @classmethod
+    def create(cls, limit_mb, root):
+        try:
+            if 'memory' not in (root / 'cgroup.controllers').read_text().split():
+                return None
+
+            runner_group = root / 'judge-runner'
+            runner_group.mkdir(exist_ok=True)
+            (runner_group / 'cgroup.procs').write_text(str(os.getpid()))
+            (root / 'cgroup.subtree_control').write_text('+memory')
+        except OSError:
+            return None
+
+        memory = cls(limit_mb, root)
+        memory.remove_leftovers()
+        return memory
+
+    def remove_leftovers(self):
+        # Контейнер переиспользуется, и группы прошлых runner, которые не
+        # удалось удалить сразу, убираются здесь
+        for group in self.root.glob('judge-test-*'):
+            with contextlib.suppress(OSError):
+                group.rmdir()
+
+    def prepare(self):
+        # Имя не зависит от счётчика или pid, которые повторяются в
+        # следующих runner того же контейнера
+        group = self.root / f'judge-test-{uuid.uuid4().hex}'
+        group.mkdir()
+        (group / 'memory.max').write_text(str(self.limit_kb * 1024))
+        swap_max = group / 'memory.swap.max'
+        if swap_max.exists():
+            swap_max.write_text('0')
+
+        return group
+
+    def enter(self, token):
+        (token / 'cgroup.procs').write_text('0')
+
+    def measure(self, token, rusage):
+        peak = token / 'memory.peak'
+        memory = int(peak.read_text()) // 1024 if peak.exists() else rusage.ru_maxrss
+        events = dict(
+            line.split() for line in (token / 'memory.events').read_text().splitlines()
+        )
+        return memory, int(events.get('oom_kill', 0)) > 0
+
+    def release(self, token):
+        try:
+            token.rmdir()
+        except OSError:
+            pass
+
+
+class OutputLimit:
+    def __init__(self, limit_mb=None):
+        self.limit_bytes = None if limit_mb is None else limit_mb * 1024 * 1024
+
+    def enter(self):
+        if self.limit_bytes is None:
+            return
+
+        # Лишний байт отличает вывод ровно по лимиту, который разрешён, от
+        # обрезанного на лимите
+        resource.setrlimit(
+            resource.RLIMIT_FSIZE,
+            (self.limit_bytes + 1, self.limit_bytes + 1),
+        )
+
+    def exceeded(self, stream):
+        if self.limit_bytes is None:
+            return False
+
+        return os.fstat(stream.fileno()).st_size > self.limit_bytes
+
+
+def get_memory_limit(limit_mb):
+    if not CGROUP_ROOT:
+        return MemoryLimit(limit_mb)
+
+    memory = CgroupMemoryLimit.create(limit_mb, Path(CGROUP_ROOT))
+    return memory or MemoryLimit(limit_mb)
+
+
+def cpu_quota():
+    try:
+        quota, period = Path('/sys/fs/cgroup/cpu.max').read_text().split()
+        if quota != 'max':
+            return max(1, math.floor(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def compile_user_code(user_code):
+    try:
+        return compile(user_code, 'user_code.py', 'exec')
+    except (SyntaxError, ValueError) as e:
+        return e
+
+
+def load_bytecode(data):
+    # Байткод, собранный на стороне сервера, годится только для той же
+    # версии интерпретатора, иначе решение компилируется заново
+    bytecode = data.get('bytecode')
+    if not bytecode or data.get('magic') != importlib.util.MAGIC_NUMBER.hex():
+        return None
+
+    try:
+        return marshal.loads(base64.b64decode(bytecode))
+    except (ValueError, EOFError, TypeError):
+        return None
+
+
+def redirect_streams(stdin, stdout, stderr):
+    os.dup2(stdin.fileno(), 0)
+    os.dup2(stdout.fileno(), 1)
+    os.dup2(stderr.fileno(), 2)
+
+
+def exec_subprocess(program, stdin, stdout, stderr):
+    try:
+        redirect_streams(stdin, stdout, stderr)
+        os.execvp(USER_CODE_COMMAND[0], USER_CODE_COMMAND)
+    finally:
+        os._exit(127)
+
+
+def exec_forked(program, stdin, stdout, stderr):
+    exit_code = 0
+    try:
+        redirect_streams(stdin, stdout, stderr)
+        sys.stdin = os.fdopen(0, encoding='utf-8', closefd=False)
+        sys.stdout = os.fdopen(1, 'w', encoding='utf-8', closefd=False)
+        sys.stderr = os.fdopen(2, 'w', encoding='utf-8', closefd=False)
+        sys.argv = ['user_code.py']
+        if isinstance(program, BaseException):
+            raise program
+
+        exec(program, {'__name__': '__main__', '__builtins__': __builtins__})
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException:  # noqa: B036 процесс завершается через os._exit
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(exit_code)
+
+
+class Child:
+    def __init__(
+        self,
+        pid,
+        stdin,
+        stdout,
+        stderr,
+        wall_limit,
+        memory,
+        token,
+        output,
+    ):
+        self.pid = pid
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = stderr
+        self.started = time.monotonic()
+        self.finished = None
+        self.deadline = self.started + wall_limit
+        self.returncode = None
+        self.rusage = None
+        self.timed_out = False
+        self.memory = memory
+        self.token = token
+        self.output = output
+        self.peak_memory = None
+        self.memory_exceeded = False
+        try:
+            self.pidfd = os.pidfd_open(pid)
+        except (AttributeError, OSError):
+            self.pidfd = None
+
+    def fileno(self):
+        return self.pidfd
+
+    def poll(self):
+        finished, status, rusage = os.wait4(self.pid, os.WNOHANG)
+        if finished:
+            self.reaped(status, rusage)
+
+        return finished != 0
+
+    def reaped(self, status, rusage):
+        self.finished = time.monotonic()
+        self.returncode = os.waitstatus_to_exitcode(status)
+        self.rusage = rusage
+        try:
+            self.peak_memory, oom_killed = self.memory.measure(self.token, rusage)
+        finally:
+            self.memory.release(self.token)
+
+        limit_kb = self.memory.limit_kb
+        over_limit = limit_kb is not None and self.peak_memory > limit_kb
+        if oom_killed or over_limit:
+            self.memory_exceeded = True
+        elif self.returncode != 0:
+            self.memory_exceeded = self.failed_with_memory_error()
+
+    def kill(self):
+        if self.returncode is not None:
+            return
+
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+        _, status, rusage = os.wait4(self.pid, 0)
+        self.reaped(status, rusage)
+
+    @property
+    def cpu_time(self):
+        return self.rusage.ru_utime + self.rusage.ru_stime
+
+    @property
+    def wall_time(self):
+        return self.finished - self.started
+
+    def stats(self, number, status):
+        return {
+            'number': number,
+            'status': status,
+            'cpu_time': round(self.cpu_time * 1000),
+            'wall_time': round(self.wall_time * 1000),
+            'memory': self.peak_memory,
+        }
+
+    @property
+    def output_exceeded(self):
+        return self.output.exceeded(self.stdout) or self.output.exceeded(self.stderr)
+
+    def read_output_preview(self):
+        self.stdout.seek(0)
+        return self.stdout.read(OUTPUT_PREVIEW_SIZE).decode('utf-8', 'replace')
+
+    def failed_with_memory_error(self):
+        self.stderr.seek(0, os.SEEK_END)
+        self.stderr.seek(max(0, self.stderr.tell() - STDERR_TAIL_SIZE))
+        tail = self.stderr.read().decode('utf-8', 'replace').strip()
+        return tail.rpartition('\n')[2].startswith('MemoryError')
+
+    def close(self):
+        if self.pidfd is not None:
+            os.close(self.pidfd)
+
+        for stream in (self.stdin, self.stdout, self.stderr):
+            stream.close()
+
+
+def load_manifest(data):
+    if 'tests_manifest' not in data:
+        return data['tests'], data.get('groups')
+
+    root = Path(data.get('tests_root', TESTS_ROOT))
+    manifest = json.loads((root / data['tests_manifest']).read_text())
+    tests = [
+        {
+            'number': test['number'],
+            'group': test.get('group'),
+            'input_path': root / test['input'],
+            'output_path': root / test['output'],
+        }
+        for test in manifest['tests']
+    ]
+    return tests, manifest.get('groups')
+
+
+def load_tests(data):
+    return load_manifest(data)[0]
+
+
+def open_input(test):
+    if 'input_path' in test:
+        return Path(test['input_path']).open('rb')
+
+    stdin = tempfile.TemporaryFile()
+    stdin.write(test['input_data'].encode('utf-8'))
+    stdin.seek(0)
+    return stdin
+
+
+@contextlib.contextmanager
+def map_file(file):
+    # Вывод и ответ отображаются в память, поэтому чекер не копирует их
+    # целиком, а ядро подгружает только читаемые страницы
+    if os.fstat(file.fileno()).st_size == 0:
+        yield b''
+        return
+
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+
+@contextlib.contextmanager
+def open_expected(test):
+    if 'output_path' not in test:
+        yield test['output_data'].encode('utf-8')
+        return
+
+    with Path(test['output_path']).open('rb') as file, map_file(file) as mapped:
+        yield mapped
+
+
+@contextlib.contextmanager
+def as_file(test, kind):
+    if f'{kind}_path' in test:
+        yield str(test[f'{kind}_path'])
+        return
+
+    with tempfile.NamedTemporaryFile() as file:
+        file.write(test[f'{kind}_data'].encode('utf-8'))
+        file.flush()
+        yield file.name
+
+
+class TokenTooLong(Exception):
+    pass
+
+
+def iter_tokens(data):
+    tail = b''
+    for start in range(0, len(data), READ_CHUNK_SIZE):
+        stop = start + READ_CHUNK_SIZE
+        chunk = data[start:stop]
+        tokens = (tail + chunk).split()
+        tail = b''
+        if tokens and not chunk[-1:].isspace():
+            tail = tokens.pop()
+            if len(tail) > MAX_TOKEN_SIZE:
+                raise TokenTooLong
+
+        yield from tokens
+
+    if tail:
+        yield tail
+
+
+def shorten(token):
+    if token is None:
+        return 'end of output'
+
+    text = token[:MESSAGE_TOKEN_SIZE].decode('utf-8', 'replace')
+    return text + '...' if len(token) > MESSAGE_TOKEN_SIZE else text
+
+
+def wrong_answer(test, details):
+    return {
+        'status': 'WA',
+        'test_error': test['number'],
+        'message': f'Wrong answer on test {test["number"]}: {details}',
+    }
+
+
+class TokenChecker:
+    def __init__(self, epsilon=None):
+        self.epsilon = epsilon
+
+    def equal(self, found, expected):
+        if found == expected:
+            return True
+
+        if self.epsilon is None:
+            return False
+
+        try:
+            found_value = float(found)
+            expected_value = float(expected)
+        except ValueError:
+            return False
+
+        # Для чисел меньше единицы погрешность абсолютная, для больших
+        # относительная
+        error = abs(found_value - expected_value)
+        return error <= self.epsilon * max(1.0, abs(expected_value))
+
+    def check(self, test, output):
+        with map_file(output) as found, open_expected(test) as expected:
+            pairs = itertools.zip_longest(iter_tokens(found), iter_tokens(expected))
+            try:
+                for index, (found, correct) in enumerate(pairs, 1):
+                    if None not in (found, correct) and self.equal(found, correct):
+                        continue
+
+                    return wrong_answer(
+                        test,
+                        f'token {index} expected {shorten(correct)} '
+                        f'found {shorten(found)}',
+                    )
+            except TokenTooLong:
+                return wrong_answer(test, 'token is too long')
+
+        return None
+
+    def close(self):
+        pass
+
+
+def strip_bounds(data):
+    start, end = 0, len(data)
+    while start < end and data[start] in WHITESPACE:
+        start += 1
+
+    while end > start and data[end - 1] in WHITESPACE:
+        end -= 1
+
+    return start, end
+
+
+def get_chunk(data, start, end):
+    stop = min(start + READ_CHUNK_SIZE, end)
+    return data[start:stop]
+
+
+def equal_regions(found, expected):
+    found_start, found_end = strip_bounds(found)
+    expected_start, expected_end = strip_bounds(expected)
+    if found_end - found_start != expected_end - expected_start:
+        return False
+
+    # Сравнение идёт кусками, чтобы не копировать весь вывод
+    for offset in range(0, found_end - found_start, READ_CHUNK_SIZE):
+        found_chunk = get_chunk(found, found_start + offset, found_end)
+        expected_chunk = get_chunk(expected, expected_start + offset, expected_end)
+        if found_chunk != expected_chunk:
+            return False
+
+    return True
+
+
+class ExactChecker(TokenChecker):
+    def check(self, test, output):
+        with map_file(output) as found, open_expected(test) as expected:
+            if equal_regions(found, expected):
+                return None
+
+        return wrong_answer(test, 'output differs from the answer')
+
+
+class CustomChecker(TokenChecker):
+    # Код чекера хранится в памяти runner и передаётся интерпретатору через
+    # -c: файл во временном каталоге решение могло бы переписать
+    def __init__(self, code):
+        super().__init__()
+        self.code = code
+        try:
+            compile(code, 'checker.py', 'exec', dont_inherit=True)
+            self.error = None
+        except (SyntaxError, ValueError) as e:
+            self.error = ''.join(traceback.format_exception_only(e)).strip()
+
+    def check(self, test, output):
+        if self.error is not None:
+            return checker_failure(test, self.error)
+
+        output.seek(0)
+        with as_file(test, 'input') as input_path, as_file(test, 'output') as answer:
+            try:
+                completed = subprocess.run(
+                    [sys.executable, '-c', self.code, input_path, answer],
+                    stdin=output,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    timeout=CHECKER_TIME_LIMIT,
+                )
+            except subprocess.TimeoutExpired:
+                return checker_failure(test, 'checker time limit exceeded')
+
+        message = completed.stderr[-STDERR_TAIL_SIZE:].decode('utf-8', 'replace')
+        if completed.returncode == 0:
+            return None
+
+        if completed.returncode == 1:
+            return wrong_answer(test, message.strip() or 'rejected by checker')
+
+        return checker_failure(
+            test,
+            f'checker exited with code {completed.returncode} {message.strip()}',
+        )
+
+
+def checker_failure(test, details):
+    # Ошибка чекера считается сбоем проверки, а не ошибкой решения
+    return {
+        'status': 'JE',
+        'test_error': test['number'],
+        'message': f'Checker failed on test {test["number"]}: {details}',
+    }
+
+
+def get_checker(config):
+    config = config or {}
+    checker_type = config.get('type', TOKENS_CHECKER)
+    if checker_type == EXACT_CHECKER:
+        return ExactChecker()
+
+    if checker_type == CUSTOM_CHECKER:
+        return CustomChecker(config['code'])
+
+    return TokenChecker(config.get('epsilon'))
+
+
+def limit_cpu_time(time_limit):
+    # Решение в бесконечном цикле снимается ядром вскоре после TL, не
+    # дожидаясь запаса по реальному времени
+    seconds = math.ceil(time_limit) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds))
+
+
+def spawn(target, program, test, time_limit, memory, output):
+    stdin = open_input(test)
+    stdout = tempfile.TemporaryFile()
+    stderr = tempfile.TemporaryFile()
+    token = memory.prepare()
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            memory.enter(token)
+            output.enter()
+            limit_cpu_time(time_limit)
+        except BaseException:  # noqa: B036 процесс завершается через os._exit
+            os._exit(127)
+
+        target(program, stdin, stdout, stderr)
+
+    wall_limit = time_limit * WALL_LIMIT_FACTOR
+    return Child(pid, stdin, stdout, stderr, wall_limit, memory, token, output)
+
+
+def wait_any(children):
+    timeout = max(0, min(child.deadline for child in children) - time.monotonic())
+    with_pidfd = [child for child in children if child.pidfd is not None]
+    if len(with_pidfd) == len(children):
+        select.select(with_pidfd, [], [], timeout)
+    else:
+        time.sleep(min(timeout, 0.001))
+
+    finished = [child for child in children if child.poll()]
+    now = time.monotonic()
+    for child in children:
+        if child.returncode is None and child.deadline <= now:
+            child.timed_out = True
+            child.kill()
+            finished.append(child)
+
+    return finished
+
+
+def check_child(child, test, time_limit, checker):
+    test_number = test['number']
+    if child.timed_out or child.cpu_time > time_limit:
+        return {
+            'status': 'TL',
+            'test_error': test_number,
+            'message': f'Time limit exceeded on test {test_number}',
+        }
+
+    if child.memory_exceeded:
+        return {
+            'status': 'ML',
+            'test_error': test_number,
+            'message': f'Memory limit exceeded on test {test_number}',
+        }
+
+    if child.output_exceeded:
+        return {
+            'status': 'OL',
+            'test_error': test_number,
+            'message': (
+                f'Output limit exceeded on test {test_number}, '
+                f'output starts with {child.read_output_preview()!r}'
+            ),
+        }
+
+    if child.returncode != 0:
+        e = subprocess.CalledProcessError(child.returncode, USER_CODE_COMMAND)
+        return {
+            'status': 'RE',
+            'test_error': test_number,
+            'message': str(e) + ' ' + e.__class__.__name__,
+        }
+
+    return checker.check(test, child.stdout)
+
+
+def cancel_after(running, index):
+    for child, child_index in list(running.items()):
+        if child_index > index:
+            running.pop(child)
+            child.kill()
+            child.close()
+
+
+def judge(
+    target,
+    program,
+    tests,
+    time_limit,
+    workers=1,
+    memory=None,
+    checker=None,
+    output=None,
+):
+    tests = list(tests)
+    memory = memory or MemoryLimit()
+    checker = checker or TokenChecker()
+    output = output or OutputLimit()
     result = {
         'status': 'AC',
         'test_error': None,
         'message': None,
     }
+    failed_index = None
+    next_index = 0
+    running = {}
+    stats = {}
+
+    try:
+        while True:
+            while (
+                failed_index is None
+                and next_index < len(tests)
+                and len(running) < workers
+            ):
+                test = tests[next_index]
+                try:
+                    child = spawn(
+                        target,
+                        program,
+                        test,
+                        time_limit,
+                        memory,
+                        output,
+                    )
+                except Exception as e:
+                    failed_index = next_index
+                    result['status'] = 'RE'
+                    result['test_error'] = test['number']
+                    result['message'] = str(e) + ' ' + e.__class__.__name__
+                    break
+
+                running[child] = next_index
+                next_index += 1
+
+            if not running:
+                break
+
+            for child in wait_any(list(running)):
+                if child not in running:
+                    continue
+
+                index = running.pop(child)
+                failure = check_child(child, tests[index], time_limit, checker)
+                status = failure['status'] if failure else 'AC'
+                stats[index] = child.stats(tests[index]['number'], status)
+                child.close()
+                if failure and (failed_index is None or index < failed_index):
+                    failed_index = index
+                    result.update(failure)
+                    cancel_after(running, index)
+    finally:
+        for child in running:
+            child.kill()
+            child.close()
+
+    result['tests'] = [
+        stats[index]
+        for index in sorted(stats)
+        if failed_index is None or index <= failed_index
+    ]
+    return result
+
 
+def judge_groups(
+    target,
+    program,
+    tests,
+    groups,
+    time_limit,
+    workers=1,
+    memory=None,
+    checker=None,
+    output=None,
+):
+    by_group = {}
     for test in tests:
-        input_data = test['input_data']
-        expected_output = test['output_data']
-        test_number = test['number']
-        try:
-            process = subprocess.run(
-                ['python', 'user_code.py'],
-                input=input_data,
-                check=True,
-                text=True,
-                capture_output=True,
-                timeout=time_limit,
+        by_group.setdefault(test.get('group'), []).append(test)
+
+    # Тесты вне групп проверяются первыми и не дают баллов
+    if None in by_group:
+        groups = [{'number': None, 'points': 0, 'depends_on': []}, *groups]
+
+    result = {
+        'status': 'AC',
+        'test_error': None,
+        'message': None,
+        'tests': [],
+        'groups': [],
+    }
+    failed = set()
+    earned = 0
+    for group in groups:
+        number = group['number']
+        if failed.intersection(group['depends_on']):
+            # Группа пропускается целиком, если не прошла её зависимость
+            status = SKIPPED
+        else:
+            group_result = judge(
+                target,
+                program,
+                by_group.get(number, []),
+                time_limit,
+                workers,
+                memory,
+                checker,
+                output,
             )
+            result['tests'].extend(group_result['tests'])
+            status = group_result['status']
+            if status != 'AC' and result['status'] == 'AC':
+                result['status'] = status
+                result['test_error'] = group_result['test_error']
+                result['message'] = group_result['message']
 
-            user_program_output = process.stdout.strip()
-            if user_program_output != expected_output.strip():
-                result['status'] = 'WA'
-                result['test_error'] = test_number
-                result['message'] = (
-                    f'Wrong answer on test {test_number} '
-                    f'received {user_program_output} excepted {expected_output}'
-                )
-                break
+        points = group['points'] if status == 'AC' else 0
+        if status != 'AC':
+            failed.add(number)
+
+        earned += points
+        result['groups'].append(
+            {'number': number, 'status': status, 'points': points},
+        )
+
+    total = sum(group['points'] for group in groups)
+    result['score'] = earned / total if total else None
+    return result
+
+
+def evaluate(target, program, tests, groups, time_limit, workers, **options):
+    if groups:
+        return judge_groups(
+            target,
+            program,
+            tests,
+            groups,
+            time_limit,
+            workers,
+            **options,
+        )
+
+    return judge(target, program, tests, time_limit, workers, **options)
+
+
+def get_target(mode):
+    if mode == FORK_MODE:
+        return exec_forked
 
-        except subprocess.TimeoutExpired:
-            result['status'] = 'TL'
-            result['test_error'] = test_number
-            result['message'] = f'Time limit exceeded on test {test_number}'
-            break
+    return exec_subprocess
 
-        except Exception as e:
-            result['status'] = 'RE'
-            result['test_error'] = test_number
-            result['message'] = str(e) + ' ' + e.__class__.__name__
-            break
+
+def run_user_code(
+    user_code,
+    tests,
+    time_limit,
+    memory_limit,
+    mode=SUBPROCESS_MODE,
+    workers=1,
+    program=None,
+    groups=None,
+    checker=None,
+    output_limit=None,
+):
+    if mode in (SUBPROCESS_MODE, COMPARE_MODE):
+        file = Path('user_code.py')
+        file.touch()
+        file.write_text(user_code)
+
+    if workers == 0:
+        workers = cpu_quota()
+
+    if program is None:
+        program = compile_user_code(user_code)
+
+    options = {
+        'memory': get_memory_limit(memory_limit),
+        'checker': get_checker(checker),
+        'output': OutputLimit(output_limit),
+    }
+    try:
+        result = evaluate(
+            get_target(mode),
+            program,
+            tests,
+            groups,
+            time_limit,
+            workers,
+            **options,
+        )
+        if mode == COMPARE_MODE:
+            forked = evaluate(
+                exec_forked,
+                program,
+                tests,
+                groups,
+                time_limit,
+                workers,
+                **options,
+            )
+            if (forked['status'], forked['test_error']) != (
+                result['status'],
+                result['test_error'],
+            ):
+                result['compare'] = {FORK_MODE: forked}
+    finally:
+        options['checker'].close()
 
     return result
 
 
 if __name__ == '__main__':
-    input_json = os.getenv('input_data')
-    data = json.loads(input_json)
+    data = json.loads(sys.stdin.buffer.read())
 
-    tests = data['tests']
+    tests, groups = load_manifest(data)
     user_code = data['user_code']
     time_limit = data.get('time_limit', 1)
     memory_limit = data.get('memory_limit', 128)
+    mode = data.get('mode', os.getenv('RUNNER_MODE', SUBPROCESS_MODE))
+    workers = data.get('workers', 1)
 
-    result = run_user_code(user_code, tests, time_limit, memory_limit)
+    result = run_user_code(
+        user_code,
+        tests,
+        time_limit,
+        memory_limit,
+        mode,
+        workers,
+        load_bytecode(data),
+        groups,
+        data.get('checker'),
+        data.get('output_limit'),
+    )
 
     print(json.dumps(result))
@@ -0,0 +1,14 @@
+import django.contrib.admin
+
+import duet.models
+
+
+@django.contrib.admin.register(duet.models.Room)
+class RoomAdmin(django.contrib.admin.ModelAdmin):
+    list_display = (
+        duet.models.Room.title.field.name,
+        duet.models.Room.language.field.name,
+        duet.models.Room.created_by.field.name,
+        duet.models.Room.updated_at.field.name,
+    )
+    readonly_fields = (duet.models.Room.version.field.name,)
@@ -0,0 +1,282 @@
+import asyncio
+import collections
+import importlib
+import json
+import logging
+import re
+import types
+from urllib.parse import urlsplit
+
+import django.conf
+import django.contrib.auth
+from django.http import parse_cookie
+from django.utils import timezone
+
+import duet.deltas
+import duet.models
+
+
+logger = logging.getLogger(__name__)
+
+PATH_RE = re.compile(r'^/ws/duet/(?P<pk>\d+)/$')
+
+# Сколько последних пачек изменений хранится для клиентов, отставших на
+# несколько версий
+HISTORY_SIZE = 1000
+# Сколько сообщений может ждать отправки медленному участнику, прежде чем
+# его отключат. После переподключения он получит документ целиком
+MEMBER_QUEUE_SIZE = 1000
+MAX_BATCH_SIZE = 500
+
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+CLOSE_TOO_SLOW = 4408
+
+
+class Member:
+    def __init__(self, user):
+        self.user = user
+        self.queue = asyncio.Queue(maxsize=MEMBER_QUEUE_SIZE)
+        self.closed = False
+
+    def put(self, text):
+        if self.closed:
+            return
+
+        try:
+            self.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+            self.queue.put_nowait(None)
+
+    async def write(self, send):
+        while (text := await self.queue.get()) is not None:
+            await send({'type': 'websocket.send', 'text': text})
+
+        await send({'type': 'websocket.close', 'code': CLOSE_TOO_SLOW})
+
+
+class RoomState:
+    def __init__(self, room):
+        self.room_id = room.pk
+        self.document = duet.deltas.Document(room.content)
+        self.version = room.version
+        self.saved_version = room.version
+        self.history = collections.deque(maxlen=HISTORY_SIZE)
+        self.members = set()
+        self.snapshot_task = None
+
+    def get_room_state(self):
+        return json.dumps(
+            {
+                'type': 'room_state',
+                'content': self.document.text,
+                'version': self.version,
+            },
+        )
+
+    def get_applied_since(self, version):
+        if not 0 <= self.version - version <= len(self.history):
+            raise duet.deltas.InvalidDelta('Версия устарела')
+
+        skip = len(self.history) - (self.version - version)
+        return [
+            delta
+            for index, deltas in enumerate(self.history)
+            if index >= skip
+            for delta in deltas
+        ]
+
+    def apply(self, version, deltas):
+        # Изменения клиента сделаны от его версии документа, поэтому они
+        # сдвигаются на всё, что было применено с тех пор
+        deltas, _ = duet.deltas.transform_batches(
+            deltas,
+            self.get_applied_since(version),
+        )
+        applied = []
+        try:
+            for delta in deltas:
+                applied.append(self.document.apply(delta))
+        except duet.deltas.InvalidDelta:
+            for delta in reversed(applied):
+                self.document.apply(duet.deltas.invert(delta))
+
+            raise
+
+        self.version += 1
+        self.history.append(applied)
+        return applied
+
+    def broadcast(self, text, sender=None):
+        # Сообщение сериализуется один раз для всех участников
+        for member in self.members:
+            if member is not sender:
+                member.put(text)
+
+    def start(self):
+        if self.snapshot_task is None:
+            self.snapshot_task = asyncio.create_task(self.save_periodically())
+
+    async def save(self):
+        if self.saved_version == self.version:
+            return
+
+        version = self.version
+        await duet.models.Room.objects.filter(pk=self.room_id).aupdate(
+            content=self.document.text,
+            version=version,
+            updated_at=timezone.now(),
+        )
+        self.saved_version = version
+
+    async def save_periodically(self):
+        interval = django.conf.settings.DUET_SNAPSHOT_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.save()
+            except Exception:
+                logger.exception(f'Не удалось сохранить комнату {self.room_id}')
+
+
+_states = {}
+
+
+async def get_state(room_id):
+    state = _states.get(room_id)
+    if state is not None:
+        return state
+
+    rooms = duet.models.Room.objects.filter(pk=room_id)
+    room = await rooms.afirst()
+    if room is None:
+        return None
+
+    # Пока комната читалась, её мог загрузить другой участник
+    return _states.setdefault(room_id, RoomState(room))
+
+
+async def leave(state, member):
+    state.members.discard(member)
+    if state.members:
+        return
+
+    await state.save()
+    if not state.members and _states.get(state.room_id) is state:
+        del _states[state.room_id]
+        if state.snapshot_task is not None:
+            state.snapshot_task.cancel()
+
+
+async def get_user(scope):
+    headers = dict(scope['headers'])
+    cookies = parse_cookie(headers.get(b'cookie', b'').decode('latin-1'))
+    session_key = cookies.get(django.conf.settings.SESSION_COOKIE_NAME)
+    engine = importlib.import_module(django.conf.settings.SESSION_ENGINE)
+    request = types.SimpleNamespace(session=engine.SessionStore(session_key))
+    return await django.contrib.auth.aget_user(request)
+
+
+def is_same_origin(scope):
+    headers = dict(scope['headers'])
+    origin = headers.get(b'origin')
+    if origin is None:
+        return True
+
+    host = headers.get(b'host', b'').decode('latin-1')
+    return urlsplit(origin.decode('latin-1')).netloc == host
+
+
+def handle_deltas(state, member, data):
+    version = data.get('version')
+    deltas = data.get('deltas')
+    if not isinstance(version, int) or not isinstance(deltas, list):
+        raise duet.deltas.InvalidDelta('Некорректное сообщение')
+
+    if len(deltas) > MAX_BATCH_SIZE:
+        raise duet.deltas.InvalidDelta('Слишком много изменений')
+
+    applied = state.apply(version, [duet.deltas.parse(delta) for delta in deltas])
+    member.put(json.dumps({'type': 'ack', 'version': state.version}))
+    state.broadcast(
+        json.dumps(
+            {
+                'type': 'deltas',
+                'version': state.version,
+                'deltas': [duet.deltas.serialize(delta) for delta in applied],
+            },
+        ),
+        sender=member,
+    )
+
+
+async def handle(state, member, text):
+    try:
+        data = json.loads(text or '')
+    except json.JSONDecodeError:
+        return
+
+    if not isinstance(data, dict):
+        return
+
+    if data.get('type') == 'deltas':
+        try:
+            handle_deltas(state, member, data)
+        except duet.deltas.InvalidDelta as e:
+            # Клиент разошёлся с сервером, проще отдать ему документ целиком
+            logger.info(f'Комната {state.room_id}: {e}')
+            member.put(state.get_room_state())
+    elif data.get('type') == 'save':
+        await state.save()
+        member.put(json.dumps({'type': 'saved', 'version': state.saved_version}))
+
+
+async def serve(state, member, receive, send):
+    writer = None
+    try:
+        await send({'type': 'websocket.accept'})
+        writer = asyncio.create_task(member.write(send))
+        while not member.closed:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+
+            await handle(state, member, message.get('text'))
+    finally:
+        if writer is not None:
+            writer.cancel()
+
+        await leave(state, member)
+
+
+async def application(scope, receive, send):
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    match = PATH_RE.match(scope['path'])
+    if match is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+
+    user = await get_user(scope)
+    if not user.is_authenticated or not is_same_origin(scope):
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+
+    state = await get_state(int(match['pk']))
+    if state is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+
+    # Участник добавляется без переключения цикла событий, иначе комнату
+    # могли бы выгрузить между загрузкой и подключением
+    member = Member(user)
+    state.members.add(member)
+    state.start()
+    member.put(state.get_room_state())
+    await serve(state, member, receive, send)
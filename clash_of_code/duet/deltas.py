@@ -0,0 +1,220 @@
+INSERT = 'insert'
+REMOVE = 'remove'
+ACTIONS = (INSERT, REMOVE)
+
+
+class InvalidDelta(ValueError):
+    pass
+
+
+def get_length(line):
+    # Ace считает позиции в кодовых единицах UTF-16, как и весь JavaScript
+    if line.isascii():
+        return len(line)
+
+    return len(line.encode('utf-16-le', 'surrogatepass')) // 2
+
+
+def get_index(line, column):
+    if line.isascii():
+        return column
+
+    size = column * 2
+    prefix = line.encode('utf-16-le', 'surrogatepass')[:size]
+    try:
+        return len(prefix.decode('utf-16-le'))
+    except UnicodeDecodeError as e:
+        raise InvalidDelta('Позиция внутри символа') from e
+
+
+def get_end(start, lines):
+    row, column = start
+    if len(lines) == 1:
+        return row, column + get_length(lines[0])
+
+    return row + len(lines) - 1, get_length(lines[-1])
+
+
+def parse_point(point):
+    row, column = point['row'], point['column']
+    if not isinstance(row, int) or not isinstance(column, int) or min(row, column) < 0:
+        raise InvalidDelta('Некорректная позиция')
+
+    return row, column
+
+
+def parse(delta):
+    # Формат совпадает с delta из Ace: action, start, end и lines
+    try:
+        action = delta['action']
+        start = parse_point(delta['start'])
+        end = parse_point(delta['end'])
+        lines = list(delta['lines'])
+    except (KeyError, TypeError) as e:
+        raise InvalidDelta('Некорректное изменение') from e
+
+    if action not in ACTIONS or not lines:
+        raise InvalidDelta('Некорректное изменение')
+
+    if not all(isinstance(line, str) for line in lines):
+        raise InvalidDelta('Некорректное изменение')
+
+    if action == INSERT:
+        end = get_end(start, lines)
+    elif end <= start:
+        raise InvalidDelta('Пустое удаление')
+
+    return action, start, end, lines
+
+
+def serialize(delta):
+    action, start, end, lines = delta
+    return {
+        'action': action,
+        'start': {'row': start[0], 'column': start[1]},
+        'end': {'row': end[0], 'column': end[1]},
+        'lines': lines,
+    }
+
+
+def invert(delta):
+    action, start, end, lines = delta
+    if action == INSERT:
+        return REMOVE, start, end, lines
+
+    return INSERT, start, end, lines
+
+
+def shift_after_insert(point, start, end):
+    if point[0] == start[0]:
+        return end[0], end[1] + point[1] - start[1]
+
+    return point[0] + end[0] - start[0], point[1]
+
+
+def shift_after_remove(point, start, end):
+    if point <= start:
+        return point
+
+    if point < end:
+        return start
+
+    if point[0] == end[0]:
+        return start[0], start[1] + point[1] - end[1]
+
+    return point[0] - (end[0] - start[0]), point[1]
+
+
+def transform_insert(delta, other, other_first):
+    _, start, _, lines = delta
+    other_action, other_start, other_end, _ = other
+    if other_action == REMOVE and other_start < start < other_end:
+        # Текст, вставленный внутрь удалённого фрагмента, удаляется вместе с ним
+        return None
+
+    if other_action == REMOVE:
+        start = shift_after_remove(start, other_start, other_end)
+    elif start > other_start or (start == other_start and other_first):
+        # При вставке в одно место первой считается уже применённая
+        start = shift_after_insert(start, other_start, other_end)
+
+    return INSERT, start, get_end(start, lines), lines
+
+
+def transform_remove(delta, other):
+    _, start, end, lines = delta
+    other_action, other_start, other_end, _ = other
+    if other_action == INSERT:
+        # Вставка на границе остаётся снаружи, а внутри удаляется
+        if start >= other_start:
+            start = shift_after_insert(start, other_start, other_end)
+
+        if end > other_start:
+            end = shift_after_insert(end, other_start, other_end)
+    else:
+        start = shift_after_remove(start, other_start, other_end)
+        end = shift_after_remove(end, other_start, other_end)
+
+    if end <= start:
+        return None
+
+    return REMOVE, start, end, lines
+
+
+def transform(delta, other, other_first):
+    if delta[0] == INSERT:
+        return transform_insert(delta, other, other_first)
+
+    return transform_remove(delta, other)
+
+
+def transform_batches(deltas, others):
+    # others уже применены, deltas сделаны параллельно от того же состояния.
+    # Возвращаются deltas поверх others и others поверх deltas
+    transformed_others = []
+    for other in others:
+        transformed = []
+        for delta in deltas:
+            if other is None:
+                transformed.append(delta)
+                continue
+
+            next_delta = transform(delta, other, other_first=True)
+            other = transform(other, delta, other_first=False)
+            if next_delta is not None:
+                transformed.append(next_delta)
+
+        deltas = transformed
+        if other is not None:
+            transformed_others.append(other)
+
+    return deltas, transformed_others
+
+
+class Document:
+    def __init__(self, text=''):
+        self.lines = text.split('\n')
+
+    @property
+    def text(self):
+        return '\n'.join(self.lines)
+
+    def check_point(self, point):
+        row, column = point
+        if row >= len(self.lines) or column > get_length(self.lines[row]):
+            raise InvalidDelta('Позиция за пределами документа')
+
+    def insert(self, start, lines):
+        row, column = start
+        line = self.lines[row]
+        index = get_index(line, column)
+        head, tail = line[:index], line[index:]
+        stop = row + 1
+        if len(lines) == 1:
+            self.lines[row:stop] = [head + lines[0] + tail]
+        else:
+            self.lines[row:stop] = [head + lines[0], *lines[1:-1], lines[-1] + tail]
+
+    def remove(self, start, end):
+        (start_row, start_column), (end_row, end_column) = start, end
+        start_index = get_index(self.lines[start_row], start_column)
+        end_index = get_index(self.lines[end_row], end_column)
+        stop = end_row + 1
+        removed = self.lines[start_row:stop]
+        removed[-1] = removed[-1][:end_index]
+        removed[0] = removed[0][start_index:]
+        head = self.lines[start_row][:start_index]
+        tail = self.lines[end_row][end_index:]
+        self.lines[start_row:stop] = [head + tail]
+        return removed
+
+    def apply(self, delta):
+        # Удалённые строки берутся из документа, а не из присланного изменения
+        action, start, end, lines = delta
+        self.check_point(start)
+        if action == INSERT:
+            self.insert(start, lines)
+            return delta
+
+        self.check_point(end)
+        return action, start, end, self.remove(start, end)
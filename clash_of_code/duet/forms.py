@@ -0,0 +1,17 @@
+import django.forms
+
+import duet.models
+
+
+class RoomForm(django.forms.ModelForm):
+    class Meta:
+        model = duet.models.Room
+        fields = [
+            duet.models.Room.title.field.name,
+            duet.models.Room.language.field.name,
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.visible_fields():
+            field.field.widget.attrs['class'] = 'form-control'
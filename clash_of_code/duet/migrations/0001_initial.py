@@ -0,0 +1,66 @@
+# Generated by Django 5.2 on 2026-10-18 16:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Room',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('title', models.CharField(max_length=200, verbose_name='title')),
+                (
+                    'language',
+                    models.CharField(
+                        choices=[('Py3.11', 'Python 3.11')],
+                        default='Py3.11',
+                        max_length=20,
+                        verbose_name='language',
+                    ),
+                ),
+                ('content', models.TextField(blank=True, verbose_name='content')),
+                (
+                    'version',
+                    models.PositiveIntegerField(
+                        default=0,
+                        editable=False,
+                        help_text='Number of edits applied to the saved content',
+                        verbose_name='version',
+                    ),
+                ),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                (
+                    'created_by',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='rooms',
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'room',
+                'verbose_name_plural': 'rooms',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+import django.db.models
+from django.utils.translation import gettext_lazy as _
+
+import problems.models
+
+
+User = get_user_model()
+
+
+class Room(django.db.models.Model):
+    title = django.db.models.CharField(
+        verbose_name=_('title'),
+        max_length=200,
+    )
+    language = django.db.models.CharField(
+        verbose_name=_('language'),
+        choices=problems.models.LanguageChoices,
+        default=problems.models.LanguageChoices.Python_3_11,
+        max_length=20,
+    )
+    content = django.db.models.TextField(
+        verbose_name=_('content'),
+        blank=True,
+    )
+    version = django.db.models.PositiveIntegerField(
+        verbose_name=_('version'),
+        help_text=_('Number of edits applied to the saved content'),
+        default=0,
+        editable=False,
+    )
+    created_by = django.db.models.ForeignKey(
+        to=User,
+        on_delete=django.db.models.CASCADE,
+        related_name='rooms',
+    )
+    created_at = django.db.models.DateTimeField(
+        auto_now_add=True,
+    )
+    updated_at = django.db.models.DateTimeField(
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = _('room')
+        verbose_name_plural = _('rooms')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.title
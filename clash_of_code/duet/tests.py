@@ -0,0 +1,174 @@
+import json
+
+from asgiref.testing import ApplicationCommunicator
+import django.conf
+import django.shortcuts
+import django.test
+
+import duet.consumers
+import duet.deltas
+import duet.models
+import users.models
+
+
+def insert(row, column, text):
+    lines = text.split('\n')
+    start = (row, column)
+    return duet.deltas.INSERT, start, duet.deltas.get_end(start, lines), lines
+
+
+def remove(start, end):
+    return duet.deltas.REMOVE, start, end, ['']
+
+
+class DeltaTests(django.test.SimpleTestCase):
+    def test_apply(self):
+        document = duet.deltas.Document('hello\nworld')
+        document.apply(insert(0, 5, ',\nbig'))
+        self.assertEqual(document.text, 'hello,\nbig\nworld')
+
+        applied = document.apply(remove((0, 5), (1, 3)))
+        self.assertEqual(applied[3], [',', 'big'])
+        self.assertEqual(document.text, 'hello\nworld')
+
+    def test_columns_are_utf16(self):
+        document = duet.deltas.Document('😀b')
+        document.apply(insert(0, 2, 'a'))
+        self.assertEqual(document.text, '😀ab')
+        with self.assertRaises(duet.deltas.InvalidDelta):
+            document.apply(insert(0, 1, 'x'))
+
+    def test_point_outside_document(self):
+        document = duet.deltas.Document('abc')
+        with self.assertRaises(duet.deltas.InvalidDelta):
+            document.apply(insert(1, 0, 'x'))
+
+    def test_concurrent_edits_converge(self):
+        cases = [
+            ([insert(0, 1, 'X')], [insert(0, 1, 'Y')]),
+            ([insert(0, 2, 'X')], [remove((0, 1), (0, 4))]),
+            ([remove((0, 0), (0, 3))], [remove((0, 2), (0, 5))]),
+            ([insert(0, 6, '\n')], [insert(0, 0, 'a\nb')]),
+        ]
+        for local, remote in cases:
+            with self.subTest(local=local, remote=remote):
+                server = duet.deltas.Document('abcdef')
+                client = duet.deltas.Document('abcdef')
+                for delta in remote:
+                    server.apply(delta)
+
+                for delta in local:
+                    client.apply(delta)
+
+                local_after, remote_after = duet.deltas.transform_batches(
+                    local,
+                    remote,
+                )
+                for delta in local_after:
+                    server.apply(delta)
+
+                for delta in remote_after:
+                    client.apply(delta)
+
+                self.assertEqual(server.text, client.text)
+
+
+class RoomConsumerTests(django.test.TestCase):
+    def setUp(self):
+        self.user = users.models.User.objects.create_user(username='first')
+        self.room = duet.models.Room.objects.create(
+            title='room',
+            content='print()',
+            created_by=self.user,
+        )
+        self.client.force_login(self.user)
+        self.cookie = self.client.cookies[django.conf.settings.SESSION_COOKIE_NAME]
+
+    def get_scope(self, path=None):
+        cookie = f'{self.cookie.key}={self.cookie.value}'
+        return {
+            'type': 'websocket',
+            'path': path or f'/ws/duet/{self.room.pk}/',
+            'headers': [(b'cookie', cookie.encode()), (b'host', b'testserver')],
+        }
+
+    async def connect(self):
+        communicator = ApplicationCommunicator(
+            duet.consumers.application,
+            self.get_scope(),
+        )
+        await communicator.send_input({'type': 'websocket.connect'})
+        self.assertEqual(
+            await communicator.receive_output(),
+            {'type': 'websocket.accept'},
+        )
+        return communicator
+
+    async def receive(self, communicator):
+        message = await communicator.receive_output()
+        return json.loads(message['text'])
+
+    async def test_deltas_are_broadcast_and_saved(self):
+        first = await self.connect()
+        self.assertEqual(
+            await self.receive(first),
+            {'type': 'room_state', 'content': 'print()', 'version': 0},
+        )
+        second = await self.connect()
+        await self.receive(second)
+
+        delta = duet.deltas.serialize(insert(0, 6, '42'))
+        await first.send_input(
+            {
+                'type': 'websocket.receive',
+                'text': json.dumps({'type': 'deltas', 'version': 0, 'deltas': [delta]}),
+            },
+        )
+        self.assertEqual(await self.receive(first), {'type': 'ack', 'version': 1})
+        self.assertEqual(
+            await self.receive(second),
+            {'type': 'deltas', 'version': 1, 'deltas': [delta]},
+        )
+
+        await first.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await first.wait()
+        await second.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await second.wait()
+
+        await self.room.arefresh_from_db()
+        self.assertEqual(self.room.content, 'print(42)')
+        self.assertEqual(self.room.version, 1)
+        self.assertNotIn(self.room.pk, duet.consumers._states)
+
+    async def test_invalid_delta_resends_document(self):
+        communicator = await self.connect()
+        await self.receive(communicator)
+        delta = duet.deltas.serialize(insert(3, 0, 'x'))
+        await communicator.send_input(
+            {
+                'type': 'websocket.receive',
+                'text': json.dumps({'type': 'deltas', 'version': 0, 'deltas': [delta]}),
+            },
+        )
+        message = await self.receive(communicator)
+        self.assertEqual(message['type'], 'room_state')
+        self.assertEqual(message['content'], 'print()')
+
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait()
+
+    async def test_anonymous_is_rejected(self):
+        scope = self.get_scope()
+        scope['headers'] = [(b'host', b'testserver')]
+        communicator = ApplicationCommunicator(duet.consumers.application, scope)
+        await communicator.send_input({'type': 'websocket.connect'})
+        message = await communicator.receive_output()
+        self.assertEqual(message['type'], 'websocket.close')
+        self.assertEqual(message['code'], duet.consumers.CLOSE_FORBIDDEN)
+
+    def test_room_page(self):
+        response = self.client.get(
+            django.shortcuts.reverse('duet:room', args=[self.room.pk]),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['room_data']['languageMode'], 'python')
@@ -0,0 +1,19 @@
+import django.urls
+
+import duet.views
+
+
+app_name = 'duet'
+
+urlpatterns = [
+    django.urls.path(
+        'create/',
+        duet.views.RoomCreateView.as_view(),
+        name='create',
+    ),
+    django.urls.path(
+        '<int:pk>/',
+        duet.views.RoomDetailView.as_view(),
+        name='room',
+    ),
+]
@@ -0,0 +1,42 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+from django.views.generic import CreateView, DetailView
+
+import duet.forms
+import duet.models
+import problems.models
+
+
+ACE_MODES = {
+    problems.models.LanguageChoices.Python_3_11: 'python',
+}
+
+
+class RoomCreateView(LoginRequiredMixin, CreateView):
+    model = duet.models.Room
+    form_class = duet.forms.RoomForm
+    template_name = 'duet/create.html'
+
+    def form_valid(self, form):
+        form.instance.created_by = self.request.user
+        return super().form_valid(form)
+
+    def get_success_url(self):
+        return reverse('duet:room', kwargs={'pk': self.object.pk})
+
+
+class RoomDetailView(LoginRequiredMixin, DetailView):
+    model = duet.models.Room
+    template_name = 'duet/room.html'
+    context_object_name = 'room'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['room_data'] = {
+            'languageMode': ACE_MODES.get(self.object.language, 'text'),
+            'socketPath': f'/ws/duet/{self.object.pk}/',
+            'connectedText': _('Connected'),
+            'disconnectedText': _('Reconnecting'),
+        }
+        return context
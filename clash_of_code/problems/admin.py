@@ -26,13 +26,50 @@ class TagAdmin(django.contrib.admin.ModelAdmin):
     list_display_links = (problems.models.Tag.name.field.name,)
 
 
+@django.contrib.admin.register(problems.models.TestGroup)
+class TestGroupAdmin(django.contrib.admin.ModelAdmin):
+    list_display = (
+        'problem_name',
+        problems.models.TestGroup.number.field.name,
+        problems.models.TestGroup.points.field.name,
+    )
+
+    filter_horizontal = (problems.models.TestGroup.depends_on.field.name,)
+
+    def get_form(self, request, obj=None, **kwargs):
+        self.edited_group = obj
+        return super().get_form(request, obj, **kwargs)
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.name == problems.models.TestGroup.depends_on.field.name:
+            # Зависеть можно только от групп той же задачи с меньшим номером
+            group = self.edited_group
+            queryset = problems.models.TestGroup.objects.none()
+            if group is not None:
+                queryset = problems.models.TestGroup.objects.filter(
+                    problem_id=group.problem_id,
+                    number__lt=group.number,
+                )
+
+            kwargs['queryset'] = queryset
+
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+    @django.contrib.admin.display(empty_value='???')
+    def problem_name(self, obj):
+        return obj.problem.title[:20]
+
+
 @django.contrib.admin.register(problems.models.TestCase)
 class TestAdmin(django.contrib.admin.ModelAdmin):
     list_display = (
         'problem_name',
         problems.models.TestCase.is_sample.field.name,
+        problems.models.TestCase.group.field.name,
     )
 
+    readonly_fields = ('input_preview', 'output_preview')
+
     list_editable = (problems.models.TestCase.is_sample.field.name,)
 
     @django.contrib.admin.display(empty_value='???')
@@ -18,6 +18,15 @@ class FormControlMixin:
 
 
 class ProblemsForm(FormControlMixin, django.forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        checker = self.fields[problems.models.Problem.checker.field.name]
+        checker.required = False
+
+    def clean_checker(self):
+        checker = self.cleaned_data[problems.models.Problem.checker.field.name]
+        return checker or problems.models.CheckerChoice.Tokens
+
     class Meta:
         model = problems.models.Problem
 
@@ -32,6 +41,9 @@ class ProblemsForm(FormControlMixin, django.forms.ModelForm):
             problems.models.Problem.output_format.field.name,
             problems.models.Problem.time_limit.field.name,
             problems.models.Problem.memory_limit.field.name,
+            problems.models.Problem.checker.field.name,
+            problems.models.Problem.checker_epsilon.field.name,
+            problems.models.Problem.checker_code.field.name,
             problems.models.Problem.tags.field.name,
         )
 
@@ -44,12 +56,14 @@ class ProblemsForm(FormControlMixin, django.forms.ModelForm):
 
 class TestForm(django.forms.ModelForm):
     pk = django.forms.IntegerField(min_value=0, required=False)
+    input_data = django.forms.CharField(required=False, strip=False)
+    output_data = django.forms.CharField(required=False, strip=False)
+    input_file = django.forms.FileField(required=False)
+    output_file = django.forms.FileField(required=False)
 
     class Meta:
         model = problems.models.TestCase
         fields = (
             problems.models.TestCase.is_sample.field.name,
             problems.models.TestCase.number.field.name,
-            problems.models.TestCase.input_data.field.name,
-            problems.models.TestCase.output_data.field.name,
         )
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            'problems',
+            '0012_alter_problem_description_alter_problem_input_format_and_more',
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='tests_version',
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text='Increases every time the tests of the problem change',
+                verbose_name='tests version',
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0013_problem_tests_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='problem',
+            name='status',
+            field=models.CharField(
+                choices=[
+                    ('AC', 'Accept'),
+                    ('CE', 'Compilation error'),
+                    ('WA', 'Wrong answer'),
+                    ('TL', 'Time limit'),
+                    ('RE', 'Runtime error'),
+                    ('ML', 'Memory limit'),
+                    ('IQ', 'In queue'),
+                    ('IP', 'In processing'),
+                    ('SK', 'Skipped'),
+                ],
+                default='IQ',
+                verbose_name='status checked',
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2 on 2026-10-18 16:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0014_alter_problem_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestGroup',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'number',
+                    models.PositiveIntegerField(
+                        default=1, verbose_name='number of group'
+                    ),
+                ),
+                (
+                    'points',
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text='Points for passing all the tests of the group',
+                        verbose_name='points',
+                    ),
+                ),
+                (
+                    'depends_on',
+                    models.ManyToManyField(
+                        blank=True,
+                        help_text='If one of these groups fails, the tests of this group are skipped. Only groups with a smaller number are taken into account',
+                        related_name='dependents',
+                        to='problems.testgroup',
+                        verbose_name='depends on',
+                    ),
+                ),
+                (
+                    'problem',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='groups',
+                        to='problems.problem',
+                        verbose_name='problem',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'test group',
+                'verbose_name_plural': 'test groups',
+                'ordering': ['number'],
+                'unique_together': {('problem', 'number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='group',
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name='tests',
+                to='problems.testgroup',
+                verbose_name='test group',
+            ),
+        ),
+    ]
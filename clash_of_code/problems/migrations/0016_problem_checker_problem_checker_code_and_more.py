@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 16:04
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0015_testgroup_testcase_group'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='checker',
+            field=models.CharField(
+                choices=[
+                    ('tokens', 'Tokens'),
+                    ('exact', 'Exact match'),
+                    ('custom', 'Custom checker'),
+                ],
+                default='tokens',
+                help_text='How the output is compared with the answer. Tokens ignores the amount of whitespace, exact match compares the whole output',
+                max_length=10,
+                verbose_name='checker',
+            ),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='checker_code',
+            field=models.TextField(
+                blank=True,
+                help_text='Python program that gets the input file and the answer file as arguments and the output of the solution on stdin. Exit code 0 means accepted, 1 means wrong answer',
+                max_length=8000,
+                null=True,
+                verbose_name='checker code',
+            ),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='checker_epsilon',
+            field=models.FloatField(
+                blank=True,
+                help_text='Absolute or relative error allowed when comparing real numbers with the tokens checker',
+                null=True,
+                validators=[django.core.validators.MinValueValidator(0)],
+                verbose_name='checker epsilon',
+            ),
+        ),
+    ]
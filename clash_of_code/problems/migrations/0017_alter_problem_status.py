@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 16:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0016_problem_checker_problem_checker_code_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='problem',
+            name='status',
+            field=models.CharField(
+                choices=[
+                    ('AC', 'Accept'),
+                    ('CE', 'Compilation error'),
+                    ('WA', 'Wrong answer'),
+                    ('TL', 'Time limit'),
+                    ('RE', 'Runtime error'),
+                    ('ML', 'Memory limit'),
+                    ('OL', 'Output limit'),
+                    ('IQ', 'In queue'),
+                    ('IP', 'In processing'),
+                    ('SK', 'Skipped'),
+                ],
+                default='IQ',
+                verbose_name='status checked',
+            ),
+        ),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 5.2 on 2026-10-18 16:09
+
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import migrations, models
+
+BATCH_SIZE = 100
+FIELDS = ['input_hash', 'input_size', 'output_hash', 'output_size']
+
+
+def save(storage, text):
+    content = text.encode('utf-8')
+    digest = hashlib.sha256(content).hexdigest()
+    name = f'{digest[:2]}/{digest}'
+    if not storage.exists(name):
+        storage.save(name, ContentFile(content))
+
+    return digest, len(content)
+
+
+def read(storage, digest):
+    if not digest:
+        return ''
+
+    with storage.open(f'{digest[:2]}/{digest}', 'rb') as file:
+        return file.read().decode('utf-8')
+
+
+def iter_batches(queryset):
+    # Записи обновляются пачками по id, чтобы не писать в таблицу,
+    # пока по ней открыт курсор
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(pks), BATCH_SIZE):
+        stop = start + BATCH_SIZE
+        yield list(queryset.filter(pk__in=pks[start:stop]))
+
+
+def move_to_storage(apps, schema_editor):
+    storage = storages['testdata']
+    test_case_model = apps.get_model('problems', 'TestCase')
+    for batch in iter_batches(test_case_model.objects.all()):
+        for test in batch:
+            test.input_hash, test.input_size = save(storage, test.input_data)
+            test.output_hash, test.output_size = save(storage, test.output_data)
+
+        test_case_model.objects.bulk_update(batch, FIELDS)
+
+
+def move_to_database(apps, schema_editor):
+    storage = storages['testdata']
+    test_case_model = apps.get_model('problems', 'TestCase')
+    for batch in iter_batches(test_case_model.objects.all()):
+        for test in batch:
+            test.input_data = read(storage, test.input_hash)
+            test.output_data = read(storage, test.output_hash)
+
+        test_case_model.objects.bulk_update(batch, ['input_data', 'output_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0017_alter_problem_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcase',
+            name='input_hash',
+            field=models.CharField(
+                default='',
+                editable=False,
+                max_length=64,
+                verbose_name='input data hash',
+            ),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='input_size',
+            field=models.PositiveBigIntegerField(
+                default=0, editable=False, verbose_name='input data size'
+            ),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='output_hash',
+            field=models.CharField(
+                default='',
+                editable=False,
+                max_length=64,
+                verbose_name='output data hash',
+            ),
+        ),
+        migrations.AddField(
+            model_name='testcase',
+            name='output_size',
+            field=models.PositiveBigIntegerField(
+                default=0, editable=False, verbose_name='output data size'
+            ),
+        ),
+        migrations.RunPython(move_to_storage, move_to_database),
+        # Значение по умолчанию нужно, чтобы при откате поля вернулись
+        # в таблицу с уже существующими записями
+        migrations.AlterField(
+            model_name='testcase',
+            name='input_data',
+            field=models.TextField(default='', verbose_name='input data'),
+        ),
+        migrations.AlterField(
+            model_name='testcase',
+            name='output_data',
+            field=models.TextField(default='', verbose_name='output data'),
+        ),
+        migrations.RemoveField(
+            model_name='testcase',
+            name='input_data',
+        ),
+        migrations.RemoveField(
+            model_name='testcase',
+            name='output_data',
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0018_testcase_test_data_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='problem',
+            name='status',
+            field=models.CharField(
+                choices=[
+                    ('AC', 'Accept'),
+                    ('CE', 'Compilation error'),
+                    ('WA', 'Wrong answer'),
+                    ('TL', 'Time limit'),
+                    ('RE', 'Runtime error'),
+                    ('ML', 'Memory limit'),
+                    ('OL', 'Output limit'),
+                    ('IQ', 'In queue'),
+                    ('IP', 'In processing'),
+                    ('SK', 'Skipped'),
+                    ('JE', 'Judge error'),
+                ],
+                default='IQ',
+                verbose_name='status checked',
+            ),
+        ),
+    ]
@@ -1,10 +1,13 @@
 import django.conf
 from django.contrib.auth import get_user_model
+import django.core.exceptions
 import django.core.validators
 import django.db.models
 from django.utils.translation import gettext_lazy as _
 import tinymce.models
 
+import problems.testdata
+
 User = get_user_model()
 
 
@@ -19,8 +22,17 @@ class VerdictChoice(django.db.models.TextChoices):
     Time_limit = 'TL', _('Time limit')
     Runtime_error = 'RE', _('Runtime error')
     Memory_limit = 'ML', _('Memory limit')
+    Output_limit = 'OL', _('Output limit')
     In_queue = 'IQ', _('In queue')
     In_processing = 'IP', _('In processing')
+    Skipped = 'SK', _('Skipped')
+    Judge_error = 'JE', _('Judge error')
+
+
+class CheckerChoice(django.db.models.TextChoices):
+    Tokens = 'tokens', _('Tokens')
+    Exact = 'exact', _('Exact match')
+    Custom = 'custom', _('Custom checker')
 
 
 class Tag(django.db.models.Model):
@@ -149,6 +161,42 @@ class Problem(django.db.models.Model):
         ),
     )
 
+    checker = django.db.models.CharField(
+        verbose_name=_('checker'),
+        help_text=_(
+            'How the output is compared with the answer. Tokens ignores '
+            'the amount of whitespace, exact match compares the whole output',
+        ),
+        choices=CheckerChoice,
+        default=CheckerChoice.Tokens,
+        max_length=10,
+    )
+
+    checker_epsilon = django.db.models.FloatField(
+        verbose_name=_('checker epsilon'),
+        help_text=_(
+            'Absolute or relative error allowed when comparing real numbers '
+            'with the tokens checker',
+        ),
+        validators=[
+            django.core.validators.MinValueValidator(0),
+        ],
+        null=True,
+        blank=True,
+    )
+
+    checker_code = django.db.models.TextField(
+        verbose_name=_('checker code'),
+        help_text=_(
+            'Python program that gets the input file and the answer file as '
+            'arguments and the output of the solution on stdin. Exit code 0 '
+            'means accepted, 1 means wrong answer',
+        ),
+        max_length=8000,
+        null=True,
+        blank=True,
+    )
+
     is_correct = django.db.models.BooleanField(
         verbose_name=_('is correct'),
         help_text=_("Shows whether the author's solution is correct"),
@@ -173,6 +221,13 @@ class Problem(django.db.models.Model):
         null=True,
     )
 
+    tests_version = django.db.models.PositiveIntegerField(
+        verbose_name=_('tests version'),
+        help_text=_('Increases every time the tests of the problem change'),
+        default=0,
+        editable=False,
+    )
+
     created_at = django.db.models.DateTimeField(
         auto_now_add=True,
     )
@@ -180,8 +235,26 @@ class Problem(django.db.models.Model):
     def clean(self):
         # TODO когда будет тест система нужно проверить
         # авторское решение перед сейвом и добавлением теста
+        if self.checker == CheckerChoice.Custom and not self.checker_code:
+            raise django.core.exceptions.ValidationError(
+                {'checker_code': _('Custom checker needs the checker code')},
+            )
+
         return super().clean()
 
+    def save(self, *args, **kwargs):
+        # tests_version увеличивают только сигналы тестов через UPDATE с F(),
+        # поэтому сохранение загруженной раньше задачи его не откатывает
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name != Problem.tests_version.field.name
+            ]
+
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.title[:20]
 
@@ -190,6 +263,47 @@ class Problem(django.db.models.Model):
         verbose_name_plural = _('problems')
 
 
+class TestGroup(django.db.models.Model):
+    problem = django.db.models.ForeignKey(
+        Problem,
+        verbose_name=_('problem'),
+        on_delete=django.db.models.CASCADE,
+        related_name='groups',
+    )
+
+    number = django.db.models.PositiveIntegerField(
+        verbose_name=_('number of group'),
+        default=1,
+    )
+
+    points = django.db.models.PositiveIntegerField(
+        verbose_name=_('points'),
+        help_text=_('Points for passing all the tests of the group'),
+        default=0,
+    )
+
+    depends_on = django.db.models.ManyToManyField(
+        'self',
+        verbose_name=_('depends on'),
+        help_text=_(
+            'If one of these groups fails, the tests of this group are skipped. '
+            'Only groups with a smaller number are taken into account',
+        ),
+        symmetrical=False,
+        blank=True,
+        related_name='dependents',
+    )
+
+    def __str__(self):
+        return self.problem.title[:20] + ' ' + str(self.number)
+
+    class Meta:
+        verbose_name = _('test group')
+        verbose_name_plural = _('test groups')
+        unique_together = ['problem', 'number']
+        ordering = ['number']
+
+
 class TestCase(django.db.models.Model):
     problem = django.db.models.ForeignKey(
         Problem,
@@ -204,19 +318,32 @@ class TestCase(django.db.models.Model):
         default=False,
     )
 
-    input_data = django.db.models.TextField(
-        verbose_name=_('input data'),
-        help_text=_(
-            'Input data for the test. It will be passed '
-            'to the program during execution via the standard stream',
-        ),
+    # Сами данные теста лежат в хранилище problems.testdata под своим
+    # sha256, в базе остаются только хеш и размер
+    input_hash = django.db.models.CharField(
+        verbose_name=_('input data hash'),
+        max_length=64,
+        default='',
+        editable=False,
     )
 
-    output_data = django.db.models.TextField(
-        verbose_name=_('output data'),
-        help_text=_(
-            'Test output. The program should output exactly this text in this format',
-        ),
+    input_size = django.db.models.PositiveBigIntegerField(
+        verbose_name=_('input data size'),
+        default=0,
+        editable=False,
+    )
+
+    output_hash = django.db.models.CharField(
+        verbose_name=_('output data hash'),
+        max_length=64,
+        default='',
+        editable=False,
+    )
+
+    output_size = django.db.models.PositiveBigIntegerField(
+        verbose_name=_('output data size'),
+        default=0,
+        editable=False,
     )
 
     number = django.db.models.PositiveIntegerField(
@@ -224,6 +351,51 @@ class TestCase(django.db.models.Model):
         default=1,
     )
 
+    group = django.db.models.ForeignKey(
+        TestGroup,
+        verbose_name=_('test group'),
+        on_delete=django.db.models.SET_NULL,
+        related_name='tests',
+        blank=True,
+        null=True,
+    )
+
+    @property
+    def input_data(self):
+        return problems.testdata.read(self.input_hash).decode('utf-8')
+
+    @input_data.setter
+    def input_data(self, value):
+        self.input_hash, self.input_size = problems.testdata.save(value.encode())
+
+    @property
+    def output_data(self):
+        return problems.testdata.read(self.output_hash).decode('utf-8')
+
+    @output_data.setter
+    def output_data(self, value):
+        self.output_hash, self.output_size = problems.testdata.save(value.encode())
+
+    @property
+    def input_preview(self):
+        return problems.testdata.read_preview(self.input_hash)
+
+    @property
+    def output_preview(self):
+        return problems.testdata.read_preview(self.output_hash)
+
+    @property
+    def is_input_truncated(self):
+        return self.input_size > problems.testdata.PREVIEW_SIZE
+
+    @property
+    def is_output_truncated(self):
+        return self.output_size > problems.testdata.PREVIEW_SIZE
+
+    @property
+    def is_large(self):
+        return self.is_input_truncated or self.is_output_truncated
+
     def __str__(self):
         return self.problem.title[:20] + ' ' + str(self.number)
 
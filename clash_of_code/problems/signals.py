@@ -1,15 +1,46 @@
-from django.db.models.signals import pre_save
+import django.db.models
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
 from django.dispatch import receiver
 
 import problems.models
 
 
+CHECKED_FIELDS = (
+    problems.models.Problem.author_solution.field.name,
+    problems.models.Problem.checker.field.name,
+    problems.models.Problem.checker_epsilon.field.name,
+    problems.models.Problem.checker_code.field.name,
+)
+
+
 @receiver(pre_save, sender=problems.models.Problem)
 def check_update_author_solution(sender, instance, **kwargs):
     if instance.pk:
-        old_author_solution = problems.models.Problem.objects.get(
-            pk=instance.pk,
-        ).author_solution
+        # Смена чекера тоже требует заново проверить авторское решение
+        old_values = problems.models.Problem.objects.values_list(
+            *CHECKED_FIELDS,
+        ).get(pk=instance.pk)
 
-        if old_author_solution != instance.author_solution:
+        if old_values != tuple(getattr(instance, field) for field in CHECKED_FIELDS):
             instance.is_correct = False
+
+
+@receiver(post_save, sender=problems.models.TestCase)
+@receiver(post_delete, sender=problems.models.TestCase)
+@receiver(post_save, sender=problems.models.TestGroup)
+@receiver(post_delete, sender=problems.models.TestGroup)
+def update_tests_version(sender, instance, **kwargs):
+    problems.models.Problem.objects.filter(pk=instance.problem_id).update(
+        tests_version=django.db.models.F('tests_version') + 1,
+    )
+
+
+@receiver(m2m_changed, sender=problems.models.TestGroup.depends_on.through)
+def update_tests_version_on_dependencies(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        update_tests_version(sender, instance)
@@ -1,5 +1,3 @@
-import json
-
 from clash_of_code.celery import app
 import core.core
 import problems.models
@@ -13,29 +11,7 @@ def check_auther_solution(pk_task):
 
     code = problem.author_solution
     lang = problem.author_language
-    tests = problem.tests.all()
-    max_time = problem.time_limit
-    max_memory = problem.memory_limit
-
-    tests_json = list()
-    for test in tests:
-        test_json = {
-            'input_data': test.input_data,
-            'output_data': test.output_data,
-            'number': test.number,
-        }
-        tests_json.append(test_json)
-
-    data = {
-        'input_data': json.dumps(
-            {
-                'tests': tests_json,
-                'user_code': code,
-                'time_limit': max_time,
-                'memory_limit': max_memory,
-            },
-        ),
-    }
+    data = core.core.prepare_data(problem, code)
 
     result = core.core.check_tests(data, lang)
     status = result['status']
@@ -51,5 +27,5 @@ def check_auther_solution(pk_task):
     else:
         problem.status = status
         problem.test_error = test_error
-        problem.logs = message
+        problem.logs = core.core.truncate_log(message)
         problem.save()
@@ -0,0 +1,59 @@
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+
+
+STORAGE_ALIAS = 'testdata'
+
+PREVIEW_SIZE = 1024
+HASH_CHUNK_SIZE = 64 * 1024
+
+EMPTY_DIGEST = hashlib.sha256(b'').hexdigest()
+
+
+def get_storage():
+    return storages[STORAGE_ALIAS]
+
+
+def get_name(digest):
+    return f'{digest[:2]}/{digest}'
+
+
+def save_file(file):
+    # Файл хешируется по кускам, чтобы большие тесты не читались в память
+    file.seek(0)
+    sha256 = hashlib.sha256()
+    size = 0
+    while chunk := file.read(HASH_CHUNK_SIZE):
+        sha256.update(chunk)
+        size += len(chunk)
+
+    digest = sha256.hexdigest()
+    name = get_name(digest)
+    storage = get_storage()
+    if not storage.exists(name):
+        file.seek(0)
+        storage.save(name, file)
+
+    return digest, size
+
+
+def save(content):
+    return save_file(ContentFile(content))
+
+
+def open_file(digest):
+    return get_storage().open(get_name(digest), 'rb')
+
+
+def read(digest, size=-1):
+    if not digest or digest == EMPTY_DIGEST:
+        return b''
+
+    with open_file(digest) as file:
+        return file.read(size)
+
+
+def read_preview(digest):
+    return read(digest, PREVIEW_SIZE).decode('utf-8', 'replace')
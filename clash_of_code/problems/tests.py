@@ -1,10 +1,24 @@
 import http
+import json
+import unittest
+from unittest import mock
 
+from asgiref.sync import sync_to_async
+import django.conf
+from django.core.files.uploadedfile import SimpleUploadedFile
 import django.shortcuts
 import django.test
+from django.utils import timezone
 
+import clash_of_code.celery
+import contests.models
+import core.compiler
+import core.pool
 import problems.models
 import problems.tasks
+import submissions.lease
+import submissions.models
+import submissions.tasks
 import users.models
 
 
@@ -63,8 +77,343 @@ class ProblemTests(django.test.TestCase):
         self.client.post(django.shortcuts.reverse('problems:create_task'), data=data)
         self.assertEqual(problems_count, problems.models.Problem.objects.count())
 
+    def test_large_test_is_stored_off_database(self):
+        problem = problems.models.Problem.objects.create(
+            title='test',
+            description='test',
+            difficult=10,
+            author=self.user,
+        )
+        url = django.shortcuts.reverse('problems:tests', args=[problem.pk])
+        input_data = '1 ' * 5000
+        self.client.post(
+            url,
+            data={
+                'number': 1,
+                'input_file': SimpleUploadedFile('input.txt', input_data.encode()),
+                'output_data': '1',
+            },
+        )
+
+        test = problem.tests.get()
+        self.assertEqual(test.input_size, len(input_data))
+        self.assertEqual(test.input_data, input_data)
+        self.assertEqual(test.output_data, '1')
+
+        response = self.client.get(url)
+        self.assertContains(response, test.input_preview)
+        self.assertNotContains(response, input_data)
+
+        self.client.post(url, data={'number': 1, 'pk': test.pk, 'is_sample': True})
+        test.refresh_from_db()
+        self.assertTrue(test.is_sample)
+        self.assertEqual(test.input_data, input_data)
+
+    def test_tests_version_grows_on_test_change(self):
+        problem = problems.models.Problem.objects.create(
+            title='test',
+            description='test',
+            difficult=10,
+            author=self.user,
+        )
+        url = django.shortcuts.reverse('problems:tests', args=[problem.pk])
+
+        self.client.post(url, data={'number': 1, 'input_data': '1', 'output_data': '1'})
+        problem.refresh_from_db()
+        self.assertEqual(problem.tests_version, 1)
+
+        test = problem.tests.get()
+        self.client.post(url, data={'number': 1, 'pk': test.pk, 'output_data': '2'})
+        problem.refresh_from_db()
+        self.assertEqual(problem.tests_version, 2)
+
+        stale = problems.models.Problem.objects.get(pk=problem.pk)
+        problems.models.TestCase.objects.create(problem=problem, number=2)
+        stale.status = problems.models.VerdictChoice.In_processing
+        stale.save()
+        problem.refresh_from_db()
+        self.assertEqual(problem.tests_version, 3)
+        self.assertEqual(problem.status, problems.models.VerdictChoice.In_processing)
+
+
+class CheckSolutionTests(django.test.TestCase):
+    def setUp(self):
+        self.user = users.models.User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword123',
+        )
+        self.problem = problems.models.Problem.objects.create(
+            title='test',
+            description='test',
+            difficult=10,
+            author=self.user,
+        )
+        for number in (1, 2):
+            problems.models.TestCase.objects.create(
+                problem=self.problem,
+                input_data='1',
+                output_data='1',
+                number=number,
+            )
+
+        self.submission = submissions.models.Submission.objects.create(
+            user=self.user,
+            problem=self.problem,
+            code='print(input())',
+            language=problems.models.LanguageChoices.Python_3_11,
+        )
+        core.compiler.get_cache().clear()
+
+    def check(self, result):
+        with (
+            mock.patch('core.core.prepare_data', return_value={}),
+            mock.patch('core.core.check_tests', return_value=result),
+        ):
+            submissions.tasks.check_solution(self.submission.pk)
+
+        self.submission.refresh_from_db()
+
+    def test_test_results_are_saved(self):
+        self.check(
+            {
+                'status': 'WA',
+                'test_error': 2,
+                'message': 'Wrong answer on test 2',
+                'tests': [
+                    {
+                        'number': 1,
+                        'status': 'AC',
+                        'cpu_time': 12,
+                        'wall_time': 15,
+                        'memory': 9000,
+                    },
+                    {
+                        'number': 2,
+                        'status': 'WA',
+                        'cpu_time': 10,
+                        'wall_time': 11,
+                        'memory': 9100,
+                    },
+                ],
+            },
+        )
+
+        self.assertEqual(self.submission.verdict, 'WA')
+        self.assertEqual(self.submission.test_error.number, 2)
+        self.assertEqual(
+            list(
+                self.submission.test_results.values_list('number', 'verdict', 'memory'),
+            ),
+            [(1, 'AC', 9000), (2, 'WA', 9100)],
+        )
+
+        client = django.test.Client()
+        client.force_login(self.user)
+        response = client.get(
+            django.shortcuts.reverse(
+                'problems:submission_detail',
+                args=[self.submission.pk],
+            ),
+        )
+        self.assertEqual(len(response.context['test_results']), 2)
+
+    def check_and_publish(self, result):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.check(result)
+
+    async def test_verdict_is_pushed_to_page(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(
+            django.shortcuts.reverse('problems:submission_events'),
+            {'ids': str(self.submission.pk)},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = aiter(response.streaming_content)
+        self.assertIn(b'"verdict": "IQ"', await anext(events))
+
+        await sync_to_async(self.check_and_publish)({'status': 'AC'})
+        verdicts = []
+        async for event in events:
+            data = event.decode().split('data: ', 1)[1]
+            verdicts.append(json.loads(data)['verdict'])
+
+        self.assertEqual(verdicts, ['IP', 'AC'])
+
+    async def test_foreign_verdicts_are_hidden(self):
+        other = await users.models.User.objects.acreate(username='other')
+        await self.async_client.aforce_login(other)
+        response = await self.async_client.get(
+            django.shortcuts.reverse('problems:submission_events'),
+            {'ids': str(self.submission.pk)},
+        )
+        self.assertEqual(response.status_code, http.HTTPStatus.NOT_FOUND)
+
+    def requeue(self):
+        submissions.models.Submission.objects.filter(pk=self.submission.pk).update(
+            verdict=problems.models.VerdictChoice.In_queue,
+            judge_id='',
+            judge_heartbeat=None,
+        )
+
+    def test_rejudge_replaces_test_results(self):
+        test = {'number': 1, 'status': 'AC', 'cpu_time': 1, 'wall_time': 1}
+        self.check({'status': 'AC', 'tests': [{**test, 'memory': 1}]})
+        core.compiler.get_cache().clear()
+        self.requeue()
+        self.check({'status': 'AC', 'tests': [{**test, 'memory': 2}]})
+
+        self.assertEqual(
+            list(self.submission.test_results.values_list('memory', flat=True)),
+            [2],
+        )
+
+    def test_judged_submission_is_not_checked_again(self):
+        self.check({'status': 'WA', 'test_error': 1, 'message': 'Wrong answer'})
+        with mock.patch('core.core.check_tests') as check_tests:
+            submissions.tasks.check_solution(self.submission.pk)
+
+        check_tests.assert_not_called()
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.verdict, 'WA')
+        self.assertEqual(self.submission.judge_id, '')
+        self.assertIsNone(self.submission.judge_heartbeat)
+
+    def test_duplicate_task_drops_out(self):
+        self.assertTrue(submissions.lease.claim(self.submission.pk, 'first'))
+        with mock.patch('core.core.check_tests') as check_tests:
+            submissions.tasks.check_solution(self.submission.pk)
+
+        check_tests.assert_not_called()
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.judge_id, 'first')
+
+    def test_lost_lease_discards_verdict(self):
+        def check_tests(data, lang):
+            # Пока решение проверялось, администратор отправил его на перепроверку
+            self.requeue()
+            return {'status': 'AC'}
+
+        with (
+            mock.patch('core.core.prepare_data', return_value={}),
+            mock.patch('core.core.check_tests', side_effect=check_tests),
+        ):
+            submissions.tasks.check_solution(self.submission.pk)
+
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.verdict, 'IQ')
+
+    def test_expired_lease_is_requeued(self):
+        self.assertTrue(submissions.lease.claim(self.submission.pk, 'dead'))
+        submissions.tasks.requeue_expired_submissions()
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.verdict, 'IP')
+
+        expired = timezone.now() - timezone.timedelta(
+            seconds=django.conf.settings.JUDGE_LEASE_TIMEOUT + 1,
+        )
+        submissions.models.Submission.objects.filter(pk=self.submission.pk).update(
+            judge_heartbeat=expired,
+        )
+        with (
+            mock.patch.object(submissions.tasks.check_solution, 'apply_async') as task,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            submissions.tasks.requeue_expired_submissions()
+
+        task.assert_called_once()
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.verdict, 'IQ')
+        self.assertEqual(self.submission.judge_id, '')
+        self.check({'status': 'AC'})
+        self.assertEqual(self.submission.verdict, 'AC')
+
+    def resubmit(self, code):
+        self.submission = submissions.models.Submission.objects.create(
+            user=self.user,
+            problem=self.problem,
+            code=code,
+            language=problems.models.LanguageChoices.Python_3_11,
+        )
+
+    def test_identical_resubmission_uses_cached_verdict(self):
+        test = {'number': 1, 'status': 'AC', 'cpu_time': 1, 'wall_time': 1}
+        self.check({'status': 'AC', 'tests': [{**test, 'memory': 1}]})
+
+        self.resubmit('print(input())\r\n\r\n')
+        with mock.patch('core.core.check_tests') as check_tests:
+            submissions.tasks.check_solution(self.submission.pk)
+
+        check_tests.assert_not_called()
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.verdict, 'AC')
+        self.assertEqual(self.submission.test_results.count(), 1)
+
+    def test_time_limit_is_not_cached(self):
+        self.check({'status': 'TL', 'test_error': 1, 'message': 'Time limit'})
+        self.resubmit('print(input())')
+        self.check({'status': 'AC'})
+        self.assertEqual(self.submission.verdict, 'AC')
+
+    def test_test_change_invalidates_cached_verdict(self):
+        self.check({'status': 'AC'})
+        test = self.problem.tests.get(number=2)
+        test.output_data = '2'
+        test.save()
+
+        self.resubmit('print(input())')
+        self.check({'status': 'WA', 'test_error': 2, 'message': 'Wrong answer'})
+        self.assertEqual(self.submission.verdict, 'WA')
+
+    def enqueue(self, rejudge=False):
+        with (
+            mock.patch.object(submissions.tasks.check_solution, 'apply_async') as task,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            submissions.tasks.enqueue_submission(self.submission, rejudge)
+
+        return task.call_args.kwargs['queue']
+
+    def test_submission_queues(self):
+        self.assertEqual(self.enqueue(), clash_of_code.celery.PRACTICE_QUEUE)
+        self.assertEqual(
+            self.enqueue(rejudge=True),
+            clash_of_code.celery.REJUDGE_QUEUE,
+        )
+
+        now = timezone.now()
+        self.submission.contest = contests.models.Contest.objects.create(
+            name='test',
+            description='test',
+            created_by=self.user,
+            start_time=now - timezone.timedelta(hours=1),
+            end_time=now + timezone.timedelta(hours=1),
+        )
+        self.assertEqual(self.enqueue(), clash_of_code.celery.CONTEST_QUEUE)
+
+    def test_syntax_error_skips_sandbox(self):
+        self.submission.code = 'print(input()'
+        self.submission.save()
+        with mock.patch('core.core.check_tests') as check_tests:
+            submissions.tasks.check_solution(self.submission.pk)
+
+        check_tests.assert_not_called()
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.verdict, 'CE')
+        self.assertIn('SyntaxError', self.submission.logs)
+
+    def test_bytecode_is_passed_to_sandbox(self):
+        with mock.patch('core.core.check_tests', return_value={'status': 'AC'}):
+            with mock.patch('core.testcache.get_test_set', return_value='set'):
+                submissions.tasks.check_solution(self.submission.pk)
+
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.verdict, 'AC')
+
 
 @django.test.tag('test_system')
+@unittest.skipUnless(core.pool.docker_available(), 'Docker is not available')
 class TestSystemTests(django.test.TestCase):
     def setUp(self):
         self.user = users.models.User.objects.create_user(
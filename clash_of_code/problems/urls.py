@@ -57,6 +57,11 @@ urlpatterns = [
         problems.views.MySubmissionsView.as_view(),
         name='my_submissions',
     ),
+    django.urls.path(
+        'submissions/events/',
+        problems.views.SubmissionEventsView.as_view(),
+        name='submission_events',
+    ),
     django.urls.path(
         'submission/<int:pk>/',
         problems.views.SubmissionDetailView.as_view(),
@@ -1,16 +1,18 @@
 import json
 import logging
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.core.exceptions import PermissionDenied
+from django.core.files.base import ContentFile
 import django.db.transaction
 import django.http
 from django.http import HttpResponse
 import django.shortcuts
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
-from django.utils import timezone
+from django.utils import timezone, translation
 from django.views import View
 from django.views.generic import (
     CreateView,
@@ -21,15 +23,19 @@ from django.views.generic import (
 )
 
 import contests.models
+import core.events
 import problems.forms
 import problems.models
 import problems.tasks
+import problems.testdata
 import submissions.models
-from submissions.tasks import check_solution
+import submissions.tasks
 
 
 logger = logging.getLogger(__name__)
 
+MAX_EVENT_SUBMISSIONS = 50
+
 
 class ProblemsListView(ListView):
     model = problems.models.Problem
@@ -65,6 +71,17 @@ class ProblemsUpdateView(LoginRequiredMixin, UpdateView, UserPassesTestMixin):
         return self.request.user == problem.author
 
 
+def get_test_data(request, form, kind):
+    uploaded = form.cleaned_data[f'{kind}_file']
+    if uploaded is not None:
+        return uploaded
+
+    if f'{kind}_data' in request.POST:
+        return ContentFile(form.cleaned_data[f'{kind}_data'].encode())
+
+    return None
+
+
 class ProblemsTestView(LoginRequiredMixin, View):
     def get(self, request, pk):
         problem = django.shortcuts.get_object_or_404(problems.models.Problem, pk=pk)
@@ -86,36 +103,35 @@ class ProblemsTestView(LoginRequiredMixin, View):
         if problem.author != request.user:
             return django.http.HttpResponseForbidden
 
-        form = problems.forms.TestForm(request.POST)
+        form = problems.forms.TestForm(request.POST, request.FILES)
         if not form.is_valid():
             return django.shortcuts.redirect(
                 django.shortcuts.reverse('problems:tests', args=[pk]),
             )
 
-        input_data = form.cleaned_data['input_data']
-        output_data = form.cleaned_data['output_data']
         number = form.cleaned_data['number']
         is_sample = form.cleaned_data['is_sample']
         pk_test = form.cleaned_data['pk']
         if pk_test is None:
-            problems.models.TestCase.objects.create(
-                input_data=input_data,
-                output_data=output_data,
-                is_sample=is_sample,
-                problem=problem,
-                number=number,
-            )
+            test = problems.models.TestCase(problem=problem, number=number)
         else:
             test = django.shortcuts.get_object_or_404(
                 problems.models.TestCase,
                 pk=pk_test,
             )
-            test.input_data = input_data
-            test.output_data = output_data
-            test.is_sample = is_sample
 
-            test.full_clean()
-            test.save()
+        # Большие тесты не попадают в форму целиком, поэтому данные
+        # меняются, только если пришёл файл или поле ввода
+        for kind in ('input', 'output'):
+            data = get_test_data(request, form, kind)
+            if data is not None:
+                digest, size = problems.testdata.save_file(data)
+                setattr(test, f'{kind}_hash', digest)
+                setattr(test, f'{kind}_size', size)
+
+        test.is_sample = is_sample
+        test.full_clean()
+        test.save()
 
         problem.is_correct = False
         problem.save()
@@ -317,7 +333,7 @@ class SubmitSolutionView(LoginRequiredMixin, View):
             return redirect('problems:problem', pk=pk)
 
         try:
-            check_solution.delay(submission.pk)
+            submissions.tasks.enqueue_submission(submission)
             logger.debug(
                 f'Задача проверки отправлена в Celery для submission {submission.id}',
             )
@@ -330,6 +346,38 @@ class SubmitSolutionView(LoginRequiredMixin, View):
         return redirect('problems:submission_detail', pk=submission.pk)
 
 
+def can_view_submission(user, submission):
+    if user == submission.user:
+        return True
+
+    if submission.contest:
+        return (
+            submission.contest.participants.filter(id=user.id).exists()
+            or submission.contest.created_by == user
+            or user.is_staff
+        )
+
+    return user.is_staff
+
+
+def get_visible_submissions(user, submission_ids):
+    submissions_qs = submissions.models.Submission.objects.filter(
+        pk__in=submission_ids,
+    ).select_related('user', 'contest__created_by')
+    return [
+        submission.pk
+        for submission in submissions_qs
+        if can_view_submission(user, submission)
+    ]
+
+
+def get_submission_messages(submission_ids):
+    submissions_qs = submissions.models.Submission.objects.filter(
+        pk__in=submission_ids,
+    ).select_related('test_error')
+    return [core.events.get_message(submission) for submission in submissions_qs]
+
+
 class MySubmissionsView(LoginRequiredMixin, ListView):
     model = submissions.models.Submission
     template_name = 'problems/my_submissions.html'
@@ -357,6 +405,35 @@ class MySubmissionsView(LoginRequiredMixin, ListView):
         return context
 
 
+class SubmissionEventsView(View):
+    async def get(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            raise PermissionDenied('Войдите, чтобы следить за вердиктами')
+
+        ids = request.GET.get('ids', '').split(',')
+        ids = [int(value) for value in ids if value.isdigit()]
+        submission_ids = await sync_to_async(get_visible_submissions)(
+            user,
+            ids[:MAX_EVENT_SUBMISSIONS],
+        )
+        if not submission_ids:
+            raise django.http.Http404
+
+        response = django.http.StreamingHttpResponse(
+            core.events.stream(
+                submission_ids,
+                sync_to_async(get_submission_messages),
+                translation.get_language(),
+            ),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        # nginx не должен буферизовать поток событий
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class SubmissionDetailView(LoginRequiredMixin, DetailView):
     model = submissions.models.Submission
     template_name = 'problems/submission_detail.html'
@@ -378,20 +455,7 @@ class SubmissionDetailView(LoginRequiredMixin, DetailView):
         return super().dispatch(request, *args, **kwargs)
 
     def has_permission(self):
-        submission = self.object
-        user = self.request.user
-
-        if user == submission.user:
-            return True
-
-        if submission.contest:
-            return (
-                submission.contest.participants.filter(id=user.id).exists()
-                or submission.contest.created_by == user
-                or user.is_staff
-            )
-
-        return user.is_staff
+        return can_view_submission(self.request.user, self.object)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -94,10 +94,12 @@ const taskTemplate = (testNumber, INPUT_DATA_TRANS, OUTPUT_DATA_TRANS, IS_SAMPLE
                 <div class="mb-3">
                     <label class="form-label fw-bold">${INPUT_DATA_TRANS}</label>
                     <textarea name="input_data" class="form-control code-editor" rows="5"></textarea>
+                    <input type="file" name="input_file" class="form-control mt-2">
                 </div>
                 <div class="mb-3">
                     <label class="form-label fw-bold">${OUTPUT_DATA_TRANS}</label>
                     <textarea name="output_data" class="form-control code-editor" rows="5"></textarea>
+                    <input type="file" name="output_file" class="form-control mt-2">
                 </div>
                 <div class="form-check form-switch mb-3">
                     <input class="form-check-input" type="checkbox" id="id_is_sample" name="is_sample" checked>
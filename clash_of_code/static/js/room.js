@@ -1,3 +1,6 @@
+const roomData = JSON.parse(document.getElementById('room-data').textContent);
+const Range = ace.require('ace/range').Range;
+
 const editor = ace.edit("editor");
 editor.setTheme("ace/theme/monokai");
 editor.session.setMode(`ace/mode/${roomData.languageMode}`);
@@ -7,40 +10,213 @@ editor.setOptions({
     enableLiveAutocompletion: true
 });
 
-socket.onmessage = function(e) {
-    const data = JSON.parse(e.data);
-    if (data.type === 'code_update' && data.sender !== roomData.username) {
-        editor.setValue(data.content);
-    } else if (data.type === 'room_state') {
-        editor.setValue(data.content);
-        editor.session.setMode(`ace/mode/${data.language}`);
+// Нажатия, сделанные за это время, уходят на сервер одной пачкой
+const COALESCE_DELAY = 50;
+const RECONNECT_DELAY = 1000;
+
+let socket = null;
+let version = null;
+// Пачка, отправленная на сервер и ещё не подтверждённая
+let inflight = null;
+// Изменения, сделанные после отправки inflight
+let buffer = [];
+let flushTimer = null;
+let applyingRemote = false;
+
+function comparePoints(a, b) {
+    return a.row - b.row || a.column - b.column;
+}
+
+function getEnd(start, lines) {
+    if (lines.length === 1) {
+        return {row: start.row, column: start.column + lines[0].length};
     }
-};
+    return {row: start.row + lines.length - 1, column: lines[lines.length - 1].length};
+}
 
-editor.session.on('change', function(delta) {
-    socket.send(JSON.stringify({
-        'type': 'code_update',
-        'content': editor.getValue(),
-        'sender': roomData.username
-    }));
-});
+function shiftAfterInsert(point, start, end) {
+    if (point.row === start.row) {
+        return {row: end.row, column: end.column + point.column - start.column};
+    }
+    return {row: point.row + end.row - start.row, column: point.column};
+}
 
-document.getElementById('save-btn').addEventListener('click', function() {
-    fetch(roomData.saveUrl, {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-            'X-CSRFToken': roomData.csrfToken
-        },
-        body: JSON.stringify({
-            'content': editor.getValue()
-        })
-    }).then(response => {
-        if (response.ok) {
+function shiftAfterRemove(point, start, end) {
+    if (comparePoints(point, start) <= 0) {
+        return point;
+    }
+    if (comparePoints(point, end) < 0) {
+        return start;
+    }
+    if (point.row === end.row) {
+        return {row: start.row, column: start.column + point.column - end.column};
+    }
+    return {row: point.row - (end.row - start.row), column: point.column};
+}
+
+// Те же правила, что и в duet/deltas.py, иначе документы разойдутся
+function transform(delta, other, otherFirst) {
+    let start = delta.start;
+    let end = delta.end;
+    if (delta.action === 'insert') {
+        if (other.action === 'insert') {
+            const order = comparePoints(start, other.start);
+            if (order > 0 || (order === 0 && otherFirst)) {
+                start = shiftAfterInsert(start, other.start, other.end);
+            }
+        } else if (comparePoints(other.start, start) < 0 && comparePoints(start, other.end) < 0) {
+            return null;
+        } else {
+            start = shiftAfterRemove(start, other.start, other.end);
+        }
+        return {action: 'insert', start: start, end: getEnd(start, delta.lines), lines: delta.lines};
+    }
+
+    if (other.action === 'insert') {
+        if (comparePoints(start, other.start) >= 0) {
+            start = shiftAfterInsert(start, other.start, other.end);
+        }
+        if (comparePoints(end, other.start) > 0) {
+            end = shiftAfterInsert(end, other.start, other.end);
+        }
+    } else {
+        start = shiftAfterRemove(start, other.start, other.end);
+        end = shiftAfterRemove(end, other.start, other.end);
+    }
+    if (comparePoints(end, start) <= 0) {
+        return null;
+    }
+    return {action: 'remove', start: start, end: end, lines: delta.lines};
+}
+
+function transformBatches(deltas, others) {
+    const transformedOthers = [];
+    for (let other of others) {
+        const transformed = [];
+        for (const delta of deltas) {
+            if (other === null) {
+                transformed.push(delta);
+                continue;
+            }
+            const nextDelta = transform(delta, other, true);
+            other = transform(other, delta, false);
+            if (nextDelta !== null) {
+                transformed.push(nextDelta);
+            }
+        }
+        deltas = transformed;
+        if (other !== null) {
+            transformedOthers.push(other);
+        }
+    }
+    return [deltas, transformedOthers];
+}
+
+function setStatus(connected) {
+    const status = document.getElementById('connection-status');
+    status.className = 'badge me-2 ' + (connected ? 'bg-success' : 'bg-secondary');
+    status.textContent = connected ? roomData.connectedText : roomData.disconnectedText;
+}
+
+function send(message) {
+    if (socket && socket.readyState === WebSocket.OPEN) {
+        socket.send(JSON.stringify(message));
+    }
+}
+
+function flush() {
+    flushTimer = null;
+    if (inflight !== null || !buffer.length || version === null) {
+        return;
+    }
+    inflight = buffer;
+    buffer = [];
+    send({type: 'deltas', version: version, deltas: inflight});
+}
+
+function applyRemote(deltas) {
+    // Чужие изменения сдвигаются на свои неподтверждённые, и наоборот
+    if (inflight !== null) {
+        [inflight, deltas] = transformBatches(inflight, deltas);
+    }
+    [buffer, deltas] = transformBatches(buffer, deltas);
+
+    applyingRemote = true;
+    try {
+        for (const delta of deltas) {
+            if (delta.action === 'insert') {
+                editor.session.doc.insertMergedLines(delta.start, delta.lines);
+            } else {
+                editor.session.doc.remove(Range.fromPoints(delta.start, delta.end));
+            }
+        }
+    } finally {
+        applyingRemote = false;
+    }
+}
+
+function resetDocument(content, newVersion) {
+    applyingRemote = true;
+    try {
+        editor.session.doc.setValue(content);
+    } finally {
+        applyingRemote = false;
+    }
+    version = newVersion;
+    inflight = null;
+    buffer = [];
+}
+
+function connect() {
+    const scheme = window.location.protocol === 'https:' ? 'wss://' : 'ws://';
+    socket = new WebSocket(scheme + window.location.host + roomData.socketPath);
+
+    socket.onopen = function() {
+        setStatus(true);
+    };
+
+    socket.onclose = function() {
+        setStatus(false);
+        version = null;
+        setTimeout(connect, RECONNECT_DELAY);
+    };
+
+    socket.onmessage = function(e) {
+        const data = JSON.parse(e.data);
+        if (data.type === 'room_state') {
+            resetDocument(data.content, data.version);
+        } else if (data.type === 'deltas') {
+            applyRemote(data.deltas);
+            version = data.version;
+        } else if (data.type === 'ack') {
+            version = data.version;
+            inflight = null;
+            flush();
+        } else if (data.type === 'saved') {
             const toast = new bootstrap.Toast(document.getElementById('saveToast'));
             toast.show();
-        } else {
-            alert('Error saving content');
         }
+    };
+}
+
+editor.session.on('change', function(delta) {
+    if (applyingRemote) {
+        return;
+    }
+    buffer.push({
+        action: delta.action,
+        start: {row: delta.start.row, column: delta.start.column},
+        end: {row: delta.end.row, column: delta.end.column},
+        lines: delta.lines.slice()
     });
-});
\ No newline at end of file
+    if (flushTimer === null) {
+        flushTimer = setTimeout(flush, COALESCE_DELAY);
+    }
+});
+
+document.getElementById('save-btn').addEventListener('click', function() {
+    flush();
+    send({type: 'save'});
+});
+
+connect();
@@ -0,0 +1,69 @@
+document.addEventListener('DOMContentLoaded', function () {
+    const container = document.getElementById('submissionEvents');
+    if (!container || !window.EventSource) {
+        return;
+    }
+
+    const pendingVerdicts = ['IQ', 'IP'];
+    const badges = {};
+    document.querySelectorAll('[data-submission-id]').forEach(badge => {
+        if (pendingVerdicts.includes(badge.dataset.verdict)) {
+            badges[badge.dataset.submissionId] = badge;
+        }
+    });
+
+    const ids = Object.keys(badges);
+    if (!ids.length) {
+        return;
+    }
+
+    function getVerdictClass(verdict) {
+        if (verdict === 'AC') {
+            return 'bg-success';
+        }
+        if (verdict === 'CE') {
+            return 'bg-warning text-dark';
+        }
+        if (pendingVerdicts.includes(verdict)) {
+            return 'bg-secondary';
+        }
+        return 'bg-danger';
+    }
+
+    function setText(selector, value, suffix) {
+        const cell = document.querySelector(selector);
+        if (cell && value !== null) {
+            cell.textContent = value + ' ' + suffix;
+        }
+    }
+
+    const source = new EventSource(container.dataset.url + '?ids=' + ids.join(','));
+    source.addEventListener('verdict', function (event) {
+        const message = JSON.parse(event.data);
+        const badge = badges[message.id];
+        if (!badge) {
+            return;
+        }
+
+        badge.dataset.verdict = message.verdict;
+        badge.className = 'badge ' + getVerdictClass(message.verdict);
+        badge.textContent = message.verdict_display;
+        if (!message.final) {
+            return;
+        }
+
+        // Страница решения перезагружается один раз, чтобы показать тесты и логи
+        if (container.dataset.reload !== undefined) {
+            source.close();
+            window.location.reload();
+            return;
+        }
+
+        setText('[data-submission-time="' + message.id + '"]', message.time, 'ms');
+        setText('[data-submission-memory="' + message.id + '"]', message.memory, 'KB');
+        delete badges[message.id];
+        if (!Object.keys(badges).length) {
+            source.close();
+        }
+    });
+});
@@ -1,10 +1,28 @@
 import django.contrib.admin
 
+import problems.models
 import submissions.models
+import submissions.tasks
+
+
+class TestResultInline(django.contrib.admin.TabularInline):
+    model = submissions.models.TestResult
+    extra = 0
+    can_delete = False
+    readonly_fields = (
+        submissions.models.TestResult.number.field.name,
+        submissions.models.TestResult.verdict.field.name,
+        submissions.models.TestResult.cpu_time.field.name,
+        submissions.models.TestResult.wall_time.field.name,
+        submissions.models.TestResult.memory.field.name,
+    )
 
 
 @django.contrib.admin.register(submissions.models.Submission)
 class SubmissionAdmin(django.contrib.admin.ModelAdmin):
+    inlines = (TestResultInline,)
+    actions = ('rejudge',)
+
     list_display = (
         'problem_name',
         'user_name',
@@ -19,3 +37,14 @@ class SubmissionAdmin(django.contrib.admin.ModelAdmin):
     @django.contrib.admin.display(empty_value='???')
     def user_name(self, obj):
         return obj.user.username[:20]
+
+    @django.contrib.admin.action(description='Rejudge selected submissions')
+    def rejudge(self, request, queryset):
+        # Вердикт текущей проверки будет отброшен, посылку возьмёт новая задача
+        queryset.update(
+            verdict=problems.models.VerdictChoice.In_queue,
+            judge_id='',
+            judge_heartbeat=None,
+        )
+        for submission in queryset:
+            submissions.tasks.enqueue_submission(submission, rejudge=True)
@@ -0,0 +1,116 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+
+import django.conf
+import django.db
+from django.db.models import Q
+from django.utils import timezone
+
+import problems.models
+import submissions.models
+
+
+logger = logging.getLogger(__name__)
+
+PENDING_VERDICTS = (
+    problems.models.VerdictChoice.In_queue,
+    problems.models.VerdictChoice.In_processing,
+)
+
+
+def get_judge_id():
+    # Один процесс worker с пулом gevent или threads проверяет несколько
+    # посылок сразу, поэтому к хосту и pid добавляется случайная часть
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def get_expired_before():
+    timeout = django.conf.settings.JUDGE_LEASE_TIMEOUT
+    return timezone.now() - timezone.timedelta(seconds=timeout)
+
+
+def get_free_lease():
+    return Q(judge_heartbeat__isnull=True) | Q(judge_heartbeat__lt=get_expired_before())
+
+
+def claim(submission_id, judge_id):
+    # Повторно доставленная задача не получит посылку, пока жив первый
+    # worker, а уже проверенную посылку не возьмёт вовсе
+    claimed = submissions.models.Submission.objects.filter(
+        get_free_lease(),
+        pk=submission_id,
+        verdict__in=PENDING_VERDICTS,
+    ).update(
+        verdict=problems.models.VerdictChoice.In_processing,
+        judge_id=judge_id,
+        judge_heartbeat=timezone.now(),
+    )
+    return claimed == 1
+
+
+def extend(submission_id, judge_id):
+    extended = submissions.models.Submission.objects.filter(
+        pk=submission_id,
+        judge_id=judge_id,
+    ).update(judge_heartbeat=timezone.now())
+    return extended == 1
+
+
+def is_held(submission_id, judge_id):
+    # Вызывается внутри транзакции, строка блокируется до записи вердикта
+    held = submissions.models.Submission.objects.filter(
+        pk=submission_id,
+        judge_id=judge_id,
+    )
+    return held.select_for_update().exists()
+
+
+def get_expired():
+    return submissions.models.Submission.objects.filter(
+        get_free_lease(),
+        verdict=problems.models.VerdictChoice.In_processing,
+    )
+
+
+def release_expired(submission_id):
+    released = (
+        get_expired()
+        .filter(pk=submission_id)
+        .update(
+            verdict=problems.models.VerdictChoice.In_queue,
+            judge_id='',
+            judge_heartbeat=None,
+        )
+    )
+    return released == 1
+
+
+class Heartbeat:
+    def __init__(self, submission_id, judge_id):
+        self.submission_id = submission_id
+        self.judge_id = judge_id
+        self.interval = django.conf.settings.JUDGE_LEASE_TIMEOUT / 3
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                if not extend(self.submission_id, self.judge_id):
+                    logger.warning(
+                        f'Посылка {self.submission_id} передана другому worker',
+                    )
+                    return
+        finally:
+            django.db.connection.close()
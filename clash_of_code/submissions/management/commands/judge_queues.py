@@ -0,0 +1,41 @@
+import collections
+
+import django.core.management.base
+
+import clash_of_code.celery
+
+
+class Command(django.core.management.base.BaseCommand):
+    help = 'Show pending and running jobs in each judge queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=1.0,
+            help='How long to wait for workers to report running jobs',
+        )
+
+    def get_running(self, timeout):
+        inspect = clash_of_code.celery.app.control.inspect(timeout=timeout)
+        running = collections.Counter()
+        for tasks in (inspect.active() or {}).values():
+            for task in tasks:
+                running[task['delivery_info'].get('routing_key')] += 1
+
+        return running
+
+    def handle(self, *args, **options):
+        running = self.get_running(options['timeout'])
+        with clash_of_code.celery.app.connection_for_read() as connection:
+            channel = connection.default_channel
+            for name in clash_of_code.celery.JUDGE_QUEUES:
+                try:
+                    pending = channel.queue_declare(name, passive=True).message_count
+                except connection.channel_errors:
+                    # Redis удаляет ключ пустой очереди
+                    pending = 0
+
+                self.stdout.write(
+                    f'{name}: {pending} pending, {running[name]} running',
+                )
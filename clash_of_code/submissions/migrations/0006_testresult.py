@@ -0,0 +1,63 @@
+# Generated by Django 5.2 on 2026-10-18 15:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0005_submission_contest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestResult',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('number', models.PositiveIntegerField(verbose_name='number of test')),
+                (
+                    'verdict',
+                    models.CharField(
+                        choices=[
+                            ('AC', 'Accept'),
+                            ('CE', 'Compilation error'),
+                            ('WA', 'Wrong answer'),
+                            ('TL', 'Time limit'),
+                            ('RE', 'Runtime error'),
+                            ('ML', 'Memory limit'),
+                            ('IQ', 'In queue'),
+                            ('IP', 'In processing'),
+                        ],
+                        max_length=2,
+                    ),
+                ),
+                ('cpu_time', models.PositiveIntegerField(verbose_name='CPU time, ms')),
+                (
+                    'wall_time',
+                    models.PositiveIntegerField(verbose_name='wall time, ms'),
+                ),
+                ('memory', models.PositiveIntegerField(verbose_name='peak memory, KB')),
+                (
+                    'submission',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='test_results',
+                        to='submissions.submission',
+                    ),
+                ),
+            ],
+            options={
+                'ordering': ['number'],
+                'unique_together': {('submission', 'number')},
+            },
+        ),
+    ]
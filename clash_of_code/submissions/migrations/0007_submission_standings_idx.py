@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 15:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0006_remove_contestproblem_solved_by_and_more'),
+        ('problems', '0013_problem_tests_version'),
+        ('submissions', '0006_testresult'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(
+                fields=['contest', 'user', 'problem', 'submitted_at'],
+                name='submission_standings_idx',
+            ),
+        ),
+    ]
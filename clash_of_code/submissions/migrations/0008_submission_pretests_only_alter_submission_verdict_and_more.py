@@ -0,0 +1,56 @@
+# Generated by Django 5.2 on 2026-10-18 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0007_submission_standings_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='pretests_only',
+            field=models.BooleanField(
+                default=False, verbose_name='judged on pretests only'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='verdict',
+            field=models.CharField(
+                choices=[
+                    ('AC', 'Accept'),
+                    ('CE', 'Compilation error'),
+                    ('WA', 'Wrong answer'),
+                    ('TL', 'Time limit'),
+                    ('RE', 'Runtime error'),
+                    ('ML', 'Memory limit'),
+                    ('IQ', 'In queue'),
+                    ('IP', 'In processing'),
+                    ('SK', 'Skipped'),
+                ],
+                default='IQ',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='testresult',
+            name='verdict',
+            field=models.CharField(
+                choices=[
+                    ('AC', 'Accept'),
+                    ('CE', 'Compilation error'),
+                    ('WA', 'Wrong answer'),
+                    ('TL', 'Time limit'),
+                    ('RE', 'Runtime error'),
+                    ('ML', 'Memory limit'),
+                    ('IQ', 'In queue'),
+                    ('IP', 'In processing'),
+                    ('SK', 'Skipped'),
+                ],
+                max_length=2,
+            ),
+        ),
+    ]
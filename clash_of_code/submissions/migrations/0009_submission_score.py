@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            'submissions',
+            '0008_submission_pretests_only_alter_submission_verdict_and_more',
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='score',
+            field=models.FloatField(
+                blank=True,
+                help_text='Share of the test group points the solution has earned',
+                null=True,
+                verbose_name='score',
+            ),
+        ),
+    ]
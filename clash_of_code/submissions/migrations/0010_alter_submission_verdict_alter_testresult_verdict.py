@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 16:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0009_submission_score'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submission',
+            name='verdict',
+            field=models.CharField(
+                choices=[
+                    ('AC', 'Accept'),
+                    ('CE', 'Compilation error'),
+                    ('WA', 'Wrong answer'),
+                    ('TL', 'Time limit'),
+                    ('RE', 'Runtime error'),
+                    ('ML', 'Memory limit'),
+                    ('OL', 'Output limit'),
+                    ('IQ', 'In queue'),
+                    ('IP', 'In processing'),
+                    ('SK', 'Skipped'),
+                ],
+                default='IQ',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='testresult',
+            name='verdict',
+            field=models.CharField(
+                choices=[
+                    ('AC', 'Accept'),
+                    ('CE', 'Compilation error'),
+                    ('WA', 'Wrong answer'),
+                    ('TL', 'Time limit'),
+                    ('RE', 'Runtime error'),
+                    ('ML', 'Memory limit'),
+                    ('OL', 'Output limit'),
+                    ('IQ', 'In queue'),
+                    ('IP', 'In processing'),
+                    ('SK', 'Skipped'),
+                ],
+                max_length=2,
+            ),
+        ),
+    ]
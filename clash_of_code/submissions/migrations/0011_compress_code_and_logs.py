@@ -0,0 +1,92 @@
+# Generated by Django 5.2 on 2026-10-18 16:15
+
+from django.db import migrations, models
+
+import core.fields
+
+BATCH_SIZE = 500
+
+
+def iter_batches(queryset):
+    # Записи обновляются пачками по id, чтобы не писать в таблицу,
+    # пока по ней открыт курсор
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(pks), BATCH_SIZE):
+        stop = start + BATCH_SIZE
+        yield list(queryset.filter(pk__in=pks[start:stop]))
+
+
+def compress(apps, schema_editor):
+    submission_model = apps.get_model('submissions', 'Submission')
+    for batch in iter_batches(submission_model.objects.all()):
+        for submission in batch:
+            submission.code_compressed = submission.code
+            submission.logs_compressed = submission.logs
+
+        submission_model.objects.bulk_update(
+            batch,
+            ['code_compressed', 'logs_compressed'],
+        )
+
+
+def decompress(apps, schema_editor):
+    submission_model = apps.get_model('submissions', 'Submission')
+    for batch in iter_batches(submission_model.objects.all()):
+        for submission in batch:
+            submission.code = submission.code_compressed
+            submission.logs = submission.logs_compressed
+
+        submission_model.objects.bulk_update(batch, ['code', 'logs'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0010_alter_submission_verdict_alter_testresult_verdict'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='code_compressed',
+            field=core.fields.CompressedTextField(default=''),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='logs_compressed',
+            field=core.fields.CompressedTextField(
+                blank=True, null=True, verbose_name='logs'
+            ),
+        ),
+        migrations.RunPython(compress, decompress),
+        # Значение по умолчанию нужно, чтобы при откате поле вернулось
+        # в таблицу с уже существующими записями
+        migrations.AlterField(
+            model_name='submission',
+            name='code',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='submission',
+            name='code',
+        ),
+        migrations.RemoveField(
+            model_name='submission',
+            name='logs',
+        ),
+        migrations.RenameField(
+            model_name='submission',
+            old_name='code_compressed',
+            new_name='code',
+        ),
+        migrations.RenameField(
+            model_name='submission',
+            old_name='logs_compressed',
+            new_name='logs',
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='code',
+            field=core.fields.CompressedTextField(),
+        ),
+    ]
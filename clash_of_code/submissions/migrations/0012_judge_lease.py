@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 16:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contests', '0009_pretests'),
+        ('problems', '0018_testcase_test_data_storage'),
+        ('submissions', '0011_compress_code_and_logs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='judge_heartbeat',
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name='judge heartbeat'
+            ),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='judge_id',
+            field=models.CharField(
+                blank=True,
+                default='',
+                editable=False,
+                max_length=100,
+                verbose_name='judge',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(
+                fields=['verdict', 'judge_heartbeat'], name='submission_lease_idx'
+            ),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 import django.db.models
 from django.utils.translation import gettext_lazy as _
 
+import core.fields
 import problems.models
 
 
@@ -10,7 +11,12 @@ User = get_user_model()
 
 class SubmissionManager(django.db.models.Manager):
     def get_full_submit(self, pk):
-        return self.select_related('problem', 'user', 'test_error').get(pk=pk)
+        return self.select_related(
+            'problem',
+            'user',
+            'test_error',
+            'contest',
+        ).get(pk=pk)
 
 
 class Submission(django.db.models.Model):
@@ -31,7 +37,7 @@ class Submission(django.db.models.Model):
         to=problems.models.Problem,
         on_delete=django.db.models.CASCADE,
     )
-    code = django.db.models.TextField()
+    code = core.fields.CompressedTextField()
     language = django.db.models.CharField(
         max_length=20,
     )
@@ -47,7 +53,7 @@ class Submission(django.db.models.Model):
         default=None,
     )
 
-    logs = django.db.models.TextField(
+    logs = core.fields.CompressedTextField(
         verbose_name=_('logs'),
         blank=True,
         null=True,
@@ -56,6 +62,69 @@ class Submission(django.db.models.Model):
     submitted_at = django.db.models.DateTimeField(
         auto_now_add=True,
     )
+    pretests_only = django.db.models.BooleanField(
+        verbose_name=_('judged on pretests only'),
+        default=False,
+    )
+    score = django.db.models.FloatField(
+        verbose_name=_('score'),
+        help_text=_('Share of the test group points the solution has earned'),
+        blank=True,
+        null=True,
+    )
+    # Lease проверяющего worker: кто проверяет посылку и когда он последний
+    # раз подтвердил, что жив
+    judge_id = django.db.models.CharField(
+        verbose_name=_('judge'),
+        max_length=100,
+        blank=True,
+        default='',
+        editable=False,
+    )
+    judge_heartbeat = django.db.models.DateTimeField(
+        verbose_name=_('judge heartbeat'),
+        null=True,
+        blank=True,
+        editable=False,
+    )
 
     class Meta:
         ordering = ['-submitted_at']
+        indexes = [
+            django.db.models.Index(
+                fields=['contest', 'user', 'problem', 'submitted_at'],
+                name='submission_standings_idx',
+            ),
+            django.db.models.Index(
+                fields=['verdict', 'judge_heartbeat'],
+                name='submission_lease_idx',
+            ),
+        ]
+
+
+class TestResult(django.db.models.Model):
+    submission = django.db.models.ForeignKey(
+        to=Submission,
+        on_delete=django.db.models.CASCADE,
+        related_name='test_results',
+    )
+    number = django.db.models.PositiveIntegerField(
+        verbose_name=_('number of test'),
+    )
+    verdict = django.db.models.CharField(
+        choices=problems.models.VerdictChoice,
+        max_length=2,
+    )
+    cpu_time = django.db.models.PositiveIntegerField(
+        verbose_name=_('CPU time, ms'),
+    )
+    wall_time = django.db.models.PositiveIntegerField(
+        verbose_name=_('wall time, ms'),
+    )
+    memory = django.db.models.PositiveIntegerField(
+        verbose_name=_('peak memory, KB'),
+    )
+
+    class Meta:
+        ordering = ['number']
+        unique_together = ['submission', 'number']
@@ -1,47 +1,86 @@
-import json
+import logging
 
+import django.db.transaction
+
+import clash_of_code.celery
 from clash_of_code.celery import app
+import contests.standings
+import core.compiler
 import core.core
+import core.events
+import core.verdicts
 import problems.models
+import submissions.lease
 import submissions.models
 
 
-@app.task
-def check_solution(pk_solution):
-    solution = submissions.models.Submission.objects.get_full_submit(pk=pk_solution)
-    solution.verdict = problems.models.VerdictChoice.In_processing
-    solution.save()
+logger = logging.getLogger(__name__)
+
+
+def save_verdict(solution, judge_id, test_results=()):
+    with django.db.transaction.atomic():
+        # Пока посылка проверялась, её могли перепроверить или отдать другому
+        # worker, тогда этот вердикт уже не нужен
+        if not submissions.lease.is_held(solution.pk, judge_id):
+            logger.warning(f'Вердикт посылки {solution.pk} отброшен: lease потерян')
+            return
+
+        solution.judge_id = ''
+        solution.judge_heartbeat = None
+        solution.test_results.all().delete()
+        submissions.models.TestResult.objects.bulk_create(test_results)
+        solution.save()
+        if solution.contest_id is not None:
+            contests.standings.update_cell(
+                solution.contest,
+                solution.user_id,
+                solution.problem_id,
+            )
+
+        django.db.transaction.on_commit(
+            lambda: core.events.publish_submission(solution),
+        )
 
+
+def get_pretests(solution):
+    if solution.contest_id is None or solution.contest.status != 'running':
+        return None
+
+    pretests = problems.models.TestCase.objects.filter(
+        problem_id=solution.problem_id,
+        pretest_of__contest_id=solution.contest_id,
+    )
+    return list(pretests.order_by('number').values_list('number', flat=True)) or None
+
+
+def judge(solution):
     code = solution.code
     lang = solution.language
-    tests = solution.problem.tests.all()
-    max_time = solution.problem.time_limit
-    max_memory = solution.problem.memory_limit
-
-    tests_json = list()
-    for test in tests:
-        test_json = {
-            'input_data': test.input_data,
-            'output_data': test.output_data,
-            'number': test.number,
-        }
-        tests_json.append(test_json)
-
-    data = {
-        'input_data': json.dumps(
-            {
-                'tests': tests_json,
-                'user_code': code,
-                'time_limit': max_time,
-                'memory_limit': max_memory,
-            },
-        ),
-    }
-
-    result = core.core.check_tests(data, lang)
+    try:
+        bytecode = core.compiler.precompile(code, lang)
+    except core.compiler.CompilationError as e:
+        solution.verdict = problems.models.VerdictChoice.Compilation_error
+        solution.pretests_only = False
+        solution.score = None
+        solution.test_error = None
+        solution.logs = core.core.truncate_log(str(e))
+        return []
+
+    # Во время контеста решение проверяется только на претестах, остальные
+    # тесты прогоняются на системном тестировании после окончания
+    numbers = get_pretests(solution)
+    solution.pretests_only = numbers is not None
+
+    result = core.verdicts.get(solution.problem, code, lang, numbers)
+    if result is None:
+        data = core.core.prepare_data(solution.problem, code, bytecode, numbers)
+        result = core.core.check_tests(data, lang)
+        core.verdicts.store(solution.problem, code, lang, result, numbers)
+
     status = result['status']
     test_error = result.get('test_error', None)
     message = result.get('message', '')
+    solution.score = result.get('score')
 
     if status == problems.models.VerdictChoice.Accept:
         solution.verdict = status
@@ -55,6 +94,64 @@ def check_solution(pk_solution):
                 number=test_error,
             )
 
-        solution.logs = message
+        solution.logs = core.core.truncate_log(message)
+
+    return [
+        submissions.models.TestResult(
+            submission=solution,
+            number=test['number'],
+            verdict=test['status'],
+            cpu_time=test['cpu_time'],
+            wall_time=test['wall_time'],
+            memory=test['memory'],
+        )
+        for test in result.get('tests', [])
+    ]
+
+
+@app.task
+def check_solution(pk_solution):
+    # Брокер может доставить задачу повторно, проверяет посылку только тот
+    # worker, который первым взял lease
+    judge_id = submissions.lease.get_judge_id()
+    if not submissions.lease.claim(pk_solution, judge_id):
+        logger.info(f'Посылка {pk_solution} уже проверяется или проверена')
+        return
+
+    solution = submissions.models.Submission.objects.get_full_submit(pk=pk_solution)
+    core.events.publish_submission(solution)
+    with submissions.lease.Heartbeat(pk_solution, judge_id):
+        test_results = judge(solution)
+
+    save_verdict(solution, judge_id, test_results)
+
+
+@app.task
+def requeue_expired_submissions():
+    # Worker, не продлевавший lease дольше таймаута, считается упавшим
+    expired = submissions.lease.get_expired()
+    for submission in expired.select_related('contest').iterator():
+        with django.db.transaction.atomic():
+            if not submissions.lease.release_expired(submission.pk):
+                continue
+
+            logger.warning(f'Посылка {submission.pk} возвращена в очередь')
+            enqueue_submission(submission)
+
+
+def get_queue(submission):
+    if submission.contest_id and submission.contest.status == 'running':
+        return clash_of_code.celery.CONTEST_QUEUE
+
+    return clash_of_code.celery.PRACTICE_QUEUE
+
+
+def enqueue_submission(submission, rejudge=False, queue=None):
+    if queue is None and rejudge:
+        queue = clash_of_code.celery.REJUDGE_QUEUE
+    elif queue is None:
+        queue = get_queue(submission)
 
-    solution.save()
+    django.db.transaction.on_commit(
+        lambda: check_solution.apply_async((submission.pk,), queue=queue),
+    )